@@ -8,6 +8,8 @@ import sys
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
+from wilbito.memory.context import retrieve_context
+
 
 def _event(
     db_path: str,
@@ -36,7 +38,10 @@ def _event(
 
 
 def _mem_search(query: str, top_k: int, rag_tag: str | None, min_score: float) -> list[dict[str, Any]]:
-    """Llama al CLI oficial para obtener contexto (RAG). Retorna lista de resultados."""
+    """
+    Modo aislado: llama al CLI oficial en un subproceso para obtener contexto (RAG).
+    Retorna lista de resultados.
+    """
     args = [
         sys.executable,
         "-m",
@@ -68,16 +73,22 @@ def run_council_v2(
     top_k: int = 5,
     rag_tag: str | None = None,
     min_score: float = 0.0,
+    rag_isolated: bool = False,
 ) -> dict[str, Any]:
     """
-    Consejo v2: arma RFC + research + plan + riesgos. Integra RAG opcional.
+    Consejo v2: arma RFC + research + plan + riesgos. Integra RAG opcional: en proceso (store
+    compartido o daemon de memoria) o, con rag_isolated, vía subproceso mem-search.
     Guarda eventos en DB.
     """
     _event(db_path, "info", "council_v2 start", {"objetivo": objetivo, "use_context": use_context})
     contexto: list[dict[str, Any]] = []
     if use_context:
         try:
-            contexto = _mem_search(objetivo, top_k=top_k, rag_tag=rag_tag, min_score=min_score)
+            if rag_isolated:
+                contexto = _mem_search(objetivo, top_k=top_k, rag_tag=rag_tag, min_score=min_score)
+            else:
+                prefer_tags = [rag_tag] if rag_tag else None
+                contexto = retrieve_context(objetivo, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags)
             _event(db_path, "info", "council_v2 context ok", {"found": len(contexto)})
         except Exception as e:
             _event(db_path, "warning", "council_v2 context failed", {"error": str(e)})
@@ -1,14 +1,30 @@
+from __future__ import annotations
+
 from typing import Any, Dict, List
 
 from wilbito.memory.context import retrieve_context
 
 
-def run(objetivo: str, max_iter: int = 1, use_context: bool = False, top_k: int = 5):
+def run(
+    objetivo: str,
+    max_iter: int = 1,
+    use_context: bool = False,
+    top_k: int = 5,
+    rag_tag: str | None = None,
+    min_score: float = 0.0,
+    rag_filter: dict[str, Any] | None = None,
+):
     """
     Router Agent: simula un ciclo de autodesarrollo básico.
-    Si use_context=True, recupera contexto de memoria y lo agrega al resultado.
+    Si use_context=True, recupera contexto de memoria (en proceso) y lo agrega al resultado.
     """
-    context = retrieve_context(objetivo, top_k=top_k) if use_context else []
+    context = (
+        retrieve_context(
+            objetivo, top_k=top_k, min_score=min_score, prefer_tags=[rag_tag] if rag_tag else None, filter=rag_filter
+        )
+        if use_context
+        else []
+    )
 
     # Simulación de ciclo mínimo
     result: list[dict[str, Any]] = [
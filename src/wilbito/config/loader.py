@@ -24,6 +24,34 @@ DEFAULTS = {
         "granularity_default": "coarse",
         "top_k_default": 5,
         "use_context_default": False,
+        "rag_isolated": False,
+    },
+    "executor": {
+        "max_workers": 4,
+        "timeout_s": 0,
+        "spill_kb": 16,
+        "step_cache": True,
+    },
+    "memory": {
+        "scoring": "cosine-tf",
+        "backend": "python",
+        "store": "json",
+        "snapshot": False,
+        "dedup": "skip",
+        "dedup_threshold": 0.8,
+        "stemming": False,
+        "mode": "sparse",
+        "dense_nprobe": 8,
+        "daemon": True,
+        "cache_max_stores": 4,
+        "cache_ttl_s": 600,
+        "decay_half_life_days": 0,
+        "ttl_days": {},
+        "max_items": {},
+        "retention": "archive",
+        "retention_interval_h": 0,
+        "query_cache": 256,
+        "query_cache_persist": False,
     },
 }
 
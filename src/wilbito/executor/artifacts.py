@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+try:
+    import zstandard  # type: ignore
+
+    _HAS_ZSTD = True
+except Exception:
+    zstandard = None  # type: ignore
+    _HAS_ZSTD = False
+
+# Salidas de steps que pasan executor.spill_kb se guardan acá, direccionadas por contenido
+DEFAULT_ARTIFACTS_DIR = Path("artifacts/executor")
+
+_SUFFIXES = {"zstd": ".log.zst", "gzip": ".log.gz"}
+
+
+@dataclass
+class Artifact:
+    path: str
+    sha256: str
+    codec: str  # "zstd" | "gzip"
+    size: int  # bytes sin comprimir
+    stored: int  # bytes en disco
+
+
+def artifact_path(root: str | Path, sha256: str, codec: str) -> Path:
+    """<root>/ab/abcdef….log.gz (o .log.zst)"""
+    return Path(root) / sha256[:2] / (sha256 + _SUFFIXES[codec])
+
+
+class ArtifactWriter:
+    """
+    Escribe una salida por bloques, comprimida (zstd si está instalado, si no gzip) en un
+    temporal mientras calcula su sha256; commit() la mueve a su ruta por contenido (si ya existe
+    un artifact igual, se reutiliza) y discard() la descarta.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.codec = "zstd" if _HAS_ZSTD else "gzip"
+        fd, self._tmp = tempfile.mkstemp(prefix=".spill-", dir=self.root)
+        self._raw = os.fdopen(fd, "wb")
+        if _HAS_ZSTD:
+            self._out = zstandard.ZstdCompressor(level=3).stream_writer(self._raw, closefd=False)
+        else:
+            self._out = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=6, mtime=0)
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes) -> None:
+        self._hash.update(data)
+        self._out.write(data)
+        self.size += len(data)
+
+    def _close(self) -> None:
+        self._out.close()
+        self._raw.close()
+
+    def commit(self) -> Artifact:
+        self._close()
+        sha = self._hash.hexdigest()
+        for codec in _SUFFIXES:
+            existing = artifact_path(self.root, sha, codec)
+            if existing.exists():
+                os.unlink(self._tmp)
+                return Artifact(existing.as_posix(), sha, codec, self.size, existing.stat().st_size)
+        final = artifact_path(self.root, sha, self.codec)
+        final.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self._tmp, final)
+        return Artifact(final.as_posix(), sha, self.codec, self.size, final.stat().st_size)
+
+    def discard(self) -> None:
+        try:
+            self._close()
+        finally:
+            try:
+                os.unlink(self._tmp)
+            except FileNotFoundError:
+                pass
+
+
+def read_artifact(path: str | Path) -> str:
+    """Texto completo de un artifact (.log.gz o .log.zst)."""
+    p = Path(path)
+    data = p.read_bytes()
+    if p.name.endswith(".zst"):
+        if not _HAS_ZSTD:
+            raise RuntimeError(f"{p} está comprimido con zstd y el paquete zstandard no está instalado.")
+        data = zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    else:
+        data = gzip.decompress(data)
+    return data.decode("utf-8", errors="replace")
+
+
+def preview(text: str, chars: int) -> str:
+    """Primeros y últimos chars caracteres de text, marcando lo omitido (aplicarlo a un preview no lo cambia)."""
+    if len(text) <= 2 * chars + 64:
+        return text
+    return f"{text[:chars]}\n[... {len(text) - 2 * chars} caracteres en el artifact ...]\n{text[-chars:]}"
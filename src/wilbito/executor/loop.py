@@ -1,14 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
+import codecs
 import json
+import os
 import sqlite3
-import subprocess
+import time
+import weakref
+from collections import deque
 from collections.abc import Sequence
 from dataclasses import dataclass
 from datetime import UTC, datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+from wilbito.executor.artifacts import DEFAULT_ARTIFACTS_DIR, Artifact, ArtifactWriter, preview
+from wilbito.executor.stepcache import outputs_present, step_cache_key
+
 # ----------------------------
 # Utilidades de archivo / JSON
 # ----------------------------
@@ -36,6 +45,55 @@ def _read_json_file(path: Path) -> list[dict[str, Any]]:
     raise ValueError(f"Formato de {path} inválido: debe ser lista o dict con 'steps'.")
 
 
+def _plan_steps(steps: list[dict[str, Any]]) -> list[list[int]]:
+    """
+    Dependencias de cada step (índices en steps) según "depends_on": lista de step_id (o uno solo).
+    Sin la clave, el step depende del anterior (el orden secuencial de siempre); [] = sin dependencias.
+    Lanza ValueError si se referencia un step_id inexistente o hay un ciclo.
+    """
+    by_id: dict[str, list[int]] = {}
+    for i, step in enumerate(steps):
+        by_id.setdefault(str(step.get("step_id", "step")), []).append(i)
+
+    deps: list[list[int]] = []
+    for i, step in enumerate(steps):
+        if "depends_on" not in step:
+            deps.append([i - 1] if i else [])
+            continue
+        raw = step.get("depends_on")
+        names = [raw] if isinstance(raw, str) else list(raw or [])
+        found: set[int] = set()
+        for name in names:
+            if str(name) not in by_id:
+                raise ValueError(f"El step '{step.get('step_id', 'step')}' depende de '{name}', que no existe.")
+            found.update(j for j in by_id[str(name)] if j != i)
+        deps.append(sorted(found))
+
+    # Orden topológico (Kahn): si no se alcanzan todos los steps, hay un ciclo
+    children = _children(deps)
+    waiting = [len(d) for d in deps]
+    ready = [i for i, n in enumerate(waiting) if n == 0]
+    seen = 0
+    while ready:
+        i = ready.pop()
+        seen += 1
+        for c in children[i]:
+            waiting[c] -= 1
+            if waiting[c] == 0:
+                ready.append(c)
+    if seen != len(steps):
+        raise ValueError("Hay un ciclo en los depends_on de los steps.")
+    return deps
+
+
+def _children(deps: list[list[int]]) -> list[list[int]]:
+    children: list[list[int]] = [[] for _ in deps]
+    for i, d in enumerate(deps):
+        for j in d:
+            children[j].append(i)
+    return children
+
+
 # ----------------------------
 # Esquema de base de datos
 # ----------------------------
@@ -69,6 +127,19 @@ CREATE TABLE IF NOT EXISTS events(
 );
 """
 
+SCHEMA_ARTIFACTS = """
+CREATE TABLE IF NOT EXISTS artifacts(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  run_id INTEGER,
+  task_id INTEGER,
+  path TEXT,
+  kind TEXT,
+  bytes INTEGER,
+  meta_json TEXT,
+  created_at TEXT
+);
+"""
+
 SCHEMA_TASKS = """
 CREATE TABLE IF NOT EXISTS tasks(
   id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -98,6 +169,97 @@ class StepResult:
     status: str  # "ok" | "error"
     result: dict[str, Any] | None = None
     error: str | None = None
+    cached: bool = False
+
+
+@dataclass
+class CommandResult:
+    started: str
+    finished: str
+    rc: int
+    stdout: str
+    stderr: str
+    timed_out: bool = False
+    cancelled: bool = False
+    stdout_artifact: Artifact | None = None
+    stderr_artifact: Artifact | None = None
+    cache_key: str | None = None
+    cached_from: int | None = None  # id de la tarea repetida (hit de cache)
+    result: dict[str, Any] | None = None  # result JSON grabado, en un hit
+
+
+# Salida de cada stream: se guardan los primeros OUTPUT_HEAD_CHARS y los últimos OUTPUT_TAIL_CHARS
+# caracteres (por líneas); el medio se descarta sin llegar a acumularse en memoria
+OUTPUT_HEAD_CHARS = 200_000
+OUTPUT_TAIL_CHARS = 50_000
+OUTPUT_LINE_MAX = 8_192  # líneas más largas se parten
+READ_CHUNK = 65_536
+
+# Eventos "step output": hasta OUTPUT_EVENT_LINES líneas por evento (o lo leído en FLUSH_MAX_SECS),
+# con un tope de OUTPUT_EVENT_MAX_LINES líneas por stream; el resto queda en head/tail de la tarea
+OUTPUT_EVENT_LINES = 200
+OUTPUT_EVENT_MAX_LINES = 2_000
+
+# Un stream que pasa spill_bytes (executor.spill_kb) se guarda completo en un artifact comprimido
+# (ver artifacts.py) y la tarea guarda sólo SPILL_PREVIEW_CHARS del principio y del final
+DEFAULT_SPILL_BYTES = 16 * 1024
+SPILL_PREVIEW_CHARS = 2_000
+
+# Al cortar un step (timeout o cancel): SIGTERM y, si no termina en KILL_GRACE_SECS, SIGKILL
+KILL_GRACE_SECS = 3.0
+
+
+class _OutputBuffer:
+    """Cabeza + cola (ring buffer por líneas) de una salida de tamaño arbitrario."""
+
+    def __init__(self, head_chars: int = OUTPUT_HEAD_CHARS, tail_chars: int = OUTPUT_TAIL_CHARS):
+        self.head_chars = head_chars
+        self.tail_chars = tail_chars
+        self.head: list[str] = []
+        self.tail: deque[str] = deque()
+        self.head_size = 0
+        self.tail_size = 0
+        self.dropped = 0
+        self.artifact: Artifact | None = None  # salida completa, si se desbordó a disco
+
+    def add(self, line: str) -> None:
+        if not self.tail and self.head_size + len(line) <= self.head_chars:
+            self.head.append(line)
+            self.head_size += len(line)
+            return
+        self.tail.append(line)
+        self.tail_size += len(line)
+        while self.tail_size > self.tail_chars and self.tail:
+            self.tail_size -= len(self.tail.popleft())
+            self.dropped += 1
+
+    def text(self) -> str:
+        gap = f"[... {self.dropped} líneas omitidas ...]\n" if self.dropped else ""
+        return "".join(self.head) + gap + "".join(self.tail)
+
+
+def _signal(proc: asyncio.subprocess.Process, force: bool) -> None:
+    """SIGTERM (o SIGKILL con force) al proceso y sus hijos (en POSIX corre en su propia sesión)."""
+    try:
+        if os.name == "posix":
+            import signal
+
+            os.killpg(proc.pid, signal.SIGKILL if force else signal.SIGTERM)
+        elif force:
+            proc.kill()
+        else:
+            proc.terminate()
+    except ProcessLookupError:
+        pass
+
+
+async def _kill(proc: asyncio.subprocess.Process) -> None:
+    _signal(proc, force=False)
+    try:
+        await asyncio.wait_for(proc.wait(), KILL_GRACE_SECS)
+    except TimeoutError:
+        _signal(proc, force=True)
+        await proc.wait()
 
 
 # ----------------------------
@@ -105,10 +267,50 @@ class StepResult:
 # ----------------------------
 
 
+# Steps en paralelo por defecto (executor.max_workers en config/agents.yaml)
+DEFAULT_MAX_WORKERS = 4
+
+# Eventos/tareas se encolan y se escriben juntos al terminar cada tanda de steps, o antes si se
+# acumulan FLUSH_MAX_ROWS registros o pasan FLUSH_MAX_SECS desde el primero pendiente
+FLUSH_MAX_ROWS = 64
+FLUSH_MAX_SECS = 1.0
+
+# Loops con conexión abierta: al salir del proceso se escribe lo pendiente
+_LIVE: weakref.WeakSet[ExecutorLoop] = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all() -> None:
+    for loop in list(_LIVE):
+        try:
+            loop.close()
+        except sqlite3.Error:
+            pass
+
+
 class ExecutorLoop:
-    def __init__(self, db_path: Path = DEFAULT_DB_PATH):
+    def __init__(
+        self,
+        db_path: Path = DEFAULT_DB_PATH,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        timeout_s: float = 0.0,
+        artifacts_dir: str | Path = DEFAULT_ARTIFACTS_DIR,
+        spill_bytes: int = DEFAULT_SPILL_BYTES,
+        use_cache: bool = True,
+    ):
         self.db_path = Path(db_path)
+        self.max_workers = max(1, int(max_workers))
+        self.timeout_s = float(timeout_s or 0)  # default de los steps sin timeout_s; 0 = sin límite
+        self.artifacts_dir = Path(artifacts_dir)
+        self.spill_bytes = max(0, int(spill_bytes))  # 0 = nunca desbordar a artifacts
+        self.use_cache = bool(use_cache)  # False: los steps con "cache" corren siempre
+        self._digests: dict[tuple[str, int, int], str] = {}  # sha256 de inputs por (ruta, tamaño, mtime)
+        self._aloop: asyncio.AbstractEventLoop | None = None
+        self._stop: asyncio.Event | None = None
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn: sqlite3.Connection | None = None
+        self._pending: list[tuple[str, tuple[Any, ...]]] = []
+        self._pending_since = 0.0
         self._ensure_schema()
 
     # ---- JSON parsing que piden los tests ----
@@ -172,14 +374,58 @@ class ExecutorLoop:
 
     # ---- DB helpers ----
     def _connect(self):
-        return sqlite3.connect(str(self.db_path))
+        conn = sqlite3.connect(str(self.db_path))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _db(self) -> sqlite3.Connection:
+        """
+        Conexión única del loop (se abre al primer uso y vive hasta close()). Todos los registros
+        se hacen desde el hilo que creó el loop y corre run() (el event loop de los steps vive ahí;
+        los hilos de asyncio.to_thread no tocan la DB), así que no hace falta lock.
+        """
+        if self._conn is None:
+            self._conn = self._connect()
+            _LIVE.add(self)
+        return self._conn
+
+    def _queue(self, sql: str, params: tuple[Any, ...]) -> None:
+        """Encola un INSERT/UPDATE; se escribe en el próximo flush (o ya, si se pasa de FLUSH_MAX_*)."""
+        if not self._pending:
+            self._pending_since = time.monotonic()
+        self._pending.append((sql, params))
+        if len(self._pending) >= FLUSH_MAX_ROWS or time.monotonic() - self._pending_since >= FLUSH_MAX_SECS:
+            self.flush()
+
+    def flush(self) -> None:
+        """Escribe lo encolado en una sola transacción."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        conn = self._db()
+        with conn:
+            for sql, params in pending:
+                conn.execute(sql, params)
+
+    def close(self) -> None:
+        """flush() y cierra la conexión (se vuelve a abrir si el loop se usa de nuevo)."""
+        try:
+            self.flush()
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            _LIVE.discard(self)
 
     def _ensure_schema(self):
-        with self._connect() as conn:
+        conn = self._db()
+        with conn:
             # Crea si no existen
             conn.execute(SCHEMA_RUNS)
             conn.execute(SCHEMA_EVENTS)
             conn.execute(SCHEMA_TASKS)
+            conn.execute(SCHEMA_ARTIFACTS)
 
             def have_cols(table: str) -> dict:
                 return {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({table})")}
@@ -226,32 +472,42 @@ class ExecutorLoop:
                 "stdout": "TEXT",
                 "stderr": "TEXT",
                 "result_json": "TEXT",
+                "stdout_artifact": "TEXT",
+                "stderr_artifact": "TEXT",
+                "cache_key": "TEXT",
             }
             cols = have_cols("tasks")
             for col, typ in want_tasks.items():
                 if col not in cols:
                     conn.execute(f"ALTER TABLE tasks ADD COLUMN {col} {typ}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_cache_key ON tasks(cache_key)")
 
-            conn.commit()
+            # artifacts: la tabla puede venir de db-init (memoria/db/wilbito.db) sin estas columnas
+            want_artifacts = {"sha256": "TEXT", "codec": "TEXT", "stored_bytes": "INTEGER"}
+            cols = have_cols("artifacts")
+            for col, typ in want_artifacts.items():
+                if col not in cols:
+                    conn.execute(f"ALTER TABLE artifacts ADD COLUMN {col} {typ}")
 
     def _insert_run(self, run_name: str) -> int:
-        with self._connect() as conn:
-            ts = _now_iso()
+        # Directo (no se encola): hace falta el id para los registros del run
+        self.flush()
+        ts = _now_iso()
+        conn = self._db()
+        with conn:
             cur = conn.execute(
                 "INSERT INTO runs(name, started_at, status, meta_json, run_name, created_at, updated_at) "
                 "VALUES(?, ?, ?, ?, ?, ?, ?)",
                 (run_name, ts, "running", None, run_name, ts, ts),
             )
-            conn.commit()
-            return int(cur.lastrowid)
+        return int(cur.lastrowid)
 
     def _finish_run(self, run_id: int, status: str, meta: dict[str, Any] | None = None):
-        with self._connect() as conn:
-            conn.execute(
-                "UPDATE runs SET finished_at=?, status=?, meta_json=?, updated_at=? WHERE id=?",
-                (_now_iso(), status, json.dumps(meta) if meta else None, _now_iso(), run_id),
-            )
-            conn.commit()
+        self._queue(
+            "UPDATE runs SET finished_at=?, status=?, meta_json=?, updated_at=? WHERE id=?",
+            (_now_iso(), status, json.dumps(meta) if meta else None, _now_iso(), run_id),
+        )
+        self.flush()
 
     def _event(
         self,
@@ -260,12 +516,10 @@ class ExecutorLoop:
         details: dict[str, Any] | None = None,
         run_id: int | None = None,
     ):
-        with self._connect() as conn:
-            conn.execute(
-                "INSERT INTO events(run_id, ts, level, event, details_json, created_at) VALUES(?,?,?,?,?,?)",
-                (run_id, _now_iso(), level, event, json.dumps(details or {}), _now_iso()),
-            )
-            conn.commit()
+        self._queue(
+            "INSERT INTO events(run_id, ts, level, event, details_json, created_at) VALUES(?,?,?,?,?,?)",
+            (run_id, _now_iso(), level, event, json.dumps(details or {}), _now_iso()),
+        )
 
     def _record_task(
         self,
@@ -279,37 +533,330 @@ class ExecutorLoop:
         stdout: str,
         stderr: str,
         result: dict[str, Any] | None,
+        stdout_artifact: Artifact | None = None,
+        stderr_artifact: Artifact | None = None,
+        cache_key: str | None = None,
     ):
-        with self._connect() as conn:
-            conn.execute(
-                "INSERT INTO tasks(run_id, step_id, cmd, status, rc, started_at, finished_at, stdout, stderr, result_json) "
-                "VALUES(?,?,?,?,?,?,?,?,?,?)",
+        # Salidas desbordadas: la tarea guarda un preview y la ruta del artifact, que se registra una vez por sha256
+        for kind, art in (("stdout", stdout_artifact), ("stderr", stderr_artifact)):
+            if art is None:
+                continue
+            self._queue(
+                "INSERT INTO artifacts(run_id, path, kind, bytes, meta_json, created_at, sha256, codec, stored_bytes) "
+                "SELECT ?,?,?,?,?,?,?,?,? WHERE NOT EXISTS (SELECT 1 FROM artifacts WHERE sha256=?)",
                 (
                     run_id,
-                    step_id,
-                    cmd_str,
-                    status,
-                    rc,
-                    started_at,
-                    finished_at,
-                    stdout,
-                    stderr,
-                    json.dumps(result) if result is not None else None,
+                    art.path,
+                    kind,
+                    art.size,
+                    json.dumps({"step_id": step_id}),
+                    _now_iso(),
+                    art.sha256,
+                    art.codec,
+                    art.stored,
+                    art.sha256,
                 ),
             )
-            conn.commit()
+        if stdout_artifact is not None:
+            stdout = preview(stdout, SPILL_PREVIEW_CHARS)
+        if stderr_artifact is not None:
+            stderr = preview(stderr, SPILL_PREVIEW_CHARS)
+        self._queue(
+            "INSERT INTO tasks(run_id, step_id, cmd, status, rc, started_at, finished_at, stdout, stderr, result_json, "
+            "stdout_artifact, stderr_artifact, cache_key) VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            (
+                run_id,
+                step_id,
+                cmd_str,
+                status,
+                rc,
+                started_at,
+                finished_at,
+                stdout,
+                stderr,
+                json.dumps(result) if result is not None else None,
+                stdout_artifact.path if stdout_artifact else None,
+                stderr_artifact.path if stderr_artifact else None,
+                cache_key,
+            ),
+        )
+
+    def _cache_key(self, step: dict[str, Any]) -> str | None:
+        """Clave de cache del step (None sin "cache" o con use_cache=False). Lee los inputs: corre en un hilo."""
+        if not self.use_cache:
+            return None
+        return step_cache_key(step, Path.cwd(), memo=self._digests)
+
+    def _cache_lookup(self, step: dict[str, Any], key: str) -> CommandResult | None:
+        """
+        Hit de cache: la última tarea ok con la misma clave, si siguen existiendo los outputs
+        declarados del step y los artifacts de su salida.
+        """
+        self.flush()  # una tarea igual de este mismo run puede estar encolada
+        row = (
+            self._db()
+            .execute(
+                "SELECT id, rc, stdout, stderr, result_json, stdout_artifact, stderr_artifact FROM tasks "
+                "WHERE cache_key=? AND status='ok' ORDER BY id DESC LIMIT 1",
+                (key,),
+            )
+            .fetchone()
+        )
+        if row is None or not outputs_present(step, Path.cwd()):
+            return None
+        task_id, rc, stdout, stderr, result_json, out_path, err_path = row
+        arts = [self._artifact_row(p) for p in (out_path, err_path)]
+        if any(p and (a is None or not Path(a.path).exists()) for p, a in zip((out_path, err_path), arts, strict=True)):
+            return None
+        now = _now_iso()
+        return CommandResult(
+            started=now,
+            finished=now,
+            rc=int(rc or 0),
+            stdout=stdout or "",
+            stderr=stderr or "",
+            stdout_artifact=arts[0],
+            stderr_artifact=arts[1],
+            cache_key=key,
+            cached_from=int(task_id),
+            result=json.loads(result_json) if result_json else None,
+        )
+
+    def _artifact_row(self, path: str | None) -> Artifact | None:
+        if not path:
+            return None
+        row = (
+            self._db()
+            .execute("SELECT path, sha256, codec, bytes, stored_bytes FROM artifacts WHERE path=? LIMIT 1", (path,))
+            .fetchone()
+        )
+        return Artifact(row[0], row[1], row[2], int(row[3] or 0), int(row[4] or 0)) if row else None
 
     # ---- Exec helpers ----
-    def _run_command(self, cmd: Sequence[str]) -> tuple[int, str, str]:
+    def _run_command(self, cmd: Sequence[str], timeout_s: float = 0.0) -> tuple[int, str, str]:
         """
         Ejecuta un comando y devuelve (rc, stdout, stderr) como strings.
         """
-        proc = subprocess.run(
-            list(cmd),
-            capture_output=True,
-            text=True,
+        res = asyncio.run(self._spawn(cmd, timeout_s))
+        return res.rc, res.stdout, res.stderr
+
+    async def _spawn(
+        self,
+        cmd: Sequence[str],
+        timeout_s: float = 0.0,
+        stop: asyncio.Event | None = None,
+        run_id: int | None = None,
+        step_id: str | None = None,
+    ) -> CommandResult:
+        """
+        Corre cmd leyendo stdout/stderr a medida que salen (ver _pump). Con timeout_s > 0, o si se
+        activa stop, termina el proceso (y sus hijos). Si cancelan la corrutina, también lo mata.
+        Las salidas de steps (con run_id) que pasan spill_bytes quedan completas en un artifact.
+        """
+        started = _now_iso()
+        if not cmd:
+            return CommandResult(started, _now_iso(), 127, "", "Step sin cmd.")
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *[str(c) for c in cmd],
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=(os.name == "posix"),
+            )
+        except OSError as e:
+            return CommandResult(started, _now_iso(), 127, "", f"No se pudo ejecutar {list(cmd)}: {e}")
+
+        out, err = _OutputBuffer(), _OutputBuffer()
+        io = asyncio.ensure_future(
+            asyncio.gather(
+                self._pump(proc.stdout, out, run_id, step_id, "stdout", spill=run_id is not None),
+                self._pump(proc.stderr, err, run_id, step_id, "stderr", spill=run_id is not None),
+                proc.wait(),
+            )
+        )
+        waiters: set[asyncio.Future[Any]] = {io}
+        stopper = asyncio.ensure_future(stop.wait()) if stop is not None else None
+        if stopper is not None:
+            waiters.add(stopper)
+        finished_io = False
+        try:
+            await asyncio.wait(waiters, timeout=timeout_s or None, return_when=asyncio.FIRST_COMPLETED)
+            finished_io = io.done()
+            if finished_io:
+                io.result()
+        finally:
+            if stopper is not None:
+                stopper.cancel()
+            if not io.done():
+                io.cancel()
+            if proc.returncode is None:
+                await _kill(proc)
+
+        cancelled = not finished_io and stop is not None and stop.is_set()
+        return CommandResult(
+            started=started,
+            finished=_now_iso(),
+            rc=proc.returncode if proc.returncode is not None else -1,
+            stdout=out.text(),
+            stderr=err.text(),
+            timed_out=not finished_io and not cancelled,
+            cancelled=cancelled,
+            stdout_artifact=out.artifact,
+            stderr_artifact=err.artifact,
+        )
+
+    async def _pump(
+        self,
+        stream: asyncio.StreamReader | None,
+        buf: _OutputBuffer,
+        run_id: int | None,
+        step_id: str | None,
+        name: str,
+        spill: bool = False,
+    ) -> None:
+        """
+        Lee un stream por bloques, lo parte en líneas hacia buf y, con run_id, a eventos "step output".
+        Con spill, si pasa self.spill_bytes, el stream completo va a un artifact (buf.artifact),
+        también si el step se corta a mitad.
+        """
+        if stream is None:
+            return
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        partial = ""
+        batch: list[str] = []
+        sent = 0
+        last = time.monotonic()
+        held = bytearray()  # primeros bytes, hasta saber si hace falta el artifact
+        writer: ArtifactWriter | None = None
+
+        def add(line: str) -> None:
+            line = line.replace("\r\n", "\n")
+            buf.add(line)
+            if run_id is not None and sent + len(batch) < OUTPUT_EVENT_MAX_LINES:
+                batch.append(line.rstrip("\n"))
+
+        def emit() -> None:
+            nonlocal sent, last
+            if batch:
+                self._event("info", "step output", {"step_id": step_id, "stream": name, "lines": list(batch)}, run_id=run_id)
+                sent += len(batch)
+                batch.clear()
+            last = time.monotonic()
+
+        try:
+            while True:
+                chunk = await stream.read(READ_CHUNK)
+                if not chunk:
+                    break
+                if writer is not None:
+                    writer.write(chunk)
+                elif spill and self.spill_bytes:
+                    held += chunk
+                    if len(held) > self.spill_bytes:
+                        writer = ArtifactWriter(self.artifacts_dir)
+                        writer.write(bytes(held))
+                        held.clear()
+                lines = (partial + decoder.decode(chunk)).split("\n")
+                partial = lines.pop()
+                for line in lines:
+                    add(line + "\n")
+                while len(partial) > OUTPUT_LINE_MAX:
+                    add(partial[:OUTPUT_LINE_MAX] + "\n")
+                    partial = partial[OUTPUT_LINE_MAX:]
+                if len(batch) >= OUTPUT_EVENT_LINES or time.monotonic() - last >= FLUSH_MAX_SECS:
+                    emit()
+            partial += decoder.decode(b"", final=True)
+            if partial:
+                add(partial)
+            emit()
+        finally:
+            if writer is not None:
+                buf.artifact = writer.commit()
+
+    def _step_outcome(
+        self, step: dict[str, Any], cmd: Sequence[str], rc: int, stdout: str, stderr: str
+    ) -> tuple[str, str | None, dict[str, Any] | None]:
+        """(status, error, result JSON) de un step según rc y, con expect_json, su salida."""
+        expect_json: bool = bool(step.get("expect_json"))
+        must_have = step.get("must_have") or []
+        fail_if_empty_fields = step.get("fail_if_empty_fields") or []
+
+        result_obj: dict[str, Any] | None = None
+        step_status = "ok"
+        step_err: str | None = None
+
+        if expect_json:
+            try:
+                data = self._extract_first_json_obj(stdout)
+            except Exception:
+                data = None
+            if data is None:
+                # No pudimos parsear JSON (o wrapper rompió JSON cuando falla)
+                step_status = "error"
+                step_err = (
+                    f"Salida no JSON de {cmd}: (rc={rc})\n"
+                    f"STDOUT(preview):\n{stdout[:2000]}\n\n"
+                    f"STDERR(preview):\n{stderr[:2000]}"
+                )
+            else:
+                # Validar contenido si corresponde
+                val_err = self._validate_json_result(data, must_have, fail_if_empty_fields)
+                if val_err:
+                    step_status = "error"
+                    step_err = f"JSON inválido: {val_err}"
+                else:
+                    result_obj = data
+                    # Si el proceso devolvió rc != 0 aun con JSON, consideramos error.
+                    if rc != 0:
+                        step_status = "error"
+                        step_err = f"Comando devolvió rc={rc} con JSON. STDERR(preview):\n{stderr[:2000]}"
+        else:
+            # No espera JSON: rc distinto de 0 es fallo.
+            if rc != 0:
+                step_status = "error"
+                step_err = f"Comando devolvió rc={rc}.\nSTDOUT(preview):\n{stdout[:2000]}\n\nSTDERR(preview):\n{stderr[:2000]}"
+        return step_status, step_err, result_obj
+
+    def _finish_step(self, run_id: int, step: dict[str, Any], res: CommandResult) -> StepResult:
+        """Evalúa un step terminado y lo registra (tarea + evento). Corre en el hilo del scheduler."""
+        step_id = str(step.get("step_id", "step"))
+        cmd: Sequence[str] = step.get("cmd") or []
+        if res.cached_from is not None:
+            step_status, step_err, result_obj = "ok", None, res.result
+        elif res.timed_out or res.cancelled:
+            step_status, result_obj = "error", None
+            why = f"superó timeout_s={self._step_timeout(step):g}" if res.timed_out else "se canceló el run"
+            step_err = f"Step cortado ({why}); se terminó el proceso.\nSTDERR(preview):\n{res.stderr[-2000:]}"
+        else:
+            step_status, step_err, result_obj = self._step_outcome(step, cmd, res.rc, res.stdout, res.stderr)
+
+        self._record_task(
+            run_id=run_id,
+            step_id=step_id,
+            cmd_str=cmd[0] if cmd else "",
+            status=step_status,
+            rc=res.rc,
+            started_at=res.started,
+            finished_at=res.finished,
+            stdout=res.stdout,
+            stderr=res.stderr,
+            result=result_obj,
+            stdout_artifact=res.stdout_artifact,
+            stderr_artifact=res.stderr_artifact,
+            cache_key=res.cache_key,
         )
-        return proc.returncode, proc.stdout or "", proc.stderr or ""
+
+        if res.cached_from is not None:
+            self._event("info", "step cached", {"step_id": step_id, "from_task": res.cached_from}, run_id=run_id)
+            return StepResult(step_id, (cmd[0] if cmd else ""), "ok", result=result_obj, cached=True)
+        if step_status == "ok":
+            self._event("info", "step ok", {"step_id": step_id}, run_id=run_id)
+            return StepResult(step_id=step_id, command=(cmd[0] if cmd else ""), status="ok", result=result_obj)
+        self._event("error", "step error", {"step_id": step_id, "error": step_err}, run_id=run_id)
+        return StepResult(step_id=step_id, command=(cmd[0] if cmd else ""), status="error", error=step_err)
+
+    def _step_timeout(self, step: dict[str, Any]) -> float:
+        return float(step.get("timeout_s") or self.timeout_s or 0)
 
     def _validate_json_result(
         self,
@@ -342,6 +889,107 @@ class ExecutorLoop:
             return "; ".join(errors)
         return None
 
+    async def _schedule(
+        self,
+        run_id: int,
+        steps: list[dict[str, Any]],
+        deps: list[list[int]],
+        workers: int,
+        executed: list[StepResult],
+        skipped: list[str],
+    ) -> bool:
+        """
+        Corre el DAG en un event loop: un semáforo limita los procesos simultáneos y cada tanda de
+        steps terminados se registra (y se hace flush) junto. Devuelve False si algún step falló.
+        """
+        stop = self._stop = asyncio.Event()
+        self._aloop = asyncio.get_running_loop()
+        sem = asyncio.Semaphore(workers)
+        children = _children(deps)
+        waiting = [len(d) for d in deps]
+        blocked: set[int] = set()  # algún ancestro falló
+        ready = deque(i for i, n in enumerate(waiting) if n == 0)
+        running: dict[asyncio.Task[CommandResult | None], int] = {}
+        overall_ok = True
+
+        def skip(i: int) -> None:
+            step_id = str(steps[i].get("step_id", "step"))
+            skipped.append(step_id)
+            self._event("info", "step skipped", {"step_id": step_id}, run_id=run_id)
+
+        def release(i: int, ok: bool) -> None:
+            stack = [(i, ok)]
+            while stack:
+                j, j_ok = stack.pop()
+                for c in children[j]:
+                    waiting[c] -= 1
+                    if not j_ok:
+                        blocked.add(c)
+                    if waiting[c] > 0:
+                        continue
+                    if c in blocked:
+                        skip(c)
+                        stack.append((c, False))
+                    else:
+                        ready.append(c)
+
+        async def run_step(step: dict[str, Any]) -> CommandResult | None:
+            started = _now_iso()
+            try:
+                # Recorrer y hashear los inputs bloquea: fuera del event loop, para no frenar a los demás steps
+                key = await asyncio.to_thread(self._cache_key, step)
+            except OSError:
+                key = None  # un input desapareció a mitad del recorrido: se corre sin cache
+            hit = self._cache_lookup(step, key) if key else None
+            if hit is not None:
+                return hit  # se repite lo grabado sin lanzar el proceso
+            async with sem:
+                if stop.is_set():
+                    return None  # cancelado antes de arrancar
+                step_id = str(step.get("step_id", "step"))
+                try:
+                    res = await self._spawn(step.get("cmd") or [], self._step_timeout(step), stop, run_id, step_id)
+                except Exception as e:  # p. ej. OSError al escribir el artifact: el step falla, el run sigue
+                    res = CommandResult(started, _now_iso(), -1, "", f"Error del executor al correr el step: {e!r}")
+                res.cache_key = key
+                return res
+
+        try:
+            while ready or running:
+                while ready:
+                    i = ready.popleft()
+                    running[asyncio.ensure_future(run_step(steps[i]))] = i
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=running.__getitem__):
+                    i = running.pop(task)
+                    res = task.result()
+                    if res is None:
+                        skip(i)
+                        release(i, False)
+                        continue
+                    step_res = self._finish_step(run_id, steps[i], res)
+                    executed.append(step_res)
+                    if step_res.status != "ok":
+                        overall_ok = False  # se detiene la rama del step que falló
+                    release(i, step_res.status == "ok")
+                self.flush()  # fin de tanda: una transacción para sus tareas y eventos
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+            self._aloop = None
+        return overall_ok and not stop.is_set()
+
+    def cancel(self) -> None:
+        """
+        Corta el run en curso (se puede llamar desde otro hilo): termina los procesos de los steps
+        que están corriendo, que quedan como error, y no arranca más; después corre el rollback.
+        """
+        aloop, stop = self._aloop, self._stop
+        if aloop is not None and stop is not None:
+            aloop.call_soon_threadsafe(stop.set)
+
     # ----------------------------
     # API pública
     # ----------------------------
@@ -350,6 +998,31 @@ class ExecutorLoop:
         commands_path: str | Path,
         rollback_path: str | Path | None = None,
         run_name: str | None = None,
+        max_workers: int | None = None,
+    ) -> dict[str, Any]:
+        """
+        Ejecuta los steps como un DAG (ver _plan_steps): cada step arranca cuando terminaron bien
+        todos sus depends_on, con hasta max_workers (default: self.max_workers) en paralelo. Si un
+        step falla, sus descendientes no se ejecutan (quedan en "skipped") y las ramas
+        independientes siguen; al final, si hubo algún error, corre el rollback.
+        La salida de cada step se lee en streaming (cabeza + cola acotadas, ver _OutputBuffer) y
+        un step con "timeout_s" (default: self.timeout_s) que lo supera se termina y cuenta como error.
+        Un step con "cache" (ver stepcache.py) cuyo cmd, inputs y entorno no cambiaron desde su último
+        ok repite el rc, la salida y el result grabados sin lanzar el proceso ("cached": true).
+        Los registros en DB se hacen desde el hilo principal y se escriben por tandas; lo pendiente
+        se escribe siempre al salir (aunque haya una excepción).
+        """
+        try:
+            return self._run(commands_path, rollback_path, run_name, max_workers)
+        finally:
+            self.flush()
+
+    def _run(
+        self,
+        commands_path: str | Path,
+        rollback_path: str | Path | None,
+        run_name: str | None,
+        max_workers: int | None,
     ) -> dict[str, Any]:
         commands_path = Path(commands_path)
         rollback_path = Path(rollback_path) if rollback_path else None
@@ -358,11 +1031,12 @@ class ExecutorLoop:
         self._event("info", "executor start", {"commands_path": str(commands_path)}, run_id=run_id)
 
         executed: list[StepResult] = []
-        overall_ok = True
+        skipped: list[str] = []
         rollback_info: dict[str, Any] = {"status": "skipped"}
 
         try:
             steps = _read_json_file(commands_path)
+            deps = _plan_steps(steps)
         except Exception as e:
             msg = f"No se pudo leer commands.json: {e}"
             self._event("error", "commands read error", {"error": msg}, run_id=run_id)
@@ -372,95 +1046,13 @@ class ExecutorLoop:
                 "run_id": run_id,
                 "status": "failed",
                 "executed": [],
+                "skipped": [],
                 "rollback": {"status": "skipped"},
             }
 
-        # Ejecutar steps
-        for step in steps:
-            step_id = str(step.get("step_id", "step"))
-            cmd: Sequence[str] = step.get("cmd") or []
-            expect_json: bool = bool(step.get("expect_json"))
-            must_have = step.get("must_have") or []
-            fail_if_empty_fields = step.get("fail_if_empty_fields") or []
-
-            started = _now_iso()
-            rc, stdout, stderr = self._run_command(cmd)
-            finished = _now_iso()
-
-            # Construcción del resultado
-            cmd_str = " ".join(cmd) if cmd else ""
-            result_obj: dict[str, Any] | None = None
-            step_status = "ok"
-            step_err: str | None = None
-
-            if expect_json:
-                try:
-                    data = self._extract_first_json_obj(stdout)
-                except Exception:
-                    data = None
-                if data is None:
-                    # No pudimos parsear JSON (o wrapper rompió JSON cuando falla)
-                    step_status = "error"
-                    step_err = (
-                        f"Salida no JSON de {cmd}: (rc={rc})\n"
-                        f"STDOUT(preview):\n{stdout[:2000]}\n\n"
-                        f"STDERR(preview):\n{stderr[:2000]}"
-                    )
-                else:
-                    # Validar contenido si corresponde
-                    val_err = self._validate_json_result(data, must_have, fail_if_empty_fields)
-                    if val_err:
-                        step_status = "error"
-                        step_err = f"JSON inválido: {val_err}"
-                    else:
-                        result_obj = data
-                        # Si el proceso devolvió rc != 0 aun con JSON, consideramos error.
-                        if rc != 0:
-                            step_status = "error"
-                            step_err = f"Comando devolvió rc={rc} con JSON. STDERR(preview):\n{stderr[:2000]}"
-            else:
-                # No espera JSON: rc distinto de 0 es fallo.
-                if rc != 0:
-                    step_status = "error"
-                    step_err = (
-                        f"Comando devolvió rc={rc}.\nSTDOUT(preview):\n{stdout[:2000]}\n\nSTDERR(preview):\n{stderr[:2000]}"
-                    )
-
-            self._record_task(
-                run_id=run_id,
-                step_id=step_id,
-                cmd_str=cmd[0] if cmd else "",
-                status=step_status,
-                rc=rc,
-                started_at=started,
-                finished_at=finished,
-                stdout=stdout,
-                stderr=stderr,
-                result=result_obj,
-            )
-
-            if step_status == "ok":
-                executed.append(
-                    StepResult(
-                        step_id=step_id,
-                        command=(cmd[0] if cmd else ""),
-                        status="ok",
-                        result=result_obj,
-                    )
-                )
-                self._event("info", "step ok", {"step_id": step_id}, run_id=run_id)
-            else:
-                executed.append(
-                    StepResult(
-                        step_id=step_id,
-                        command=(cmd[0] if cmd else ""),
-                        status="error",
-                        error=step_err,
-                    )
-                )
-                self._event("error", "step error", {"step_id": step_id, "error": step_err}, run_id=run_id)
-                overall_ok = False
-                break  # detenemos la ejecución al primer error
+        # Ejecutar steps: los listos (dependencias cumplidas) corren en paralelo, hasta `workers` a la vez
+        workers = max(1, int(max_workers or self.max_workers))
+        overall_ok = asyncio.run(self._schedule(run_id, steps, deps, workers, executed, skipped))
 
         # Rollback si algo falló y hay rollback.json
         if not overall_ok and rollback_path and rollback_path.exists():
@@ -475,7 +1067,7 @@ class ExecutorLoop:
                 for rb in rb_steps:
                     rb_cmd: Sequence[str] = rb.get("cmd") or []
                     rb_id = str(rb.get("step_id", "rollback"))
-                    rc, stdout, stderr = self._run_command(rb_cmd)
+                    rc, stdout, stderr = self._run_command(rb_cmd, self._step_timeout(rb))
                     if rc != 0:
                         all_ok = False
                         self._event(
@@ -503,6 +1095,7 @@ class ExecutorLoop:
                         "command": r.command,
                         "status": r.status,
                         "result": r.result,
+                        **({"cached": True} if r.cached else {}),
                     }
                     if r.status == "ok"
                     else {
@@ -514,8 +1107,9 @@ class ExecutorLoop:
                 )
                 for r in executed
             ],
+            "skipped": skipped,
             "rollback": rollback_info,
         }
 
-        self._finish_run(run_id, out["status"], {"executed": len(executed)})
+        self._finish_run(run_id, out["status"], {"executed": len(executed), "skipped": len(skipped)})
         return out
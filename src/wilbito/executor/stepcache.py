@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import os
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any
+
+# Partes de ruta que no cuentan como input (las generan las propias corridas)
+IGNORED_PARTS = {"__pycache__", ".pytest_cache", ".mypy_cache", ".ruff_cache", ".git"}
+
+
+def cache_spec(step: dict[str, Any]) -> dict[str, list[str]] | None:
+    """
+    "cache" de un step normalizado a {"inputs", "env", "outputs"} (listas de str), o None si el
+    step no usa cache. Acepta true (sólo cmd) o un dict con esas claves.
+    """
+    raw = step.get("cache")
+    if not raw:
+        return None
+    raw = raw if isinstance(raw, dict) else {}
+
+    def as_list(key: str) -> list[str]:
+        val = raw.get(key) or []
+        return [val] if isinstance(val, str) else [str(v) for v in val]
+
+    return {"inputs": as_list("inputs"), "env": as_list("env"), "outputs": as_list("outputs")}
+
+
+def input_files(patterns: list[str], root: str | Path) -> list[str]:
+    """Archivos (relativos a root, ordenados) que matchean los globs; "src/**" incluye todo el árbol."""
+    root = Path(root)
+    found: set[str] = set()
+    for pattern in patterns:
+        for match in glob.glob(pattern, root_dir=root, recursive=True):
+            p = root / match
+            if p.is_dir() and "**" in pattern:
+                continue  # el propio glob recursivo ya lista su contenido
+            for q in p.rglob("*") if p.is_dir() else [p]:
+                rel = q.relative_to(root)
+                if q.is_file() and not IGNORED_PARTS.intersection(rel.parts) and rel.suffix != ".pyc":
+                    found.add(rel.as_posix())
+    return sorted(found)
+
+
+def file_digest(path: Path, memo: dict[tuple[str, int, int], str] | None = None) -> str:
+    """sha256 del contenido; con memo, no se relee un archivo con el mismo (ruta, tamaño, mtime)."""
+    st = path.stat()
+    key = (str(path), st.st_size, st.st_mtime_ns)
+    if memo is not None and key in memo:
+        return memo[key]
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    digest = h.hexdigest()
+    if memo is not None:
+        memo[key] = digest
+    return digest
+
+
+def step_cache_key(
+    step: dict[str, Any],
+    root: str | Path,
+    environ: Mapping[str, str] = os.environ,
+    memo: dict[tuple[str, int, int], str] | None = None,
+) -> str | None:
+    """
+    Clave de cache de un step: hash de su cmd y validaciones, el directorio de trabajo, las
+    variables de entorno declaradas y el contenido de sus inputs. None si no usa cache.
+    """
+    spec = cache_spec(step)
+    if spec is None:
+        return None
+    root = Path(root).resolve()
+    h = hashlib.sha256()
+    head = {
+        "cmd": [str(c) for c in step.get("cmd") or []],
+        "expect_json": bool(step.get("expect_json")),
+        "must_have": step.get("must_have") or [],
+        "fail_if_empty_fields": step.get("fail_if_empty_fields") or [],
+        "cwd": root.as_posix(),
+        "env": {name: environ.get(name) for name in sorted(spec["env"])},
+        "inputs": spec["inputs"],
+    }
+    h.update(json.dumps(head, sort_keys=True).encode("utf-8"))
+    for rel in input_files(spec["inputs"], root):
+        h.update(f"\0{rel}\0{file_digest(root / rel, memo)}".encode())
+    return h.hexdigest()
+
+
+def outputs_present(step: dict[str, Any], root: str | Path) -> bool:
+    """True si existen todos los "outputs" declarados (sin ellos, un hit no reproduce el efecto del step)."""
+    spec = cache_spec(step) or {"outputs": []}
+    return all((Path(root) / out).exists() for out in spec["outputs"])
@@ -1,9 +1,52 @@
-from fastapi import FastAPI
+from __future__ import annotations
+
+import os
+from typing import Any
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
 
 from .. import __version__
+from ..config import load_config
+from ..memory.service import MemoryService
 
 app = FastAPI(title="Wilbito API", version=__version__)
 
+# Store de memoria residente del proceso (se carga en el primer request de /memory/*)
+_memory: MemoryService | None = None
+
+
+def _memory_service() -> MemoryService:
+    global _memory
+    if _memory is None:
+        _memory = MemoryService.from_config(load_config(), os.getcwd())
+    return _memory
+
+
+class SearchRequest(BaseModel):
+    query: str
+    top_k: int = 5
+    min_score: float = 0.0
+    prefer_tags: list[str] | None = None
+    filter: dict[str, Any] | None = None
+
+
+class SearchManyRequest(BaseModel):
+    queries: list[str]
+    top_k: int = 5
+    min_score: float = 0.0
+    prefer_tags: list[str] | None = None
+    filter: dict[str, Any] | None = None
+
+
+class IngestEntry(BaseModel):
+    text: str
+    meta: dict[str, Any] = Field(default_factory=dict)
+
+
+class IngestRequest(BaseModel):
+    entries: list[IngestEntry]
+
 
 @app.get("/health")
 def health():
@@ -13,3 +56,31 @@ def health():
 @app.get("/status")
 def status():
     return {"status": "ready"}
+
+
+@app.post("/memory/search")
+def memory_search(req: SearchRequest):
+    try:
+        results = _memory_service().search(
+            req.query, top_k=req.top_k, min_score=req.min_score, prefer_tags=req.prefer_tags, filter=req.filter
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return {"query": req.query, "results": results}
+
+
+@app.post("/memory/search_many")
+def memory_search_many(req: SearchManyRequest):
+    try:
+        results = _memory_service().search_many(
+            req.queries, top_k=req.top_k, min_score=req.min_score, prefer_tags=req.prefer_tags, filter=req.filter
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return {"results": [{"query": q, "results": hits} for q, hits in zip(req.queries, results, strict=True)]}
+
+
+@app.post("/memory/ingest")
+def memory_ingest(req: IngestRequest):
+    ingested = _memory_service().ingest([e.model_dump() for e in req.entries])
+    return {"ok": True, "ingested": ingested}
@@ -9,7 +9,6 @@ from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 import typer
-from rich import print
 
 from wilbito.agents import council as council_agent
 
@@ -18,8 +17,24 @@ from wilbito.agents import router as router_agent
 
 # --- Config ---
 from wilbito.config import get_default, load_config
+from wilbito.memory.backup import backup_sqlite
+from wilbito.memory.context import retrieve_context
+from wilbito.memory.daemon import DaemonError, MemoryClient, serve
 from wilbito.memory.diario import write_entry
-from wilbito.memory.vectorstore import VectorStore
+from wilbito.memory.filters import normalize_filter
+from wilbito.memory.seed import DEFAULT_CHUNK, bulk_load, iter_seed_records, stream_ingest
+from wilbito.memory.service import (
+    MemoryService,
+    config_tokenizer,
+    load_store,
+    mem_db_path,
+    mem_sqlite_path,
+    open_reader,
+)
+from wilbito.memory.snapshot import MmapSnapshot, snapshot_path, write_snapshot
+from wilbito.memory.sqlite_store import SqliteVectorStore, migrate_json_to_sqlite
+from wilbito.memory.tokenizer import Tokenizer
+from wilbito.memory.vectorstore import VectorStore, wal_path
 from wilbito.tools import pr as pr_tools
 from wilbito.tools import quality as quality_tools
 from wilbito.tools import release as release_tool
@@ -39,7 +54,40 @@ def _repo_root() -> Path:
 
 
 def _mem_db_path() -> Path:
-    return _repo_root() / "memoria" / "vector_db" / "vectorstore.json"
+    return mem_db_path(_repo_root())
+
+
+def _mem_sqlite_path() -> Path:
+    return mem_sqlite_path(_repo_root())
+
+
+def _tokenizer() -> Tokenizer:
+    return config_tokenizer(CFG)
+
+
+def _load_store(scoring: str | None = None) -> VectorStore | SqliteVectorStore:
+    return load_store(CFG, _repo_root(), scoring)
+
+
+def _open_reader(scoring: str | None = None) -> VectorStore | SqliteVectorStore | MmapSnapshot:
+    return open_reader(CFG, _repo_root(), scoring)
+
+
+def _daemon() -> MemoryClient | None:
+    """Cliente del daemon de memoria (mem-serve) si está corriendo y memory.daemon lo permite."""
+    if not get_default(CFG, "memory", "daemon", True):
+        return None
+    return MemoryClient.discover(_repo_root())
+
+
+def _parse_filter(raw: str | None) -> dict[str, Any] | None:
+    """--filter / --rag-filter: JSON {clave_meta: condición} (ver wilbito.memory.filters)."""
+    if not raw:
+        return None
+    try:
+        return normalize_filter(json.loads(raw))
+    except ValueError as e:  # incluye JSONDecodeError
+        raise typer.BadParameter(f"Filtro inválido: {e}") from e
 
 
 def _ensure_parent(p: Path):
@@ -47,7 +95,8 @@ def _ensure_parent(p: Path):
 
 
 def _echo_json(obj: Any):
-    print(json.dumps(obj, ensure_ascii=False, indent=4))
+    # Salida plana (sin el word-wrap ni el markup de rich): otros procesos la parsean como JSON
+    typer.echo(json.dumps(obj, ensure_ascii=False, indent=4))
 
 
 # ----------------------------------------------------------------------
@@ -81,13 +130,14 @@ def autodev_cmd(
     top_k: int = typer.Option(get_default(CFG, "router.top_k_default", 5), help="Cantidad de resultados de memoria"),
     rag_tag: str | None = typer.Option(None, help="Tag preferente para RAG (codegen|marketing|trading)"),
     min_score: float = typer.Option(0.0, help="Umbral mínimo de score RAG (0.0-1.0)"),
+    rag_filter: str | None = typer.Option(None, help='Filtro duro de meta en JSON, ej. {"tag": "trading"}'),
 ):
     ctx: list[dict[str, Any]] = []
     if use_context:
-        db_path = _mem_db_path()
-        vdb = VectorStore.load(str(db_path))
         prefer_tags = [rag_tag] if rag_tag else None
-        ctx = vdb.search(objetivo, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags)
+        ctx = retrieve_context(
+            objetivo, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags, filter=_parse_filter(rag_filter), cfg=CFG
+        )
 
     result = {
         "objetivo": objetivo,
@@ -112,13 +162,14 @@ def council_cmd(
     top_k: int = typer.Option(get_default(CFG, "council.top_k_default", 5), help="Cantidad de resultados de memoria"),
     rag_tag: str | None = typer.Option(None, help="Tag preferente para RAG (codegen|marketing|trading)"),
     min_score: float = typer.Option(0.0, help="Umbral mínimo de score RAG (0.0-1.0)"),
+    rag_filter: str | None = typer.Option(None, help='Filtro duro de meta en JSON, ej. {"tag": "trading"}'),
 ):
     ctx: list[dict[str, Any]] = []
     if use_context:
-        db_path = _mem_db_path()
-        vdb = VectorStore.load(str(db_path))
         prefer_tags = [rag_tag] if rag_tag else None
-        ctx = vdb.search(objetivo, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags)
+        ctx = retrieve_context(
+            objetivo, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags, filter=_parse_filter(rag_filter), cfg=CFG
+        )
 
     result = council_agent.run(objetivo=objetivo, max_iter=max_iter, granularity=granularity)
     result["contexto"] = ctx
@@ -149,7 +200,7 @@ def diario_cmd(
     ingested = False
     if tag:
         db_path = _mem_db_path()
-        vdb = VectorStore.load(str(db_path))
+        vdb = _load_store()
         ingested = vdb.add_text(texto, meta={"tag": tag})
         _ensure_parent(db_path)
         vdb.save(str(db_path))
@@ -229,13 +280,14 @@ def pr_cmd(
     top_k: int = typer.Option(5, help="Resultados de memoria"),
     rag_tag: str | None = typer.Option(None, help="Tag preferente para RAG"),
     min_score: float = typer.Option(0.0, help="Umbral mínimo de score RAG"),
+    rag_filter: str | None = typer.Option(None, help='Filtro duro de meta en JSON, ej. {"tag": "codegen"}'),
 ):
     ctx: list[dict[str, Any]] = []
     if use_context:
-        db_path = _mem_db_path()
-        vdb = VectorStore.load(str(db_path))
         prefer_tags = [rag_tag] if rag_tag else None
-        ctx = vdb.search(objetivo, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags)
+        ctx = retrieve_context(
+            objetivo, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags, filter=_parse_filter(rag_filter), cfg=CFG
+        )
 
     out = pr_tools.run_pr_review(objetivo=objetivo)
     if ctx:
@@ -262,9 +314,17 @@ def mem_ingest_cmd(
     texto: str,
     etiqueta: str | None = typer.Option(None, help="Tag opcional a guardar en meta"),
 ):
+    meta = {"tag": etiqueta} if etiqueta else {}
+    client = _daemon()
+    if client is not None:
+        try:
+            _echo_json({"ok": True, "ingested": client.ingest([{"text": texto, "meta": meta}]), "tag": etiqueta})
+            return
+        except DaemonError:
+            pass  # daemon caído: escritura directa
     db_path = _mem_db_path()
-    vdb = VectorStore.load(str(db_path))
-    added = vdb.add_text(texto, meta={"tag": etiqueta} if etiqueta else {})
+    vdb = _load_store()
+    added = vdb.add_text(texto, meta=meta)
     _ensure_parent(db_path)
     vdb.save(str(db_path))
     _echo_json({"ok": True, "ingested": 1 if added else 0, "tag": etiqueta})
@@ -276,20 +336,108 @@ def mem_search_cmd(
     top_k: int = typer.Option(5, help="Resultados"),
     rag_tag: str | None = typer.Option(None, help="Tag preferente para RAG (boost)"),
     min_score: float = typer.Option(0.0, help="Umbral mínimo de score"),
+    scoring: str | None = typer.Option(None, help="cosine-tf|tfidf|bm25 (default: memory.scoring de config)"),
+    filter: str | None = typer.Option(
+        None, "--filter", help='Filtro duro de meta en JSON, ej. {"tag": ["trading"], "timestamp": {"gte": "2025-08-01"}}'
+    ),
 ):
-    db_path = _mem_db_path()
-    vdb = VectorStore.load(str(db_path))
+    flt = _parse_filter(filter)
     prefer_tags = [rag_tag] if rag_tag else None
-    results = vdb.search(query, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags)
+    # El daemon sirve el scoring de la config: con --scoring explícito se busca localmente
+    client = _daemon() if scoring is None else None
+    if client is not None:
+        try:
+            results = client.search(query, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags, filter=flt)
+            _echo_json({"query": query, "results": results})
+            return
+        except DaemonError:
+            pass
+    # Con memory.query_cache_persist, una query repetida sobre el mismo store no carga el índice
+    service = MemoryService.from_config(CFG, _repo_root(), readonly=True, scoring=scoring)
+    results = service.search(query, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags, filter=flt)
     _echo_json({"query": query, "results": results})
 
 
+@app.command("mem-search-batch")
+def mem_search_batch_cmd(
+    path: str = typer.Option("-", help='JSONL con una query por línea: {"query": str, "id"?: ...} ("-" = stdin)'),
+    top_k: int = typer.Option(5, help="Resultados por query"),
+    rag_tag: str | None = typer.Option(None, help="Tag preferente para RAG (boost)"),
+    min_score: float = typer.Option(0.0, help="Umbral mínimo de score"),
+    scoring: str | None = typer.Option(None, help="cosine-tf|tfidf|bm25 (default: memory.scoring de config)"),
+    filter: str | None = typer.Option(None, "--filter", help="Filtro duro de meta en JSON (igual que mem-search)"),
+    chunk: int = typer.Option(256, help="Queries por lote (la salida se emite al terminar cada lote)"),
+    workers: int = typer.Option(0, help="Hilos para puntuar lotes (sólo backend numpy, sin daemon)"),
+):
+    """
+    Búsqueda en lote: lee queries JSONL y escribe una línea JSON {"id", "query", "results"} por query.
+    """
+    flt = _parse_filter(filter)
+    prefer_tags = [rag_tag] if rag_tag else None
+    client = _daemon() if scoring is None else None
+    vdb: VectorStore | SqliteVectorStore | MmapSnapshot | None = None
+    src = sys.stdin if path == "-" else open(path, encoding="utf-8")
+
+    def flush(batch: list[dict[str, Any]]) -> None:
+        nonlocal client, vdb
+        queries = [r["query"] for r in batch]
+        results = None
+        if client is not None:
+            try:
+                results = client.search_many(queries, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags, filter=flt)
+            except DaemonError:
+                client = None
+        if results is None:
+            if vdb is None:
+                vdb = _open_reader(scoring)
+            results = vdb.search_many(
+                queries, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags, filter=flt, workers=workers
+            )
+        for rec, hits in zip(batch, results, strict=True):
+            out = {"id": rec.get("id"), "query": rec["query"], "results": hits}
+            sys.stdout.write(json.dumps(out, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+    batch: list[dict[str, Any]] = []
+    try:
+        for line in src:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(rec, str):
+                rec = {"query": rec}
+            if not isinstance(rec, dict) or not isinstance(rec.get("query"), str):
+                continue
+            batch.append(rec)
+            if len(batch) >= max(1, chunk):
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+
+
 @app.command("mem-backup")
 def mem_backup_cmd():
+    if get_default(CFG, "memory", "store", "json") == "sqlite":
+        # Backend SQLite: se respalda la DB activa, no el vectorstore.json (que queda viejo)
+        _echo_json(backup_sqlite(_mem_sqlite_path().as_posix()))
+        return
     src = _mem_db_path()
     if not src.exists():
         _echo_json({"ok": False, "error": f"No existe {src.as_posix()}"})
         raise typer.Exit(code=0)
+    # El backup es sólo el snapshot: primero se compacta el log pendiente
+    if wal_path(src).exists():
+        store = _load_store()
+        if isinstance(store, VectorStore):
+            store.compact(str(src))
     backups = src.parent / "backups"
     backups.mkdir(parents=True, exist_ok=True)
     ts = datetime.utcnow().strftime("%Y%m%d%H%M%S")
@@ -303,36 +451,128 @@ def mem_backup_cmd():
 
 @app.command("mem-seed")
 def mem_seed_cmd(
-    path: str = typer.Option(..., help="Ruta a seeds.jsonl (1 JSON por línea con {text, tag?})"),
+    path: str = typer.Option(..., help="Semillas: JSONL (1 JSON por línea con {text, tag?}), arreglo JSON o lista YAML"),
+    chunk: int = typer.Option(DEFAULT_CHUNK, help="Entradas por lote (se indexan y escriben al log juntas)"),
+    workers: int = typer.Option(0, help="Procesos para tokenizar lotes en paralelo (0 = en este proceso)"),
 ):
+    """
+    Carga masiva en streaming: lee el archivo por lotes (memoria acotada), los indexa y persiste
+    a medida que avanza, y reporta el progreso (items/s) por stderr.
+    """
     src = Path(path)
     if not src.exists():
         _echo_json({"ok": False, "error": f"No existe {src.as_posix()}"})
         raise typer.Exit(code=0)
 
     db_path = _mem_db_path()
-    vdb = VectorStore.load(str(db_path))
+    last = [0.0]
 
-    ingested = 0
-    with open(src, encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                obj = json.loads(line)
-                text = obj.get("text")
-                tag = obj.get("tag")
-                if text:
-                    if vdb.add_text(text, meta={"tag": tag} if tag else {}):
-                        ingested += 1
-            except Exception:
-                # línea inválida, la ignoramos
-                continue
+    def progress(stats: dict[str, Any]) -> None:
+        if stats["secs"] - last[0] >= 1.0:
+            last[0] = stats["secs"]
+            typer.echo(
+                f"[mem-seed] {stats['read']} leídas, {stats['ingested']} ingestadas, {stats['items_per_s']} items/s", err=True
+            )
 
-    _ensure_parent(db_path)
-    vdb.save(str(db_path))
-    _echo_json({"ok": True, "ingested": ingested, "db": db_path.as_posix()})
+    client = _daemon()
+    if client is not None:
+        try:
+            client.ping()
+        except DaemonError:
+            client = None
+    try:
+        if client is not None:
+            stats = stream_ingest(client.ingest, iter_seed_records(src), chunk=chunk, progress=progress)
+        else:
+            _ensure_parent(db_path)
+            stats = bulk_load(_load_store(), iter_seed_records(src), db_path, chunk=chunk, workers=workers, progress=progress)
+    except (ValueError, RuntimeError) as e:  # formato inválido, sin PyYAML o daemon caído a mitad de carga
+        _echo_json({"ok": False, "error": str(e)})
+        raise typer.Exit(code=1) from e
+    _echo_json({"ok": True, **stats, "db": db_path.as_posix()})
+
+
+@app.command("mem-snapshot")
+def mem_snapshot_cmd():
+    """
+    Compacta la memoria y genera vectorstore.snap (formato binario para búsquedas vía mmap).
+    Con memory.snapshot: true se regenera solo en cada compactación.
+    """
+    src = _mem_db_path()
+    vdb = _load_store()
+    if not isinstance(vdb, VectorStore):
+        _echo_json({"ok": False, "error": "mem-snapshot sólo aplica a memory.store: json (SQLite ya se lee sin cargar todo)"})
+        raise typer.Exit(code=1)
+    vdb.compact(str(src))
+    _echo_json(write_snapshot(vdb, snapshot_path(src), source=src))
+
+
+@app.command("mem-compact")
+def mem_compact_cmd(
+    dry_run: bool = typer.Option(False, "--dry-run", help="Sólo contar los items vencidos, sin modificar la memoria"),
+):
+    """
+    Retención: saca de la memoria los items vencidos según memory.ttl_days / memory.max_items
+    (archivándolos en memoria/vector_db/cold/ o descartándolos según memory.retention) y compacta.
+    """
+    client = _daemon()
+    if client is not None:
+        try:
+            _echo_json({"ok": True, **client.retention(dry_run=dry_run)})
+            return
+        except DaemonError:
+            pass  # daemon caído: se compacta en este proceso
+    try:
+        stats = MemoryService.from_config(CFG, _repo_root()).enforce_retention(dry_run=dry_run)
+    except ValueError as e:
+        _echo_json({"ok": False, "error": str(e)})
+        raise typer.Exit(code=1) from e
+    _echo_json({"ok": True, **stats})
+
+
+@app.command("mem-serve")
+def mem_serve_cmd(
+    port: int | None = typer.Option(None, help="Escuchar en 127.0.0.1:PORT (default: socket Unix en memoria/vector_db)"),
+    stop: bool = typer.Option(False, "--stop", help="Detener el daemon que esté corriendo"),
+):
+    """
+    Daemon de memoria: mantiene el store cargado y atiende mem-search, mem-search-batch, mem-ingest,
+    mem-seed y el contexto RAG del consejo sin recargar el índice en cada llamada.
+    """
+    if stop:
+        client = MemoryClient.discover(_repo_root())
+        if client is None:
+            _echo_json({"ok": False, "error": "No hay daemon de memoria corriendo"})
+            raise typer.Exit(code=0)
+        try:
+            client.shutdown()
+        except DaemonError as e:
+            _echo_json({"ok": False, "error": str(e)})
+            raise typer.Exit(code=1) from e
+        _echo_json({"ok": True, "stopped": client.address})
+        return
+    service = MemoryService.from_config(CFG, _repo_root())
+    n = len(service.store())
+    typer.echo(f"[mem-serve] {n} items cargados; Ctrl+C para detener", err=True)
+    try:
+        every = float(get_default(CFG, "memory", "retention_interval_h", 0) or 0) * 3600.0
+        serve(service, _repo_root(), port=port, retention_every=every)
+    except DaemonError as e:
+        _echo_json({"ok": False, "error": str(e)})
+        raise typer.Exit(code=1) from e
+
+
+@app.command("mem-migrate-sqlite")
+def mem_migrate_sqlite_cmd():
+    """
+    Migra memoria/vector_db/vectorstore.json (+ log) a vectorstore.db (SQLite + FTS5).
+    Activar luego con memory.store: sqlite en config/agents.yaml.
+    """
+    src = _mem_db_path()
+    if not src.exists():
+        _echo_json({"ok": False, "error": f"No existe {src.as_posix()}"})
+        raise typer.Exit(code=0)
+    _echo_json(migrate_json_to_sqlite(src, _mem_sqlite_path(), tokenizer=_tokenizer()))
 
 
 # ----------------------------------------------------------------------
@@ -11,10 +11,13 @@ import typer
 from rich import print
 
 from wilbito.agents.council_v2 import run_council_v2
+from wilbito.config import get_default, load_config
 from wilbito.executor.loop import ExecutorLoop
 
 app = typer.Typer(help="Exec/DB/Council v2")
 
+CFG: dict[str, Any] = load_config()
+
 
 # -------------------------------------------------------------------
 # Paths & DB helpers
@@ -146,13 +149,30 @@ def executor_run_cmd(
     commands: str = typer.Option(..., help="Ruta a config/commands.json"),
     rollback: str | None = typer.Option(None, help="Ruta a config/rollback.json"),
     run_name: str | None = typer.Option(None, help="Nombre del run (opcional)"),
+    workers: int = typer.Option(
+        get_default(CFG, "executor", "max_workers", 4), help="Steps en paralelo (los que no dependen entre sí)"
+    ),
+    timeout: float = typer.Option(
+        get_default(CFG, "executor", "timeout_s", 0), help="Timeout por step sin timeout_s propio (0 = sin límite)"
+    ),
+    cache: bool = typer.Option(
+        get_default(CFG, "executor", "step_cache", True), help="Repetir steps con cache si no cambiaron sus inputs"
+    ),
 ):
     """
-    Ejecuta una lista secuencial de comandos (JSON) con logging en DB y manejo de rollback.
+    Ejecuta los comandos (JSON) respetando sus depends_on (sin la clave, cada step espera al
+    anterior), con logging en DB y manejo de rollback. Un step que supera su timeout_s se termina.
     """
     ensure_parent(db_path())
     db_init()
-    loop = ExecutorLoop(db_path=db_path().as_posix())
+    loop = ExecutorLoop(
+        db_path=db_path().as_posix(),
+        max_workers=workers,
+        timeout_s=timeout,
+        artifacts_dir=repo_root() / "artifacts" / "executor",
+        spill_bytes=int(get_default(CFG, "executor", "spill_kb", 16)) * 1024,
+        use_cache=cache,
+    )
     res = loop.run(commands_path=commands, rollback_path=rollback, run_name=run_name)
     _echo_json(res)
 
@@ -160,10 +180,14 @@ def executor_run_cmd(
 @app.command("council-v2")
 def council_v2_cmd(
     objetivo: str = typer.Argument(...),
-    use_context: bool = typer.Option(False, help="(Opcional) integrar RAG con mem-search"),
+    use_context: bool = typer.Option(False, help="(Opcional) integrar RAG (memoria en proceso o daemon)"),
     top_k: int = typer.Option(5, help="Resultados de memoria"),
     rag_tag: str | None = typer.Option(None, help="Tag preferente (codegen|marketing|trading)"),
     min_score: float = typer.Option(0.0, help="Score mínimo"),
+    rag_isolated: bool = typer.Option(
+        get_default(CFG, "council", "rag_isolated", False),
+        help="Buscar contexto en un subproceso mem-search (aislado) en vez de en proceso",
+    ),
 ):
     """
     Invoca el consejo v2, guarda eventos en DB, y devuelve un dict con RFC + research + plan.
@@ -177,6 +201,7 @@ def council_v2_cmd(
         top_k=top_k,
         rag_tag=rag_tag,
         min_score=min_score,
+        rag_isolated=rag_isolated,
     )
     _echo_json(result)
 
@@ -1,12 +1,16 @@
 import datetime
 import os
 import shutil
+import sqlite3
+
+from wilbito.memory.vectorstore import VectorStore, wal_path
 
 
 def backup_vectorstore(db_dir: str = "memoria/vector_db", backup_dir: str | None = None):
     """
     Copia memoria/vector_db/vectorstore.json a memoria/vector_db/backups/vectorstore_YYYYmmddHHMMSS.json
     y además actualiza backups/vectorstore_latest.json
+    (si hay log append-only pendiente, se compacta antes en el snapshot)
     """
     if backup_dir is None:
         backup_dir = os.path.join(db_dir, "backups")
@@ -15,6 +19,8 @@ def backup_vectorstore(db_dir: str = "memoria/vector_db", backup_dir: str | None
     src = os.path.join(db_dir, "vectorstore.json")
     if not os.path.exists(src):
         return {"ok": False, "error": f"No existe {src}"}
+    if wal_path(src).exists():
+        VectorStore.load(src).compact(src)
 
     ts = datetime.datetime.utcnow().strftime("%Y%m%d%H%M%S")
     dst = os.path.join(backup_dir, f"vectorstore_{ts}.json")
@@ -24,3 +30,32 @@ def backup_vectorstore(db_dir: str = "memoria/vector_db", backup_dir: str | None
     shutil.copy2(src, latest)
 
     return {"ok": True, "backup": dst, "latest": latest}
+
+
+def backup_sqlite(db_path: str, backup_dir: str | None = None):
+    """
+    Backup consistente de vectorstore.db (API de backup de SQLite: sirve con la DB en uso) a
+    backups/vectorstore_YYYYmmddHHMMSS.db y actualiza backups/vectorstore_latest.db
+    """
+    if backup_dir is None:
+        backup_dir = os.path.join(os.path.dirname(db_path), "backups")
+    if not os.path.exists(db_path):
+        return {"ok": False, "error": f"No existe {db_path}"}
+    os.makedirs(backup_dir, exist_ok=True)
+
+    ts = datetime.datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    dst = os.path.join(backup_dir, f"vectorstore_{ts}.db")
+    src_conn = sqlite3.connect(db_path)
+    try:
+        dst_conn = sqlite3.connect(dst)
+        try:
+            src_conn.backup(dst_conn)
+        finally:
+            dst_conn.close()
+    finally:
+        src_conn.close()
+
+    latest = os.path.join(backup_dir, "vectorstore_latest.db")
+    shutil.copy2(dst, latest)
+
+    return {"ok": True, "backup": dst, "latest": latest}
@@ -1,9 +1,50 @@
-from typing import Any, Dict, List
+from __future__ import annotations
 
-from wilbito.memory.vectorstore import VectorStore
+import os
+from pathlib import Path
+from typing import Any
 
+from wilbito.config import get_default, load_config
+from wilbito.memory.daemon import DaemonError, MemoryClient
+from wilbito.memory.service import shared_service
 
-def retrieve_context(query: str, top_k: int = 5) -> list[dict[str, Any]]:
-    vs = VectorStore()
-    hits = vs.search(query, top_k=top_k)
-    return hits
+# load_config() por directorio de trabajo, invalidada por mtime de config/agents.yaml (parsear el YAML cuesta ~3 ms)
+_CFG_CACHE: dict[str, tuple[int | None, dict[str, Any]]] = {}
+
+
+def _config() -> dict[str, Any]:
+    cwd = os.getcwd()
+    try:
+        mtime: int | None = (Path(cwd) / "config" / "agents.yaml").stat().st_mtime_ns
+    except OSError:
+        mtime = None
+    cached = _CFG_CACHE.get(cwd)
+    if cached is None or cached[0] != mtime:
+        cached = _CFG_CACHE[cwd] = (mtime, load_config())
+    return cached[1]
+
+
+def retrieve_context(
+    query: str,
+    top_k: int = 5,
+    min_score: float = 0.0,
+    prefer_tags: list[str] | None = None,
+    filter: dict[str, Any] | None = None,
+    cfg: dict[str, Any] | None = None,
+    root: str | Path | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Contexto RAG en proceso: vía el daemon de memoria si está corriendo (mem-serve); si no, con el
+    store compartido del proceso (ver shared_service: se carga una vez por raíz, se recarga si cambian
+    sus archivos y se libera según memory.cache_max_stores / memory.cache_ttl_s).
+    """
+    cfg = _config() if cfg is None else cfg
+    root = root or os.getcwd()
+    if get_default(cfg, "memory", "daemon", True):
+        client = MemoryClient.discover(root)
+        if client is not None:
+            try:
+                return client.search(query, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags, filter=filter)
+            except DaemonError:
+                pass  # daemon caído: store del proceso
+    return shared_service(cfg, root).search(query, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags, filter=filter)
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import json
+import os
+import secrets
+import signal
+import socket
+import socketserver
+import threading
+from pathlib import Path
+from typing import Any
+
+from wilbito.memory.service import MemoryService
+
+# Protocolo: una línea JSON por request ({"op", "token", ...}) y una línea JSON por respuesta
+# ({"ok": True, ...} | {"ok": False, "error"}), sobre un socket Unix (o TCP en 127.0.0.1 si no hay AF_UNIX).
+# El daemon anuncia su dirección y token en memoria/vector_db/memd.json mientras está corriendo.
+DEFAULT_TIMEOUT = 10.0
+# Largo máximo seguro de la ruta de un socket Unix (sun_path ronda los 104-108 bytes)
+_MAX_SOCKET_PATH = 100
+
+
+class DaemonError(RuntimeError):
+    """El daemon no está disponible o respondió con error."""
+
+
+def info_path(root: str | Path) -> Path:
+    return Path(root) / "memoria" / "vector_db" / "memd.json"
+
+
+def socket_path(root: str | Path) -> Path:
+    return Path(root) / "memoria" / "vector_db" / "memd.sock"
+
+
+class MemoryClient:
+    """Cliente del daemon de memoria: una conexión corta por request."""
+
+    def __init__(self, address: str, token: str, timeout: float = DEFAULT_TIMEOUT):
+        self.address = address
+        self.token = token
+        self.timeout = timeout
+
+    @classmethod
+    def discover(cls, root: str | Path, timeout: float = DEFAULT_TIMEOUT) -> MemoryClient | None:
+        """Cliente del daemon anunciado en root, o None si no hay ninguno corriendo."""
+        try:
+            info = json.loads(info_path(root).read_text(encoding="utf-8"))
+            return cls(str(info["address"]), str(info["token"]), timeout)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _connect(self) -> socket.socket:
+        kind, _, rest = self.address.partition(":")
+        if kind == "unix":
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(rest)
+            except OSError:
+                sock.close()
+                raise
+            return sock
+        host, _, port = rest.rpartition(":")
+        return socket.create_connection((host, int(port)), timeout=self.timeout)
+
+    def call(self, op: str, **kwargs: Any) -> dict[str, Any]:
+        req = dict(kwargs, op=op, token=self.token)
+        try:
+            with self._connect() as sock, sock.makefile("rwb") as f:
+                f.write(json.dumps(req, ensure_ascii=False).encode("utf-8") + b"\n")
+                f.flush()
+                line = f.readline()
+        except (OSError, ValueError) as e:
+            raise DaemonError(f"daemon de memoria no disponible ({self.address}): {e}") from e
+        try:
+            resp = json.loads(line)
+        except ValueError as e:
+            raise DaemonError(f"respuesta inválida del daemon: {line[:200]!r}") from e
+        if not resp.get("ok"):
+            raise DaemonError(str(resp.get("error") or "error desconocido"))
+        return resp
+
+    def ping(self) -> int:
+        return int(self.call("ping")["items"])
+
+    def search(self, query: str, **kwargs: Any) -> list[dict[str, Any]]:
+        return self.call("search", query=query, **kwargs)["results"]
+
+    def search_many(self, queries: list[str], **kwargs: Any) -> list[list[dict[str, Any]]]:
+        return self.call("search_many", queries=queries, **kwargs)["results"]
+
+    def ingest(self, entries: list[dict[str, Any]]) -> int:
+        return int(self.call("ingest", entries=entries)["ingested"])
+
+    def retention(self, dry_run: bool = False) -> dict[str, Any]:
+        resp = self.call("retention", dry_run=dry_run)
+        resp.pop("ok", None)
+        return resp
+
+    def shutdown(self) -> None:
+        self.call("shutdown")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: Any
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                req = json.loads(line)
+                if not isinstance(req, dict):
+                    raise ValueError("se esperaba un objeto JSON")
+            except ValueError as e:
+                resp: dict[str, Any] = {"ok": False, "error": f"JSON inválido: {e}"}
+            else:
+                if not secrets.compare_digest(str(req.get("token", "")), self.server.token):
+                    resp = {"ok": False, "error": "token inválido"}
+                elif req.get("op") == "shutdown":
+                    resp = {"ok": True}
+                else:
+                    resp = self.server.service.handle(req)
+            self.wfile.write(json.dumps(resp, ensure_ascii=False).encode("utf-8") + b"\n")
+            self.wfile.flush()
+            if resp.get("ok") and req.get("op") == "shutdown":
+                # Después de responder: serve_forever termina y el proceso puede salir
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socket, "AF_UNIX"):
+
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+def _interrupt(*_: Any) -> None:
+    raise KeyboardInterrupt
+
+
+def _retention_loop(service: MemoryService, every: float, stop: threading.Event) -> None:
+    while not stop.wait(every):
+        try:
+            service.enforce_retention()
+        except (OSError, ValueError):
+            pass  # se reintenta en el próximo intervalo
+
+
+def serve(
+    service: MemoryService,
+    root: str | Path,
+    port: int | None = None,
+    ready: threading.Event | None = None,
+    retention_every: float = 0.0,
+) -> None:
+    """
+    Atiende requests hasta recibir op "shutdown" (o SIGTERM/Ctrl+C). Con port escucha en 127.0.0.1:port;
+    si no, en un socket Unix (o un puerto TCP libre donde no hay AF_UNIX o la ruta es demasiado larga).
+    retention_every: si > 0 (y el servicio tiene política de retención), la aplica cada tantos segundos.
+    """
+    info = info_path(root)
+    running = MemoryClient.discover(root, timeout=1.0)
+    if running is not None:
+        try:
+            running.ping()
+        except DaemonError:
+            pass  # anuncio de un daemon que ya no corre
+        else:
+            raise DaemonError(f"ya hay un daemon de memoria corriendo en {running.address}")
+
+    sock = socket_path(root)
+    server: socketserver.BaseServer
+    if port is None and hasattr(socket, "AF_UNIX") and len(str(sock)) <= _MAX_SOCKET_PATH:
+        sock.parent.mkdir(parents=True, exist_ok=True)
+        sock.unlink(missing_ok=True)
+        server = _UnixServer(str(sock), _Handler)
+        os.chmod(sock, 0o600)
+        address = f"unix:{sock}"
+    else:
+        server = _TCPServer(("127.0.0.1", port or 0), _Handler)
+        address = f"tcp:127.0.0.1:{server.server_address[1]}"
+    server.service = service  # type: ignore[attr-defined]
+    server.token = secrets.token_hex(16)  # type: ignore[attr-defined]
+
+    info.parent.mkdir(parents=True, exist_ok=True)
+    tmp = info.with_name(info.name + ".tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"pid": os.getpid(), "address": address, "token": server.token}, f)  # type: ignore[attr-defined]
+    os.replace(tmp, info)
+
+    if threading.current_thread() is threading.main_thread() and hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, _interrupt)
+    stop = threading.Event()
+    if retention_every > 0 and service.retention.active():
+        threading.Thread(target=_retention_loop, args=(service, retention_every, stop), daemon=True).start()
+    try:
+        if ready is not None:
+            ready.set()
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        info.unlink(missing_ok=True)
+        if address.startswith("unix:"):
+            sock.unlink(missing_ok=True)
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import struct
+from typing import Any
+
+# Políticas de deduplicación al ingestar:
+#   keep  → se agrega siempre (comportamiento histórico)
+#   skip  → si ya existe un item igual o casi igual, no se agrega
+#   merge → no se agrega; la meta nueva completa las claves que le falten al item existente
+DEDUP_POLICIES = ("keep", "skip", "merge")
+DEFAULT_THRESHOLD = 0.8
+
+# Huella guardada en cada item como item["dedup"] = {"v", "hash", "lsh"}; si cambia la versión se recalcula
+FINGERPRINT_VERSION = 1
+SHINGLE = 3  # shingles de 3 palabras
+NUM_PERM = 32  # permutaciones MinHash
+BANDS = 8  # LSH: 8 bandas x 4 filas → ~98% de probabilidad de ser candidato con Jaccard 0.8
+ROWS = NUM_PERM // BANDS
+
+_SIG_FMT = f"<{NUM_PERM}I"
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def content_hash(text: str) -> str:
+    """Hash del contenido para duplicados exactos (ignora mayúsculas y espacios repetidos)."""
+    norm = " ".join(text.lower().split())
+    return hashlib.blake2b(norm.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def minhash(text: str) -> list[int]:
+    """
+    Firma MinHash sobre shingles de palabras (sin puntuación). [] si el texto no tiene palabras.
+    Cada shingle se hashea una vez con SHAKE-128 y el digest se parte en NUM_PERM valores de
+    32 bits (una función de hash independiente por posición); la firma es el mínimo por columna.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return []
+    n = max(1, len(words) - SHINGLE + 1)
+    shingles = {" ".join(words[i : i + SHINGLE]) for i in range(n)}
+    rows = [struct.unpack(_SIG_FMT, hashlib.shake_128(sh.encode("utf-8")).digest(NUM_PERM * 4)) for sh in shingles]
+    return list(map(min, zip(*rows, strict=True)))
+
+
+def lsh_keys(sig: list[int]) -> list[int]:
+    """Una clave por banda (hash de 32 bits de las filas de la banda, prefijado con su número)."""
+    if not sig:
+        return []
+    keys = []
+    for band in range(BANDS):
+        rows = sig[band * ROWS : (band + 1) * ROWS]
+        digest = hashlib.blake2b(struct.pack(f"<B{ROWS}I", band, *rows), digest_size=4).digest()
+        keys.append(int.from_bytes(digest, "little"))
+    return keys
+
+
+def similarity(a: list[int], b: list[int]) -> float:
+    """Estimación de Jaccard entre dos firmas MinHash."""
+    if not a or not b:
+        return 0.0
+    return sum(1 for x, y in zip(a, b, strict=True) if x == y) / len(a)
+
+
+def fingerprint(item: dict[str, Any]) -> dict[str, Any]:
+    """Devuelve (y cachea en el item) su huella de deduplicación."""
+    fp = item.get("dedup")
+    if isinstance(fp, dict) and fp.get("v") == FINGERPRINT_VERSION:
+        return fp
+    text = item.get("text", "") or ""
+    fp = {"v": FINGERPRINT_VERSION, "hash": content_hash(text), "lsh": lsh_keys(minhash(text))}
+    item["dedup"] = fp
+    return fp
+
+
+class DedupIndex:
+    """
+    Índice de huellas de los items de un store: hash exacto → posición y buckets LSH
+    (banda → posiciones). find() verifica los candidatos LSH recalculando su MinHash.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self._by_hash: dict[str, int] = {}
+        self._buckets: dict[int, list[int]] = {}
+
+    def add(self, pos: int, item: dict[str, Any]) -> None:
+        fp = fingerprint(item)
+        self._by_hash.setdefault(fp["hash"], pos)
+        for key in fp["lsh"]:
+            self._buckets.setdefault(key, []).append(pos)
+
+    def find(self, item: dict[str, Any], items: list[dict[str, Any]]) -> int | None:
+        """Posición de un item igual o casi igual (Jaccard estimado >= threshold), o None."""
+        fp = fingerprint(item)
+        pos = self._by_hash.get(fp["hash"])
+        if pos is not None:
+            return pos
+        candidates = sorted({p for key in fp["lsh"] for p in self._buckets.get(key, ())})
+        if not candidates:
+            return None
+        sig = minhash(item.get("text", "") or "")
+        for p in candidates:
+            if similarity(sig, minhash(items[p].get("text", "") or "")) >= self.threshold:
+                return p
+        return None
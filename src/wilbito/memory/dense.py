@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+# NumPy es opcional: sin NumPy, VectorStore ignora el modo denso y usa el índice disperso.
+try:
+    import numpy as np  # type: ignore
+
+    _HAS_NUMPY = True
+except Exception:
+    np = None  # type: ignore
+    _HAS_NUMPY = False
+
+# Dimensión de los embeddings (feature hashing con signo de los términos del bow)
+DEFAULT_DIM = 256
+# Por debajo de este tamaño la búsqueda exacta (un producto matriz-vector) es más rápida que IVF
+IVF_MIN_ITEMS = 20000
+# Listas IVF exploradas por query
+DEFAULT_NPROBE = 8
+# Filas por bloque al asignar items a centroides (acota la matriz temporal bloque × listas)
+_ASSIGN_CHUNK = 65536
+_KMEANS_ITERS = 10
+
+
+def available() -> bool:
+    return _HAS_NUMPY
+
+
+def dense_path(path: str | Path) -> Path:
+    """vectorstore.json → vectorstore.dense.npy (vectores, abribles con mmap)"""
+    p = Path(path)
+    return p.with_name(p.stem + ".dense.npy")
+
+
+def _ivf_path(path: Path) -> Path:
+    return path.with_name(path.name[: -len(".npy")] + ".ivf.npz")
+
+
+@lru_cache(maxsize=262144)
+def _bucket(term: str, dim: int) -> tuple[int, float]:
+    """Columna y signo del término (hash determinista, igual en todos los procesos)."""
+    h = int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+    return h % dim, (1.0 if h >> 63 else -1.0)
+
+
+def embed_bows(bows: list[dict[str, float]], dim: int = DEFAULT_DIM) -> Any:
+    """
+    Embeddings float32 L2-normalizados (filas) de una lista de bows: cada término suma su peso,
+    con signo, en una columna elegida por hash (proyección aleatoria dispersa del vector tf).
+    El producto punto entre embeddings aproxima el coseno tf entre los textos.
+    """
+    rows: list[int] = []
+    cols: list[int] = []
+    vals: list[float] = []
+    for r, bow in enumerate(bows):
+        for term, w in bow.items():
+            c, sign = _bucket(term, dim)
+            rows.append(r)
+            cols.append(c)
+            vals.append(sign * w)
+    flat = np.asarray(rows, dtype=np.int64) * dim + np.asarray(cols, dtype=np.int64)
+    out = np.bincount(flat, weights=vals, minlength=len(bows) * dim).astype(np.float32).reshape(len(bows), dim)
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    out /= np.where(norms > 0, norms, 1.0)
+    return out
+
+
+class DenseIndex:
+    """
+    Vectores densos de todos los items (posiciones alineadas con VectorStore.items) + índice IVF.
+    Los vectores viven en dos bloques contiguos float32: base (posiblemente un mmap del .npy
+    persistido) y cola (items agregados después, en un buffer que crece por duplicación).
+    Con IVF_MIN_ITEMS o más items se entrena k-means esférico (√N listas) y cada query sólo
+    puntúa los items de las n_probe listas más cercanas; si no, la búsqueda es exacta.
+    """
+
+    def __init__(self, dim: int = DEFAULT_DIM, n_probe: int = DEFAULT_NPROBE):
+        if not _HAS_NUMPY:
+            raise RuntimeError("El modo denso requiere NumPy. Instalá con: pip install numpy")
+        self.dim = dim
+        self.n_probe = n_probe
+        self._base = np.zeros((0, dim), dtype=np.float32)
+        self._tail = np.zeros((1024, dim), dtype=np.float32)
+        self._n_tail = 0
+        # IVF: centroides (L×dim), lista asignada a cada item y orden por lista (perezoso)
+        self.centroids: Any = None
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._trained_n = 0
+        self._lists: tuple[Any, Any] | None = None
+
+    def __len__(self) -> int:
+        return len(self._base) + self._n_tail
+
+    # ---------- Construcción ----------
+    def add_bows(self, bows: list[dict[str, float]]) -> None:
+        if not bows:
+            return
+        vecs = embed_bows(bows, self.dim)
+        need = self._n_tail + len(vecs)
+        if need > len(self._tail):
+            grown = np.zeros((max(need, 2 * len(self._tail)), self.dim), dtype=np.float32)
+            grown[: self._n_tail] = self._tail[: self._n_tail]
+            self._tail = grown
+        self._tail[self._n_tail : need] = vecs
+        self._n_tail = need
+        if self.centroids is not None:
+            self._assign = np.concatenate([self._assign, self._nearest(vecs)])
+            self._lists = None
+
+    def _rows(self, ids: Any) -> Any:
+        """Vectores de las posiciones ids (de la base o de la cola)."""
+        nb = len(self._base)
+        if ids.size and ids.max() < nb:
+            return self._base[ids]
+        out = np.empty((len(ids), self.dim), dtype=np.float32)
+        in_base = ids < nb
+        out[in_base] = self._base[ids[in_base]]
+        out[~in_base] = self._tail[ids[~in_base] - nb]
+        return out
+
+    def _blocks(self) -> list[Any]:
+        return [b for b in (self._base, self._tail[: self._n_tail]) if len(b)]
+
+    def _nearest(self, vecs: Any) -> Any:
+        out = np.empty(len(vecs), dtype=np.int32)
+        for start in range(0, len(vecs), _ASSIGN_CHUNK):
+            out[start : start + _ASSIGN_CHUNK] = np.argmax(vecs[start : start + _ASSIGN_CHUNK] @ self.centroids.T, axis=1)
+        return out
+
+    def train(self) -> None:
+        """k-means esférico sobre una muestra y asignación de todos los items a su lista."""
+        n = len(self)
+        n_lists = int(min(4096, max(16, np.sqrt(n))))
+        rng = np.random.default_rng(0)
+        sample = self._rows(np.sort(rng.choice(n, size=min(n, n_lists * 64), replace=False)))
+        cent = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(_KMEANS_ITERS):
+            assign = np.argmax(sample @ cent.T, axis=1)
+            counts = np.bincount(assign, minlength=n_lists)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            empty = counts == 0
+            sums = np.zeros_like(cent)
+            sums[~empty] = np.add.reduceat(sample[np.argsort(assign, kind="stable")], starts[~empty], axis=0)
+            if empty.any():
+                # listas vacías: se re-siembran con items al azar de la muestra
+                sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()), replace=False)]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            cent = sums / np.where(norms > 0, norms, 1.0)
+        self.centroids = cent.astype(np.float32)
+        self._assign = np.concatenate([self._nearest(b) for b in self._blocks()])
+        self._trained_n = n
+        self._lists = None
+
+    def _ivf_lists(self) -> tuple[Any, Any]:
+        if self._lists is None:
+            order = np.argsort(self._assign, kind="stable")
+            offsets = np.searchsorted(self._assign[order], np.arange(len(self.centroids) + 1))
+            self._lists = (order, offsets)
+        return self._lists
+
+    # ---------- Búsqueda ----------
+    def search(self, q: Any, k: int, allowed: Any = None, boost: Any = None, decay: Any = None) -> dict[int, float]:
+        """
+        {posición: score} de los mejores k items (más empates en el borde) con score > 0.
+        allowed: array de posiciones permitidas (filtro) o None; boost: máscara booleana de items
+        con tag preferido (score × 1.2, antes de elegir el top-k); decay: array de factores por item
+        (decaimiento temporal, score × factor) o None.
+        """
+        n = len(self)
+        if n == 0:
+            return {}
+        if self.centroids is None or n >= 2 * self._trained_n:
+            if n >= IVF_MIN_ITEMS:
+                self.train()
+        if allowed is not None and len(allowed) <= max(IVF_MIN_ITEMS, k):
+            cand = np.asarray(allowed, dtype=np.int64)
+        elif self.centroids is None or self.n_probe >= len(self.centroids):
+            cand = None
+        else:
+            order, offsets = self._ivf_lists()
+            probe = np.argsort(-(self.centroids @ q))[: self.n_probe]
+            cand = np.concatenate([order[offsets[c] : offsets[c + 1]] for c in probe]).astype(np.int64)
+            if allowed is not None:
+                cand = cand[np.isin(cand, allowed)]
+                if len(cand) < k:
+                    # el filtro dejó muy pocos candidatos en las listas exploradas → búsqueda exacta
+                    cand = np.asarray(allowed, dtype=np.int64)
+        if cand is None:
+            scores = np.concatenate([b @ q for b in self._blocks()])
+            cand = np.arange(n)
+        else:
+            scores = self._rows(cand) @ q
+        if boost is not None:
+            scores = scores * np.where(boost[cand], 1.2, 1.0)
+        if decay is not None:
+            scores = scores * decay[cand]
+        keep = scores > 0
+        cand, scores = cand[keep], scores[keep]
+        if len(scores) > k:
+            kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+            # Margen para el redondeo a 4 decimales del score publicado
+            sel = scores >= kth - 1e-4
+            cand, scores = cand[sel], scores[sel]
+        return {int(p): float(s) for p, s in zip(cand, scores, strict=True)}
+
+    # ---------- Persistencia ----------
+    def save(self, path: str | Path, source: str | Path | None = None, signature: str = "") -> None:
+        """
+        Escribe los vectores en .dense.npy (abrible con mmap) y centroides/asignación en .ivf.npz.
+        source: snapshot JSON del que proviene (tamaño/mtime para detectar desactualización).
+        """
+        p = Path(path)
+        vecs = np.concatenate(self._blocks()) if len(self) else np.zeros((0, self.dim), dtype=np.float32)
+        src_stat = None
+        if source is not None and Path(source).exists():
+            st = Path(source).stat()
+            src_stat = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        header = {"dim": self.dim, "n": len(vecs), "tokenizer": signature, "source": src_stat}
+        tmp = p.with_name(p.name + ".tmp.npy")
+        np.save(tmp, vecs)
+        os.replace(tmp, p)
+        ivf = _ivf_path(p)
+        tmp = ivf.with_name(ivf.name + ".tmp.npz")
+        extra = {"centroids": self.centroids, "assign": self._assign} if self.centroids is not None else {}
+        np.savez(tmp, header=np.array(json.dumps(header)), **extra)
+        os.replace(tmp, ivf)
+
+    @classmethod
+    def load(
+        cls,
+        path: str | Path,
+        source: str | Path,
+        n_items: int,
+        signature: str = "",
+        n_probe: int = DEFAULT_NPROBE,
+    ) -> DenseIndex | None:
+        """Abre los vectores persistidos vía mmap; None si faltan o no corresponden a source."""
+        p = Path(path)
+        ivf = _ivf_path(p)
+        if not p.exists() or not ivf.exists() or not Path(source).exists():
+            return None
+        try:
+            with np.load(ivf) as z:
+                header = json.loads(str(z["header"]))
+                centroids = z["centroids"] if "centroids" in z else None
+                assign = z["assign"] if "assign" in z else None
+            vecs = np.load(p, mmap_mode="r")
+        except Exception:
+            return None
+        st = Path(source).stat()
+        src = header.get("source") or {}
+        fresh = src.get("size") == st.st_size and src.get("mtime_ns") == st.st_mtime_ns
+        if not fresh or header.get("tokenizer") != signature or header.get("n") != n_items or vecs.shape[1:] != (header["dim"],):
+            return None
+        idx = cls(dim=int(header["dim"]), n_probe=n_probe)
+        idx._base = vecs
+        if centroids is not None:
+            idx.centroids = centroids
+            idx._assign = assign
+            idx._trained_n = len(vecs)
+        return idx
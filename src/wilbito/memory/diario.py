@@ -4,7 +4,8 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, Optional
 
-from wilbito.memory.vectorstore import VectorStore
+from wilbito.config import load_config
+from wilbito.memory.service import MemoryService
 
 
 def write_entry(texto: str, tag: str | None = None) -> dict[str, Any]:
@@ -27,22 +28,9 @@ def write_entry(texto: str, tag: str | None = None) -> dict[str, Any]:
     with open(fp, "a", encoding="utf-8") as f:
         f.write(line)
 
-    # Auto-ingesta si hay tag
+    # Auto-ingesta si hay tag, en el store activo (memory.store) con su tokenizer/dedup de config
     if tag:
-        dbp = Path("memoria") / "vector_db" / "vectorstore.json"
-        vs = VectorStore.load(str(dbp))
-        # usa add_texts si existe, senón fallback a add_text
-        if hasattr(vs, "add_texts"):
-            vs.add_texts(
-                [
-                    {
-                        "text": texto,
-                        "meta": {"tag": tag, "source": "diario", "timestamp": ts, "file": str(fp)},
-                    }
-                ]
-            )
-        else:
-            vs.add_text(texto, {"tag": tag, "source": "diario", "timestamp": ts, "file": str(fp)})
-        vs.save(str(dbp))
+        meta = {"tag": tag, "source": "diario", "timestamp": ts, "file": str(fp)}
+        MemoryService.from_config(load_config(), Path.cwd()).ingest([{"text": texto, "meta": meta}])
 
     return {"file": str(fp)}
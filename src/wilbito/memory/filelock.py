@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl  # type: ignore
+
+    _HAS_FCNTL = True
+except Exception:  # Windows
+    fcntl = None  # type: ignore
+    _HAS_FCNTL = False
+
+try:
+    import msvcrt  # type: ignore
+
+    _HAS_MSVCRT = True
+except Exception:
+    msvcrt = None  # type: ignore
+    _HAS_MSVCRT = False
+
+# Locks tomados por el hilo actual: {ruta del lock: profundidad} (reentrante dentro del hilo)
+_HELD = threading.local()
+
+
+def lock_path(path: str | Path) -> Path:
+    """vectorstore.json → vectorstore.json.lock"""
+    p = Path(path)
+    return p.with_name(p.name + ".lock")
+
+
+def _acquire(fd: int, shared: bool) -> None:
+    if _HAS_FCNTL:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+    elif _HAS_MSVCRT:
+        # msvcrt no tiene lock compartido; LK_LOCK reintenta ~10 s y después falla → se vuelve a intentar
+        os.lseek(fd, 0, os.SEEK_SET)
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                time.sleep(0.05)
+
+
+def _release(fd: int) -> None:
+    if _HAS_FCNTL:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    elif _HAS_MSVCRT:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path: str | Path, shared: bool = False) -> Iterator[None]:
+    """
+    Lock advisory entre procesos sobre path (vía path.lock): exclusivo para escribir, compartido
+    para leer un estado consistente (snapshot + log). Reentrante dentro del mismo hilo. Sin fcntl
+    ni msvcrt, o si no se puede crear el .lock en una lectura (directorio de sólo lectura), no bloquea.
+    """
+    lp = lock_path(path)
+    key = str(lp.resolve())
+    held: dict[str, int] = _HELD.__dict__.setdefault("locks", {})
+    if key in held or not (_HAS_FCNTL or _HAS_MSVCRT):
+        held[key] = held.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            held[key] -= 1
+            if not held[key]:
+                del held[key]
+        return
+    try:
+        fd = os.open(lp, os.O_RDWR | os.O_CREAT, 0o644)
+    except OSError:
+        if not shared:
+            raise
+        yield
+        return
+    try:
+        _acquire(fd, shared)
+        held[key] = 1
+        try:
+            yield
+        finally:
+            del held[key]
+            _release(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import operator
+from typing import Any
+
+# Claves de meta con sub-índice (partición) en VectorStore: se podan candidatos sin mirar cada item
+PARTITION_KEYS = ("tag", "source")
+
+_RANGE_OPS = {"gte": operator.ge, "gt": operator.gt, "lte": operator.le, "lt": operator.lt}
+
+
+def normalize_filter(flt: dict[str, Any] | None) -> dict[str, Any]:
+    """
+    Valida un filtro de meta. Formato (todas las condiciones deben cumplirse):
+      {"tag": "trading"}                         igualdad
+      {"tag": ["trading", "codegen"]}            pertenencia
+      {"timestamp": {"gte": "2025-08-01", "lt": "2025-09-01"}}   rango (gte/gt/lte/lt)
+    """
+    if not flt:
+        return {}
+    if not isinstance(flt, dict):
+        raise ValueError("El filtro debe ser un objeto {clave_meta: condición}")
+    out: dict[str, Any] = {}
+    for key, cond in flt.items():
+        if isinstance(cond, dict):
+            bad = set(cond) - set(_RANGE_OPS)
+            if bad or not cond:
+                raise ValueError(f"Condición de rango inválida para '{key}': usar {', '.join(_RANGE_OPS)}")
+            out[key] = dict(cond)
+        elif isinstance(cond, (list, tuple, set)):
+            out[key] = list(cond)
+        else:
+            out[key] = cond
+    return out
+
+
+def match_meta(meta: dict[str, Any] | None, flt: dict[str, Any]) -> bool:
+    meta = meta or {}
+    for key, cond in flt.items():
+        val = meta.get(key)
+        if isinstance(cond, dict):
+            if val is None:
+                return False
+            try:
+                if not all(_RANGE_OPS[op](val, ref) for op, ref in cond.items()):
+                    return False
+            except TypeError:
+                return False
+        elif isinstance(cond, list):
+            if val not in cond:
+                return False
+        elif val != cond:
+            return False
+    return True
+
+
+def split_filter(flt: dict[str, Any]) -> tuple[dict[str, list[Any]], dict[str, Any]]:
+    """
+    Separa las condiciones resolubles con particiones (igualdad/pertenencia sobre PARTITION_KEYS)
+    del resto, que se evalúa item por item sobre los candidatos.
+    """
+    parts: dict[str, list[Any]] = {}
+    rest: dict[str, Any] = {}
+    for key, cond in flt.items():
+        if key in PARTITION_KEYS and not isinstance(cond, dict):
+            parts[key] = cond if isinstance(cond, list) else [cond]
+        else:
+            rest[key] = cond
+    return parts, rest
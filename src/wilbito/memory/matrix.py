@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from typing import Any
+
+from wilbito.memory.scoring import Scorer
+
+# NumPy/SciPy son opcionales: sin NumPy, VectorStore usa el camino puro-Python.
+try:
+    import numpy as np  # type: ignore
+
+    _HAS_NUMPY = True
+except Exception:
+    np = None  # type: ignore
+    _HAS_NUMPY = False
+
+try:
+    from scipy import sparse as _sparse  # type: ignore
+
+    _HAS_SCIPY = True
+except Exception:
+    _sparse = None  # type: ignore
+    _HAS_SCIPY = False
+
+# Tamaño de lote para el producto Q @ A (acota la matriz densa de resultados B×N)
+BATCH_CHUNK = 32
+
+
+def available() -> bool:
+    return _HAS_NUMPY
+
+
+class SparseMatrixIndex:
+    """
+    Corpus como matriz término-documento CSR (filas = términos del vocabulario, columnas = items).
+    Los valores ya son los pesos de documento del Scorer, así el score de una query es un único
+    producto matriz-vector disperso (qw · A) y el top-k sale de argpartition.
+    Con SciPy se usa csr_matrix; sólo con NumPy, bincount sobre las filas de los términos de la query.
+    """
+
+    def __init__(
+        self,
+        index: dict[str, list[tuple[int, float]]],
+        items: list[dict[str, Any]],
+        scorer: Scorer,
+    ) -> None:
+        if not _HAS_NUMPY:
+            raise RuntimeError("SparseMatrixIndex requiere NumPy. Instalá con: pip install numpy")
+        self.vocab: dict[str, int] = {}
+        indptr = [0]
+        indices: list[int] = []
+        data: list[float] = []
+        for term, postings in index.items():
+            self.vocab[term] = len(self.vocab)
+            for pos, w in postings:
+                if scorer.uses_length:
+                    it = items[pos]
+                    w = scorer.doc_weight(w, it.get("norm", 1.0), it.get("n_tokens", 0))
+                indices.append(pos)
+                data.append(w)
+            indptr.append(len(indices))
+
+        self.n_docs = len(items)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.data = np.asarray(data, dtype=np.float64)
+        self.tags = np.asarray([((it.get("meta") or {}).get("tag") or "") for it in items], dtype=object)
+        self._csr = None
+        if _HAS_SCIPY:
+            self._csr = _sparse.csr_matrix((self.data, self.indices, self.indptr), shape=(len(self.vocab), self.n_docs))
+
+    # ---------- Scoring ----------
+    def scores(self, queries: list[dict[str, float]]) -> Any:
+        """
+        Devuelve una matriz densa B×N con el score de cada query contra cada item.
+        """
+        out = np.zeros((len(queries), self.n_docs), dtype=np.float64)
+        for start in range(0, len(queries), BATCH_CHUNK):
+            chunk = queries[start : start + BATCH_CHUNK]
+            if self._csr is not None:
+                rows: list[int] = []
+                cols: list[int] = []
+                vals: list[float] = []
+                for i, qw in enumerate(chunk):
+                    for term, w in qw.items():
+                        col = self.vocab.get(term)
+                        if col is not None:
+                            rows.append(i)
+                            cols.append(col)
+                            vals.append(w)
+                q = _sparse.csr_matrix((vals, (rows, cols)), shape=(len(chunk), len(self.vocab)))
+                out[start : start + len(chunk)] = (q @ self._csr).toarray()
+            else:
+                for i, qw in enumerate(chunk):
+                    out[start + i] = self._score_one(qw)
+        return out
+
+    def _score_one(self, qw: dict[str, float]) -> Any:
+        idx_parts = []
+        val_parts = []
+        for term, w in qw.items():
+            row = self.vocab.get(term)
+            if row is None:
+                continue
+            a, b = self.indptr[row], self.indptr[row + 1]
+            idx_parts.append(self.indices[a:b])
+            val_parts.append(self.data[a:b] * w)
+        if not idx_parts:
+            return np.zeros(self.n_docs, dtype=np.float64)
+        return np.bincount(np.concatenate(idx_parts), weights=np.concatenate(val_parts), minlength=self.n_docs)
+
+    def candidates(
+        self,
+        scores: Any,
+        k: int,
+        prefer_tags: list[str] | None = None,
+        allowed: list[int] | None = None,
+        decay: Any = None,
+    ) -> dict[int, float]:
+        """
+        Aplica el boost por tag y devuelve {posición: score} de los items con score > 0 que pueden
+        entrar al top-k (incluye empates en el borde; el orden final lo decide VectorStore).
+        allowed: si se provee, sólo esas posiciones son candidatas (filtro de meta).
+        decay: array de factores por item (decaimiento temporal, score × factor) o None.
+        """
+        if decay is not None:
+            scores = scores * decay
+        if allowed is not None:
+            mask = np.zeros(len(scores), dtype=bool)
+            mask[np.asarray(allowed, dtype=np.int64)] = True
+            scores = np.where(mask, scores, 0.0)
+        if prefer_tags:
+            scores = scores * np.where(np.isin(self.tags, list(prefer_tags)), 1.2, 1.0)
+        positive = np.flatnonzero(scores > 0)
+        if len(positive) > k:
+            vals = scores[positive]
+            kth = np.partition(vals, len(vals) - k)[len(vals) - k]
+            # Margen para el redondeo a 4 decimales del score publicado
+            if kth >= 1e-4:
+                positive = positive[vals >= kth - 1e-4]
+        return {int(p): float(scores[p]) for p in positive}
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+# Entradas por defecto del cache de resultados (memory.query_cache; 0 = desactivado)
+DEFAULT_ENTRIES = 256
+
+
+def query_cache_path(root: str | Path) -> Path:
+    return Path(root) / "memoria" / "vector_db" / "query_cache.json"
+
+
+def _copy(results: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    return [{**h, "meta": dict(h.get("meta") or {})} for h in results]
+
+
+class QueryCache:
+    """
+    Cache LRU de resultados de búsqueda: clave = hash de (query normalizada, top_k, min_score,
+    prefer_tags, filtro, versión del store); con path se persiste en JSON (ver flush) y se
+    recupera al crearlo. Las entradas de versiones viejas quedan inalcanzables y salen por LRU.
+    No es thread-safe: MemoryService lo usa bajo su lock.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_ENTRIES, path: str | Path | None = None):
+        self.max_entries = max(1, int(max_entries))
+        self.path = Path(path) if path is not None else None
+        self._entries: OrderedDict[str, list[dict[str, Any]]] = OrderedDict()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        if self.path is not None:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(
+        query: str,
+        top_k: int,
+        min_score: float,
+        prefer_tags: list[str] | None,
+        filter: dict[str, Any] | None,
+        version: Any,
+    ) -> str:
+        """
+        Mayúsculas y espacios no cambian los tokens y el orden de prefer_tags no cambia el boost: se
+        normalizan para que esas variantes compartan entrada. Se usa lower() como el tokenizer
+        (wilbito.memory.tokenizer), no casefold(): "Straße" y "STRASSE" tokenizan distinto.
+        """
+        raw = json.dumps(
+            [" ".join(query.lower().split()), int(top_k), float(min_score), sorted(prefer_tags or []), filter or {}, version],
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> list[dict[str, Any]] | None:
+        """Copia de los resultados guardados (el caller puede modificarlos), o None."""
+        results = self._entries.get(key)
+        if results is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return _copy(results)
+
+    def put(self, key: str, results: list[dict[str, Any]]) -> None:
+        self._entries[key] = _copy(results)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._dirty = True
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._dirty = True
+
+    def stats(self) -> dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    # ---------- Persistencia ----------
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))  # type: ignore[union-attr]
+            entries = data["entries"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return  # sin archivo o inválido → cache vacío (no reventamos)
+        for rec in entries[-self.max_entries :]:
+            if isinstance(rec, list) and len(rec) == 2 and isinstance(rec[0], str) and isinstance(rec[1], list):
+                self._entries[rec[0]] = rec[1]
+
+    def flush(self) -> None:
+        """Con path, escribe las entradas (de la menos a la más usada) si hubo cambios; reemplazo atómico."""
+        if self.path is None or not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        payload = {"entries": [[k, v] for k, v in self._entries.items()]}
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self._dirty = False
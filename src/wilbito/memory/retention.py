@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import math
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from wilbito.config import get_default
+
+# Acciones sobre los items vencidos:
+#   archive → se mueven a un segmento frío (memoria/vector_db/cold/*.json, cargable con VectorStore.load)
+#   drop    → se descartan
+RETENTION_ACTIONS = ("archive", "drop")
+# Clave de política que aplica a los tags sin política propia (y a los items sin tag)
+ANY_TAG = "*"
+
+
+def item_time(item: dict[str, Any]) -> float | None:
+    """
+    Momento (epoch) del item: meta.timestamp (ISO, lo escribe diario.write_entry) o, si no hay,
+    item["ts"] (asignado al ingestar). None para items viejos sin ninguno de los dos.
+    """
+    ts = (item.get("meta") or {}).get("timestamp")
+    if isinstance(ts, str):
+        try:
+            return datetime.fromisoformat(ts).timestamp()
+        except ValueError:
+            pass
+    ts = item.get("ts")
+    return float(ts) if isinstance(ts, (int, float)) else None
+
+
+def decay_factor(t: float | None, now: float, half_life_days: float) -> float:
+    """0.5 ** (edad / vida media); 1.0 sin momento conocido o sin decaimiento."""
+    if t is None or half_life_days <= 0:
+        return 1.0
+    return math.exp(-math.log(2) * max(0.0, now - t) / (half_life_days * 86400.0))
+
+
+def cold_dir(path: str | Path) -> Path:
+    """vector_db/vectorstore.json → vector_db/cold/"""
+    return Path(path).parent / "cold"
+
+
+class RetentionPolicy:
+    """
+    Políticas de retención por tag (ANY_TAG = resto):
+      ttl_days:  {tag: días}  → vencen los items más viejos que eso
+      max_items: {tag: n}     → se conservan los n más recientes del tag
+    Los items sin momento conocido (item_time None) no vencen por TTL y cuentan como los más viejos
+    para max_items.
+    """
+
+    def __init__(
+        self,
+        ttl_days: dict[str, float] | None = None,
+        max_items: dict[str, int] | None = None,
+        action: str = "archive",
+    ):
+        if action not in RETENTION_ACTIONS:
+            raise ValueError(f"Acción de retención desconocida '{action}'. Opciones: {', '.join(RETENTION_ACTIONS)}")
+        self.ttl_days = {str(k): float(v) for k, v in (ttl_days or {}).items() if v}
+        self.max_items = {str(k): int(v) for k, v in (max_items or {}).items() if v is not None}
+        self.action = action
+
+    @classmethod
+    def from_config(cls, cfg: dict[str, Any]) -> RetentionPolicy:
+        return cls(
+            ttl_days=get_default(cfg, "memory", "ttl_days", None) or {},
+            max_items=get_default(cfg, "memory", "max_items", None) or {},
+            action=get_default(cfg, "memory", "retention", "archive"),
+        )
+
+    def active(self) -> bool:
+        return bool(self.ttl_days or self.max_items)
+
+    def _rule(self, rules: dict[str, Any], tag: Any) -> Any:
+        return rules.get(str(tag)) if str(tag) in rules else rules.get(ANY_TAG)
+
+    def expired(self, items: list[dict[str, Any]], now: float | None = None) -> list[int]:
+        """Posiciones (ordenadas) de los items que la política saca de la memoria caliente."""
+        now = time.time() if now is None else now
+        out: set[int] = set()
+        by_tag: dict[Any, list[tuple[float, int]]] = {}
+        for pos, it in enumerate(items):
+            tag = (it.get("meta") or {}).get("tag") or ANY_TAG
+            t = item_time(it)
+            ttl = self._rule(self.ttl_days, tag)
+            if ttl and t is not None and now - t > ttl * 86400.0:
+                out.add(pos)
+                continue
+            if self._rule(self.max_items, tag) is not None:
+                by_tag.setdefault(tag, []).append((-math.inf if t is None else t, pos))
+        for tag, entries in by_tag.items():
+            limit = self._rule(self.max_items, tag)
+            if len(entries) > limit:
+                entries.sort()
+                out.update(pos for _, pos in entries[: len(entries) - limit])
+        return sorted(out)
+
+
+def apply_retention(vs: Any, path: str | Path, policy: RetentionPolicy, now: float | None = None, dry_run: bool = False):
+    """
+    Compactación por niveles de un VectorStore (ver VectorStore.retain): saca los items vencidos según
+    policy (archivándolos en un segmento frío o descartándolos) y reescribe el snapshot caliente en path.
+    Devuelve (store, stats); el store es uno nuevo si hubo cambios, o vs tal cual.
+    """
+    return vs.retain(str(path), policy, now=now, dry_run=dry_run)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import heapq
+import math
+from collections.abc import Iterable
+
+# Motores de scoring soportados por VectorStore.search
+SCORINGS = ("cosine-tf", "tfidf", "bm25")
+DEFAULT_SCORING = "cosine-tf"
+
+
+class CorpusStats:
+    """
+    Estadísticas del corpus mantenidas de forma incremental al ingerir:
+      - df: documentos que contienen cada término
+      - n_docs / total_tokens: para el largo promedio (avgdl) de BM25
+    Nunca se recalculan por query.
+    """
+
+    def __init__(self) -> None:
+        self.df: dict[str, int] = {}
+        self.n_docs = 0
+        self.total_tokens = 0
+
+    def add(self, terms: Iterable[str], n_tokens: int) -> None:
+        for t in terms:
+            self.df[t] = self.df.get(t, 0) + 1
+        self.n_docs += 1
+        self.total_tokens += int(n_tokens or 0)
+
+    @property
+    def avgdl(self) -> float:
+        return (self.total_tokens / self.n_docs) if self.n_docs else 0.0
+
+    def idf(self, term: str) -> float:
+        # IDF suavizado (siempre > 0)
+        return math.log((1 + self.n_docs) / (1 + self.df.get(term, 0))) + 1.0
+
+    def idf_bm25(self, term: str) -> float:
+        df = self.df.get(term, 0)
+        return math.log(1.0 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+
+class Scorer:
+    """
+    Descompone el score como suma sobre términos en común: score = Σ qw(t) · dw(t, doc)
+      - cosine-tf: coseno entre vectores TF L2-normalizados (comportamiento histórico)
+      - tfidf:     coseno TF ponderado por idf² (las normas TF no se re-ponderan, así no
+                   hay que recalcular nada del corpus por query; el score puede superar 1)
+      - bm25:      Okapi BM25 clásico (k1, b); score no acotado a [0, 1]
+    """
+
+    def __init__(self, mode: str, stats: CorpusStats, k1: float = 1.2, b: float = 0.75) -> None:
+        if mode not in SCORINGS:
+            raise ValueError(f"Scoring desconocido '{mode}'. Opciones: {', '.join(SCORINGS)}")
+        self.mode = mode
+        self.stats = stats
+        self.k1 = k1
+        self.b = b
+
+    @property
+    def uses_length(self) -> bool:
+        """True si dw depende del largo del documento (no alcanza con el peso normalizado)."""
+        return self.mode == "bm25"
+
+    def query_weights(self, qbow: dict[str, float], qnorm: float) -> dict[str, float]:
+        if self.mode == "cosine-tf":
+            return dict(qbow)
+        if self.mode == "tfidf":
+            return {t: w * self.stats.idf(t) ** 2 for t, w in qbow.items()}
+        # bm25: frecuencia del término en la query × idf
+        return {t: (w * qnorm) * self.stats.idf_bm25(t) for t, w in qbow.items()}
+
+    def doc_weight_bound(self, max_w: float, max_tf: float) -> float:
+        """
+        Cota superior de dw(t, doc) para un término, a partir del mayor peso normalizado y la mayor
+        frecuencia cruda vistos en sus postings (para BM25 se toma el largo de documento → 0).
+        """
+        if self.mode != "bm25":
+            return max_w
+        return max_tf * (self.k1 + 1.0) / (max_tf + self.k1 * (1.0 - self.b))
+
+    def doc_weight(self, w: float, norm: float, n_tokens: int) -> float:
+        if self.mode != "bm25":
+            return w
+        tf = w * norm
+        avgdl = self.stats.avgdl or 1.0
+        return tf * (self.k1 + 1.0) / (tf + self.k1 * (1.0 - self.b + self.b * n_tokens / avgdl))
+
+
+def select_top_k(
+    acc: dict[int, float],
+    k: int,
+    min_score: float,
+    positions: Iterable[int],
+) -> list[tuple[float, int]]:
+    """
+    Top-k con heap acotado sobre {posición: score}. Devuelve [(score redondeado, posición)]
+    ordenado por score desc y luego orden de inserción.
+    positions: todas las posiciones en orden de inserción (se recorre en forma perezosa);
+    con min_score <= 0 los items sin términos en común (score 0) también califican y se
+    completan en ese orden, como hacía el escaneo completo.
+    """
+    ms = min_score or 0.0
+    key = lambda x: (-x[0], x[1])  # noqa: E731
+    best = heapq.nsmallest(k, ((round(float(sc), 4), pos) for pos, sc in acc.items() if sc >= ms), key=key)
+
+    if ms <= 0.0 and sum(1 for sc, _ in best if sc > 0) < k:
+        pad = []
+        for pos in positions:
+            if len(pad) >= k:
+                break
+            if pos not in acc:
+                pad.append((0.0, pos))
+        best = heapq.nsmallest(k, best + pad, key=key)
+    return best
@@ -1,47 +1,258 @@
+from __future__ import annotations
+
 import importlib
 import json
 import os
+import time
+import uuid
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import IO, Any
 
+from .dedup import fingerprint
+from .tokenizer import make_tokenizer
 from .vectorstore import VectorStore
 
+# Entradas por lote: se tokenizan/indexan y se escriben al log juntas
+DEFAULT_CHUNK = 1000
+# Bytes leídos por vez al recorrer un arreglo JSON
+_READ_SIZE = 1 << 20
+
+
+# ---------- Lectura en streaming ----------
+def _entry(obj: Any) -> dict[str, Any] | None:
+    """{text, tag?, meta?} (o alias contenido/nota, etiqueta/label) → {"text", "meta"}; None si no sirve."""
+    if not isinstance(obj, dict):
+        return None
+    text = obj.get("text") or obj.get("contenido") or obj.get("nota")
+    if not text or not isinstance(text, str):
+        return None
+    meta = dict(obj["meta"]) if isinstance(obj.get("meta"), dict) else {}
+    tag = obj.get("tag") or obj.get("etiqueta") or obj.get("label")
+    if tag:
+        meta["tag"] = tag
+    return {"text": text, "meta": meta}
 
-def _load_items(path: str):
-    ext = os.path.splitext(path)[1].lower()
-    if ext in (".yaml", ".yml"):
-        # Intento de import de PyYAML real (no otros 'yaml' raros)
+
+def _iter_jsonl(f: IO[str]) -> Iterator[Any]:
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
         try:
-            yaml = importlib.import_module("yaml")
-            if not hasattr(yaml, "safe_load"):
-                raise ImportError("El módulo 'yaml' cargado no es PyYAML.")
-        except Exception as e:
-            raise RuntimeError(
-                "El archivo de semillas es YAML pero PyYAML no está disponible. Instalá con: pip install PyYAML"
-            ) from e
-        with open(path, encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-    else:
-        # JSON por defecto
-        with open(path, encoding="utf-8") as f:
-            data = json.load(f)
-
-    if not isinstance(data, list):
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            continue  # línea inválida, la ignoramos
+
+
+def _iter_json_array(f: IO[str]) -> Iterator[Any]:
+    """Elementos de un arreglo JSON top-level, decodificados de a uno (memoria acotada al buffer)."""
+    dec = json.JSONDecoder()
+    buf = f.read(_READ_SIZE).lstrip()
+    if not buf.startswith("["):
         raise ValueError("El archivo de semillas debe ser una lista de objetos {text, tag}.")
+    pos = 1
+    eof = False
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        if pos < len(buf):
+            try:
+                obj, pos = dec.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError("Arreglo JSON inválido o incompleto en el archivo de semillas.") from None
+            else:
+                yield obj
+                continue
+        elif eof:
+            raise ValueError("Arreglo JSON sin cerrar en el archivo de semillas.")
+        # Elemento cortado por el borde del buffer (o buffer consumido): se descarta lo leído y se lee más
+        more = f.read(max(_READ_SIZE, len(buf) - pos))
+        eof = not more
+        buf = buf[pos:] + more
+        pos = 0
 
-    items = []
-    for obj in data:
-        if not isinstance(obj, dict):
+
+def _iter_yaml(f: IO[str]) -> Iterator[Any]:
+    """
+    Elementos de una lista YAML top-level. Se parsea un elemento por vez (cortando en las líneas
+    "- " de columna 0) para no cargar el archivo entero; sin PyYAML real, error explícito.
+    """
+    try:
+        yaml = importlib.import_module("yaml")
+        if not hasattr(yaml, "safe_load"):
+            raise ImportError("El módulo 'yaml' cargado no es PyYAML.")
+    except Exception as e:
+        raise RuntimeError(
+            "El archivo de semillas es YAML pero PyYAML no está disponible. Instalá con: pip install PyYAML"
+        ) from e
+
+    def parse(lines: list[str]) -> list[Any]:
+        data = yaml.safe_load("".join(lines))
+        if data is None:
+            return []
+        if not isinstance(data, list):
+            raise ValueError("El archivo de semillas debe ser una lista de objetos {text, tag}.")
+        return data
+
+    pending: list[str] = []
+    has_item = False
+    for line in f:
+        if line.startswith(("---", "...")):
             continue
-        text = obj.get("text") or obj.get("contenido") or obj.get("nota")
-        tag = obj.get("tag") or obj.get("etiqueta") or obj.get("label")
-        if text:
-            items.append({"text": text, "meta": {"tag": tag} if tag else {}})
+        if line.startswith(("- ", "-\n", "-\r\n")):
+            if has_item:
+                yield from parse(pending)
+                pending = []
+            has_item = True
+        pending.append(line)
+    yield from parse(pending)
+
+
+def iter_seed_records(path: str | Path) -> Iterator[dict[str, Any]]:
+    """
+    Entradas {"text", "meta"} de un archivo de semillas, en streaming: JSONL (.jsonl/.ndjson o .json
+    que no empieza con "["), arreglo JSON o lista YAML (.yaml/.yml). Se ignoran los elementos sin texto.
+    """
+    ext = os.path.splitext(str(path))[1].lower()
+    with open(path, encoding="utf-8") as f:
+        if ext in (".yaml", ".yml"):
+            objs: Iterator[Any] = _iter_yaml(f)
+        elif ext == ".json":
+            head = f.read(64).lstrip()
+            f.seek(0)
+            objs = _iter_json_array(f) if head.startswith("[") else _iter_jsonl(f)
+        else:
+            objs = _iter_jsonl(f)
+        for obj in objs:
+            entry = _entry(obj)
+            if entry is not None:
+                yield entry
+
+
+def batched(records: Iterable[dict[str, Any]], n: int) -> Iterator[list[dict[str, Any]]]:
+    it = iter(records)
+    while batch := list(islice(it, max(1, n))):
+        yield batch
+
+
+# ---------- Preparación (tokenización + huella), opcionalmente en otros procesos ----------
+_WORKER: tuple[VectorStore, bool] | None = None
+
+
+def _init_worker(stem: bool, dedup: bool) -> None:
+    global _WORKER
+    _WORKER = (VectorStore(tokenizer=make_tokenizer(stem)), dedup)
+
+
+def _prepare(entries: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Arma los items del lote con vector (bow/norm/n_tokens) y, si hay dedup, huella MinHash."""
+    vs, dedup = _WORKER  # type: ignore[misc]
+    items = []
+    for e in entries:
+        item = {"id": str(uuid.uuid4()), "text": e["text"], "meta": e.get("meta") or {}}
+        vs._vectorize(item)
+        if dedup:
+            fingerprint(item)
+        items.append(item)
     return items
 
 
-def seed_from_file(path: str, db_dir: str = "memoria/vector_db"):
-    vs = VectorStore(db_dir)
-    items = _load_items(path)
-    for it in items:
-        vs.add_text(it["text"], it["meta"])
-    vs.save()
-    return {"ok": True, "ingested": len(items), "db_dir": db_dir, "file": path}
+class _Progress:
+    def __init__(self, callback: Callable[[dict[str, Any]], None] | None):
+        self.callback = callback
+        self.t0 = time.perf_counter()
+        self.read = 0
+        self.ingested = 0
+
+    def update(self, read: int, ingested: int) -> None:
+        self.read += read
+        self.ingested += ingested
+        if self.callback is not None:
+            self.callback(self.stats())
+
+    def stats(self) -> dict[str, Any]:
+        secs = time.perf_counter() - self.t0
+        return {
+            "read": self.read,
+            "ingested": self.ingested,
+            "secs": round(secs, 3),
+            "items_per_s": round(self.read / secs, 1) if secs > 0 else 0.0,
+        }
+
+
+def bulk_load(
+    store: Any,
+    records: Iterable[dict[str, Any]],
+    path: str | Path | None = None,
+    chunk: int = DEFAULT_CHUNK,
+    workers: int = 0,
+    progress: Callable[[dict[str, Any]], None] | None = None,
+) -> dict[str, Any]:
+    """
+    Carga masiva en lotes de chunk entradas: cada lote se tokeniza (con workers > 0, en procesos
+    aparte), se indexa con store.add_items y, con path, se persiste enseguida (append al log del
+    VectorStore / commit en SQLite). Sólo hay en memoria los lotes en curso, no el archivo entero.
+    Devuelve (y pasa a progress tras cada lote) {"read", "ingested", "secs", "items_per_s"}.
+    """
+    prog = _Progress(progress)
+    stem = bool(getattr(store.tokenizer, "stem", False))
+    if workers > 0 and make_tokenizer(stem).signature != store.tokenizer.signature:
+        workers = 0  # tokenizer a medida: no se puede reconstruir en los workers
+    dedup = getattr(store, "dedup", "keep") != "keep"
+
+    def commit(items: list[dict[str, Any]]) -> None:
+        added = store.add_items(items)
+        if path is not None:
+            store.save(str(path))
+        prog.update(len(items), added)
+
+    batches = batched(records, chunk)
+    if workers <= 0:
+        for batch in batches:
+            commit([{"id": str(uuid.uuid4()), "text": e["text"], "meta": e.get("meta") or {}} for e in batch])
+        return prog.stats()
+
+    # A lo sumo 2 lotes en vuelo por worker: la lectura no se adelanta al indexado
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(stem, dedup)) as pool:
+        pending: deque[Future[list[dict[str, Any]]]] = deque()
+        for batch in batches:
+            pending.append(pool.submit(_prepare, batch))
+            if len(pending) >= 2 * workers:
+                commit(pending.popleft().result())
+        while pending:
+            commit(pending.popleft().result())
+    return prog.stats()
+
+
+def stream_ingest(
+    ingest: Callable[[list[dict[str, Any]]], int],
+    records: Iterable[dict[str, Any]],
+    chunk: int = DEFAULT_CHUNK,
+    progress: Callable[[dict[str, Any]], None] | None = None,
+) -> dict[str, Any]:
+    """Como bulk_load, pero entregando cada lote a ingest (ej. MemoryClient.ingest del daemon)."""
+    prog = _Progress(progress)
+    for batch in batched(records, chunk):
+        prog.update(len(batch), ingest(batch))
+    return prog.stats()
+
+
+def seed_from_file(
+    path: str,
+    db_dir: str = "memoria/vector_db",
+    chunk: int = DEFAULT_CHUNK,
+    workers: int = 0,
+    progress: Callable[[dict[str, Any]], None] | None = None,
+) -> dict[str, Any]:
+    db_path = Path(db_dir) / "vectorstore.json"
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    vs = VectorStore.load(str(db_path))
+    stats = bulk_load(vs, iter_seed_records(path), db_path, chunk=chunk, workers=workers, progress=progress)
+    return {"ok": True, **stats, "db_dir": db_dir, "file": path}
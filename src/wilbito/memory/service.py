@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from wilbito.config import get_default
+from wilbito.memory.filters import normalize_filter
+from wilbito.memory.qcache import DEFAULT_ENTRIES, QueryCache, query_cache_path
+from wilbito.memory.retention import RetentionPolicy, apply_retention
+from wilbito.memory.snapshot import MmapSnapshot, open_fresh, snapshot_path
+from wilbito.memory.sqlite_store import SqliteVectorStore
+from wilbito.memory.tokenizer import Tokenizer, make_tokenizer
+from wilbito.memory.vectorstore import VectorStore, wal_path
+
+Store = VectorStore | SqliteVectorStore
+
+# Servicios compartidos del proceso (sólo lectura), en orden de uso:
+# (raíz, config de memoria) → (MemoryService, último uso según time.monotonic())
+_SHARED: dict[tuple[str, str], tuple[MemoryService, float]] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def mem_db_path(root: str | Path) -> Path:
+    return Path(root) / "memoria" / "vector_db" / "vectorstore.json"
+
+
+def mem_sqlite_path(root: str | Path) -> Path:
+    return Path(root) / "memoria" / "vector_db" / "vectorstore.db"
+
+
+def config_tokenizer(cfg: dict[str, Any]) -> Tokenizer:
+    return make_tokenizer(bool(get_default(cfg, "memory", "stemming", False)))
+
+
+def load_store(cfg: dict[str, Any], root: str | Path, scoring: str | None = None) -> Store:
+    """Store de memoria de root según la sección memory de la config."""
+    scoring = scoring or get_default(cfg, "memory", "scoring", "cosine-tf")
+    if get_default(cfg, "memory", "store", "json") == "sqlite":
+        db = SqliteVectorStore.load(str(mem_sqlite_path(root)), scoring=scoring, tokenizer=config_tokenizer(cfg))
+        db.dedup = get_default(cfg, "memory", "dedup", "skip")
+        db.dedup_threshold = float(get_default(cfg, "memory", "dedup_threshold", 0.8))
+        return db
+    vdb = VectorStore.load(
+        str(mem_db_path(root)),
+        scoring=scoring,
+        backend=get_default(cfg, "memory", "backend", "python"),
+        tokenizer=config_tokenizer(cfg),
+        mode=get_default(cfg, "memory", "mode", "sparse"),
+    )
+    vdb.dense_nprobe = int(get_default(cfg, "memory", "dense_nprobe", 8))
+    vdb.mmap_snapshot = bool(get_default(cfg, "memory", "snapshot", False))
+    vdb.dedup = get_default(cfg, "memory", "dedup", "skip")
+    vdb.dedup_threshold = float(get_default(cfg, "memory", "dedup_threshold", 0.8))
+    vdb.decay_half_life_days = float(get_default(cfg, "memory", "decay_half_life_days", 0) or 0)
+    return vdb
+
+
+def open_reader(cfg: dict[str, Any], root: str | Path, scoring: str | None = None) -> Store | MmapSnapshot:
+    """
+    Store para consultas de solo lectura: con memory.snapshot usa vectorstore.snap vía mmap si está
+    al día (sin parsear todo el JSON); si no, carga el store normal. El snapshot binario es del
+    índice disperso sin decaimiento temporal: con memory.mode: dense o memory.decay_half_life_days
+    siempre se carga el store (vectores densos vía mmap).
+    """
+    if (
+        get_default(cfg, "memory", "snapshot", False)
+        and get_default(cfg, "memory", "store", "json") == "json"
+        and get_default(cfg, "memory", "mode", "sparse") != "dense"
+        and not get_default(cfg, "memory", "decay_half_life_days", 0)
+    ):
+        snap = open_fresh(
+            mem_db_path(root),
+            scoring=scoring or get_default(cfg, "memory", "scoring", "cosine-tf"),
+            tokenizer=config_tokenizer(cfg),
+        )
+        if snap is not None:
+            return snap
+    return load_store(cfg, root, scoring)
+
+
+def store_files(cfg: dict[str, Any], root: str | Path) -> list[Path]:
+    """
+    Archivos cuya modificación invalida un store ya cargado (snapshot + log, o la base SQLite con su
+    -wal: en modo WAL los commits de otras conexiones sólo tocan la base al hacer checkpoint).
+    """
+    if get_default(cfg, "memory", "store", "json") == "sqlite":
+        db = mem_sqlite_path(root)
+        return [db, db.with_name(db.name + "-wal")]
+    files = [mem_db_path(root), wal_path(mem_db_path(root))]
+    if get_default(cfg, "memory", "snapshot", False):
+        files.append(snapshot_path(mem_db_path(root)))
+    return files
+
+
+def _stamp(paths: list[Path]) -> tuple[tuple[int, int] | None, ...]:
+    out = []
+    for p in paths:
+        try:
+            st = p.stat()
+            out.append((st.st_size, st.st_mtime_ns))
+        except OSError:
+            out.append(None)
+    return tuple(out)
+
+
+class MemoryService:
+    """
+    Store residente (índice en memoria entre requests) con las operaciones del daemon y de la API:
+    ping, search, search_many, ingest, retention. Las operaciones se serializan con un lock (el store
+    arma índices perezosos al buscar). Si otro proceso modificó los archivos del store, se recarga.
+    retention: política de retención (TTL / máximos por tag) que aplica enforce_retention.
+    cache: cache de resultados de search/search_many; la versión del store es el estado de los
+           archivos vigilados (cada save los cambia) + scope (config) + la hora si cache_hourly
+           (decaimiento temporal). Un hit no carga el store.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Store | MmapSnapshot],
+        save_path: str | Path,
+        watch: list[Path] | None = None,
+        readonly: bool = False,
+        retention: RetentionPolicy | None = None,
+        cache: QueryCache | None = None,
+        scope: str = "",
+        cache_hourly: bool = False,
+    ):
+        self._loader = loader
+        self.save_path = Path(save_path)
+        self._watch = list(watch or [])
+        self.readonly = readonly
+        self.retention = retention or RetentionPolicy()
+        self.cache = cache
+        self._scope = scope
+        self._cache_hourly = cache_hourly
+        self._lock = threading.RLock()
+        self._store: Store | MmapSnapshot | None = None
+        self._stamp: tuple[tuple[int, int] | None, ...] = ()
+
+    @classmethod
+    def from_config(
+        cls, cfg: dict[str, Any], root: str | Path, readonly: bool = False, scoring: str | None = None
+    ) -> MemoryService:
+        """
+        readonly: sólo búsquedas, abriendo el snapshot binario vía mmap si está habilitado y al día.
+        scoring: pisa memory.scoring. El cache de resultados sale de memory.query_cache (entradas,
+        0 = sin cache) y memory.query_cache_persist (memoria/vector_db/query_cache.json).
+        """
+        sqlite = get_default(cfg, "memory", "store", "json") == "sqlite"
+        save_path = mem_sqlite_path(root) if sqlite else mem_db_path(root)
+        loader = (lambda: open_reader(cfg, root, scoring)) if readonly else (lambda: load_store(cfg, root, scoring))
+        size = int(get_default(cfg, "memory", "query_cache", DEFAULT_ENTRIES) or 0)
+        cache = None
+        if size > 0:
+            persist = get_default(cfg, "memory", "query_cache_persist", False)
+            cache = QueryCache(size, query_cache_path(root) if persist else None)
+        return cls(
+            loader,
+            save_path,
+            store_files(cfg, root),
+            readonly=readonly,
+            retention=RetentionPolicy.from_config(cfg),
+            cache=cache,
+            scope=json.dumps([cfg.get("memory") or {}, scoring], sort_keys=True, default=str),
+            cache_hourly=bool(get_default(cfg, "memory", "decay_half_life_days", 0)),
+        )
+
+    def store(self) -> Store | MmapSnapshot:
+        with self._lock:
+            stamp = _stamp(self._watch)
+            if self._store is None or stamp != self._stamp:
+                if isinstance(self._store, (MmapSnapshot, SqliteVectorStore)):
+                    self._store.close()
+                self._store = self._loader()
+                self._stamp = _stamp(self._watch)
+            return self._store
+
+    def close(self) -> None:
+        """Libera el store cargado (se vuelve a cargar en el próximo uso)."""
+        with self._lock:
+            if isinstance(self._store, (MmapSnapshot, SqliteVectorStore)):
+                self._store.close()
+            self._store = None
+
+    def _version(self) -> list[Any]:
+        hour = int(time.time() // 3600) if self._cache_hourly else 0
+        return [self._scope, _stamp(self._watch), hour]
+
+    # ---------- Operaciones ----------
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        min_score: float = 0.0,
+        prefer_tags: list[str] | None = None,
+        filter: dict[str, Any] | None = None,
+    ) -> list[dict[str, Any]]:
+        flt = normalize_filter(filter) if filter else None
+        with self._lock:
+            if self.cache is None:
+                return self.store().search(query, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags, filter=flt)
+            key = QueryCache.key(query, top_k, min_score, prefer_tags, flt, self._version())
+            results = self.cache.get(key)
+            if results is None:
+                results = self.store().search(query, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags, filter=flt)
+                self.cache.put(key, results)
+                self.cache.flush()
+            return results
+
+    def search_many(
+        self,
+        queries: list[str],
+        top_k: int = 5,
+        min_score: float = 0.0,
+        prefer_tags: list[str] | None = None,
+        filter: dict[str, Any] | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        flt = normalize_filter(filter) if filter else None
+        with self._lock:
+            if self.cache is None:
+                return self.store().search_many(queries, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags, filter=flt)
+            version = self._version()
+            keys = [QueryCache.key(q, top_k, min_score, prefer_tags, flt, version) for q in queries]
+            out = [self.cache.get(key) for key in keys]
+            missing = list(dict.fromkeys(q for q, res in zip(queries, out, strict=True) if res is None))
+            if missing:
+                found = self.store().search_many(missing, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags, filter=flt)
+                fresh = dict(zip(missing, found, strict=True))
+                for i, q in enumerate(queries):
+                    if out[i] is None:
+                        self.cache.put(keys[i], fresh[q])
+                        out[i] = [dict(h) for h in fresh[q]]
+                self.cache.flush()
+            return out  # type: ignore[return-value]
+
+    def ingest(self, entries: list[dict[str, Any]]) -> int:
+        """Agrega entries [{text, meta?}] y las persiste (append al log). Devuelve cuántas se agregaron."""
+        if self.readonly:
+            raise ValueError("MemoryService de sólo lectura: no admite ingest")
+        with self._lock:
+            vdb = self.store()
+            added = vdb.add_texts(entries)  # type: ignore[union-attr]
+            self.save_path.parent.mkdir(parents=True, exist_ok=True)
+            vdb.save(str(self.save_path))  # type: ignore[union-attr]
+            # Cambios propios: no invalidan el store cargado (sí los resultados cacheados)
+            self._stamp = _stamp(self._watch)
+            if self.cache is not None:
+                self.cache.clear()
+            return added
+
+    def enforce_retention(self, dry_run: bool = False, now: float | None = None) -> dict[str, Any]:
+        """
+        Aplica la política de retención al store (ver wilbito.memory.retention.apply_retention) y
+        se queda con el store compactado. Devuelve las estadísticas {items, expired, kept, action, segment?}.
+        """
+        if self.readonly and not dry_run:
+            raise ValueError("MemoryService de sólo lectura: no admite retention")
+        with self._lock:
+            vdb = self.store()
+            if not isinstance(vdb, VectorStore):
+                raise ValueError("La retención requiere memory.store: json")
+            self._store, stats = apply_retention(vdb, self.save_path, self.retention, now=now, dry_run=dry_run)
+            self._stamp = _stamp(self._watch)
+            if self.cache is not None and not dry_run:
+                self.cache.clear()
+            return stats
+
+    def handle(self, req: dict[str, Any]) -> dict[str, Any]:
+        """Despacha un request {"op", ...} → {"ok": True, ...} o {"ok": False, "error"}."""
+        op = req.get("op")
+        try:
+            if op == "ping":
+                with self._lock:
+                    return {"ok": True, "items": len(self.store())}
+            if op == "search":
+                results = self.search(
+                    str(req["query"]),
+                    top_k=int(req.get("top_k", 5)),
+                    min_score=float(req.get("min_score", 0.0)),
+                    prefer_tags=req.get("prefer_tags"),
+                    filter=req.get("filter"),
+                )
+                return {"ok": True, "results": results}
+            if op == "search_many":
+                results = self.search_many(
+                    [str(q) for q in req["queries"]],
+                    top_k=int(req.get("top_k", 5)),
+                    min_score=float(req.get("min_score", 0.0)),
+                    prefer_tags=req.get("prefer_tags"),
+                    filter=req.get("filter"),
+                )
+                return {"ok": True, "results": results}
+            if op == "ingest":
+                return {"ok": True, "ingested": self.ingest(list(req["entries"]))}
+            if op == "retention":
+                return {"ok": True, **self.enforce_retention(dry_run=bool(req.get("dry_run", False)))}
+            return {"ok": False, "error": f"op desconocida: {op!r}"}
+        except (KeyError, TypeError, ValueError) as e:
+            return {"ok": False, "error": f"request inválido: {e!r}"}
+
+
+def shared_service(cfg: dict[str, Any], root: str | Path) -> MemoryService:
+    """
+    Servicio de sólo lectura compartido por todo el proceso para root: el store se carga una vez
+    y se reutiliza entre llamadas (RAG del router, consejo, contexto) hasta que cambien sus archivos.
+    El cache guarda a lo sumo memory.cache_max_stores servicios (se descarta el menos usado) y
+    libera los que no se usaron en memory.cache_ttl_s segundos (0 = sin vencimiento).
+    """
+    root = Path(root).resolve()
+    key = (str(root), json.dumps(cfg.get("memory") or {}, sort_keys=True, default=str))
+    max_stores = max(1, int(get_default(cfg, "memory", "cache_max_stores", 4)))
+    ttl = float(get_default(cfg, "memory", "cache_ttl_s", 600))
+    now = time.monotonic()
+    with _SHARED_LOCK:
+        if ttl > 0:
+            for k in [k for k, (_, used) in _SHARED.items() if now - used > ttl]:
+                _SHARED.pop(k)[0].close()
+        entry = _SHARED.pop(key, None)
+        svc = entry[0] if entry is not None else MemoryService.from_config(cfg, root, readonly=True)
+        _SHARED[key] = (svc, now)  # al final: el más recientemente usado
+        while len(_SHARED) > max_stores:
+            _SHARED.pop(next(iter(_SHARED)))[0].close()
+        return svc
+
+
+def clear_shared() -> None:
+    """Descarta todos los servicios compartidos del proceso (libera los stores cargados)."""
+    with _SHARED_LOCK:
+        for svc, _ in _SHARED.values():
+            svc.close()
+        _SHARED.clear()
@@ -0,0 +1,397 @@
+from __future__ import annotations
+
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any
+
+from wilbito.memory.filelock import file_lock
+from wilbito.memory.filters import match_meta, normalize_filter
+from wilbito.memory.scoring import DEFAULT_SCORING, CorpusStats, Scorer, select_top_k
+from wilbito.memory.tokenizer import DEFAULT_TOKENIZER, Tokenizer
+from wilbito.memory.vectorstore import VectorStore, read_wal, wal_path
+
+# Formato binario de solo lectura (pensado para abrirse con mmap):
+#   MAGIC | uint64 largo del header | header JSON (padding a 8) | secciones alineadas a 8 bytes
+# Secciones (arrays en el orden de bytes nativo registrado en el header):
+#   term_off  Q[n_terms+1]  offsets en term_blob (términos ordenados por bytes UTF-8)
+#   term_blob bytes
+#   post_off  Q[n_terms+1]  offsets en post_doc/post_w
+#   post_doc  I[nnz]        posición del item
+#   post_w    d[nnz]        peso L2-normalizado
+#   doc_norm  d[n]          norma de conteos (BM25)
+#   doc_ntok  I[n]          cantidad de tokens (BM25)
+#   doc_tag   i[n]          índice en header["tags"] (-1 sin tag)
+#   doc_off   Q[n+1]        offsets en doc_blob
+#   doc_blob  bytes         {"id", "text", "meta"} en JSON por item
+#   id_hash   Q[n]          hashes de ids ordenados (para descartar del log lo ya incluido)
+MAGIC = b"WBSNAP01"
+SNAPSHOT_VERSION = 1
+
+_SECTIONS = [
+    ("term_off", "Q"),
+    ("term_blob", "B"),
+    ("post_off", "Q"),
+    ("post_doc", "I"),
+    ("post_w", "d"),
+    ("doc_norm", "d"),
+    ("doc_ntok", "I"),
+    ("doc_tag", "i"),
+    ("doc_off", "Q"),
+    ("doc_blob", "B"),
+    ("id_hash", "Q"),
+]
+
+
+def snapshot_path(path: str | Path) -> Path:
+    """vectorstore.json → vectorstore.snap"""
+    p = Path(path)
+    return p.with_name(p.stem + ".snap")
+
+
+def _id_hash(item_id: Any) -> int:
+    return int.from_bytes(hashlib.blake2b(str(item_id).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _pad8(n: int) -> int:
+    return (8 - n % 8) % 8
+
+
+def write_snapshot(vs: VectorStore, path: str | Path, source: str | Path | None = None) -> dict[str, Any]:
+    """
+    Serializa el índice de un VectorStore al formato binario. source: snapshot JSON del que
+    proviene (se guarda su tamaño/mtime para detectar si quedó desactualizado).
+    """
+    vs._sync_index()
+    terms = sorted(vs._index, key=lambda t: t.encode("utf-8"))
+    tags: list[str] = []
+    tag_ids: dict[str, int] = {}
+
+    term_off, term_blob = array("Q", [0]), bytearray()
+    post_off, post_doc, post_w = array("Q", [0]), array("I"), array("d")
+    for t in terms:
+        term_blob += t.encode("utf-8")
+        term_off.append(len(term_blob))
+        for pos, w in vs._index[t]:
+            post_doc.append(pos)
+            post_w.append(w)
+        post_off.append(len(post_doc))
+
+    doc_norm, doc_ntok, doc_tag = array("d"), array("I"), array("i")
+    doc_off, doc_blob = array("Q", [0]), bytearray()
+    for it in vs.items:
+        meta = it.get("meta", {}) or {}
+        doc_norm.append(float(it.get("norm", 1.0) or 0.0))
+        doc_ntok.append(int(it.get("n_tokens", 0) or 0))
+        tag = meta.get("tag")
+        if isinstance(tag, str):
+            if tag not in tag_ids:
+                tag_ids[tag] = len(tags)
+                tags.append(tag)
+            doc_tag.append(tag_ids[tag])
+        else:
+            doc_tag.append(-1)
+        doc = {"id": it.get("id"), "text": it.get("text", ""), "meta": meta}
+        doc_blob += json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        doc_off.append(len(doc_blob))
+    id_hash = array("Q", sorted(_id_hash(it.get("id")) for it in vs.items))
+
+    data = {
+        "term_off": term_off,
+        "term_blob": term_blob,
+        "post_off": post_off,
+        "post_doc": post_doc,
+        "post_w": post_w,
+        "doc_norm": doc_norm,
+        "doc_ntok": doc_ntok,
+        "doc_tag": doc_tag,
+        "doc_off": doc_off,
+        "doc_blob": doc_blob,
+        "id_hash": id_hash,
+    }
+    sections: dict[str, list[int]] = {}
+    off = 0
+    for name, _ in _SECTIONS:
+        raw = data[name]
+        n = len(raw) if isinstance(raw, bytearray) else raw.itemsize * len(raw)
+        sections[name] = [off, n]
+        off += n + _pad8(n)
+
+    src_stat = None
+    if source is not None and Path(source).exists():
+        st = Path(source).stat()
+        src_stat = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "byteorder": sys.byteorder,
+        "tokenizer": vs.tokenizer.signature,
+        "n_docs": len(vs.items),
+        "n_terms": len(terms),
+        "total_tokens": vs.stats.total_tokens,
+        "tags": tags,
+        "sections": sections,
+        "source": src_stat,
+    }
+    hbytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    hbytes += b" " * _pad8(len(hbytes))
+
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_name(p.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(hbytes)))
+        f.write(hbytes)
+        for name, _ in _SECTIONS:
+            raw = data[name]
+            b = bytes(raw) if isinstance(raw, bytearray) else raw.tobytes()
+            f.write(b)
+            f.write(b"\0" * _pad8(len(b)))
+    os.replace(tmp, p)
+    return {"ok": True, "snapshot": str(p), "items": len(vs.items), "terms": len(terms)}
+
+
+class MmapSnapshot:
+    """
+    Lector de solo lectura sobre el snapshot binario mapeado con mmap. Una búsqueda sólo toca el
+    vocabulario (búsqueda binaria), los postings de los términos de la query y el JSON de los
+    ganadores: la latencia en frío no depende del tamaño total del texto.
+    tail: items del log append-only posteriores al snapshot; se indexan en memoria y se puntúan
+    junto con los del snapshot (estadísticas combinadas).
+    """
+
+    # Misma tokenización/vectorización que VectorStore (los scores coinciden)
+    tokenizer: Tokenizer = DEFAULT_TOKENIZER
+    _tokenize = VectorStore._tokenize
+    _vectorize = VectorStore._vectorize
+
+    def __init__(
+        self,
+        path: str | Path,
+        scoring: str = DEFAULT_SCORING,
+        tail: list[dict[str, Any]] | None = None,
+        tokenizer: Tokenizer | None = None,
+    ):
+        if tokenizer is not None:
+            self.tokenizer = tokenizer
+        self.path = Path(path)
+        self.scoring = scoring
+        Scorer(scoring, CorpusStats())  # valida el modo
+        self._f = self.path.open("rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} no es un snapshot de memoria válido")
+        (hlen,) = struct.unpack("<Q", self._mm[8:16])
+        self.header: dict[str, Any] = json.loads(self._mm[16 : 16 + hlen].decode("utf-8"))
+        if self.header.get("byteorder") != sys.byteorder or self.header.get("version") != SNAPSHOT_VERSION:
+            self.close()
+            raise ValueError(f"{self.path}: snapshot de otra plataforma o versión; regenerarlo")
+        base = 16 + hlen
+        mv = memoryview(self._mm)
+        self._views = [mv]
+        for name, fmt in _SECTIONS:
+            off, n = self.header["sections"][name]
+            view = mv[base + off : base + off + n]
+            if fmt != "B":
+                view = view.cast(fmt)
+            self._views.append(view)
+            setattr(self, "_" + name, view)
+        self.n_docs = int(self.header["n_docs"])
+        self.tags: list[str] = self.header.get("tags", [])
+
+        # Cola del log (posiciones n_docs, n_docs+1, ...)
+        self._tail: list[dict[str, Any]] = []
+        self._tail_index: dict[str, list[tuple[int, float]]] = {}
+        self._tail_tokens = 0
+        self._tail_ids: set[Any] = set()
+        self.add_tail(tail or [])
+        # Meta actualizada en el log (dedup con merge) para items del snapshot: {id: meta}
+        self.meta_overrides: dict[str, dict[str, Any]] = {}
+
+    def close(self) -> None:
+        for v in reversed(getattr(self, "_views", [])):
+            v.release()
+        self._views = []
+        if getattr(self, "_mm", None) is not None:
+            self._mm.close()
+            self._mm = None
+        self._f.close()
+
+    def __enter__(self) -> MmapSnapshot:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.n_docs + len(self._tail)
+
+    def add_tail(self, items: list[dict[str, Any]]) -> None:
+        """Indexa en memoria items del log que todavía no están en el snapshot."""
+        for it in items:
+            if it.get("id") in self._tail_ids or self._has_id(it.get("id")):
+                continue
+            self._tail_ids.add(it.get("id"))
+            if not isinstance(it.get("bow"), dict):
+                self._vectorize(it)
+            pos = self.n_docs + len(self._tail)
+            self._tail.append(it)
+            self._tail_tokens += int(it.get("n_tokens", 0) or 0)
+            for t, w in it["bow"].items():
+                self._tail_index.setdefault(t, []).append((pos, w))
+
+    # ---------- Lectura ----------
+    def _has_id(self, item_id: Any) -> bool:
+        h = _id_hash(item_id)
+        i = bisect.bisect_left(self._id_hash, h)
+        return i < len(self._id_hash) and self._id_hash[i] == h
+
+    def _term_at(self, i: int) -> bytes:
+        return bytes(self._term_blob[self._term_off[i] : self._term_off[i + 1]])
+
+    def _find_term(self, term: str) -> int:
+        """Búsqueda binaria en el vocabulario; -1 si no está."""
+        key = term.encode("utf-8")
+        lo, hi = 0, int(self.header["n_terms"])
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < int(self.header["n_terms"]) and self._term_at(lo) == key else -1
+
+    def _doc(self, pos: int) -> dict[str, Any]:
+        if pos >= self.n_docs:
+            it = self._tail[pos - self.n_docs]
+            return {"id": it.get("id"), "text": it.get("text", ""), "meta": it.get("meta", {}) or {}}
+        doc = json.loads(bytes(self._doc_blob[self._doc_off[pos] : self._doc_off[pos + 1]]).decode("utf-8"))
+        if self.meta_overrides and doc.get("id") in self.meta_overrides:
+            doc["meta"] = self.meta_overrides[doc.get("id")]
+        return doc
+
+    def _tag(self, pos: int) -> str | None:
+        if pos >= self.n_docs:
+            return (self._tail[pos - self.n_docs].get("meta", {}) or {}).get("tag")
+        if self.meta_overrides:
+            return (self._doc(pos).get("meta", {}) or {}).get("tag")
+        t = self._doc_tag[pos]
+        return self.tags[t] if t >= 0 else None
+
+    def _allows(self, pos: int, flt: dict[str, Any]) -> bool:
+        """Evalúa el filtro; el tag sale del array doc_tag y sólo se decodifica el doc si hace falta."""
+        tags = flt.get("tag")
+        if tags is not None and not isinstance(tags, dict):
+            if self._tag(pos) not in (tags if isinstance(tags, list) else [tags]):
+                return False
+            if len(flt) == 1:
+                return True
+        return match_meta(self._doc(pos).get("meta"), flt)
+
+    # ---------- Búsqueda ----------
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        min_score: float = 0.0,
+        prefer_tags: list[str] | None = None,
+        filter: dict[str, Any] | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        prefer_tags: si se provee, se aplica un pequeño boost al score
+        filter: condiciones de meta (ver wilbito.memory.filters)
+        """
+        k = max(1, top_k)
+        flt = normalize_filter(filter)
+        q: dict[str, Any] = {"text": query}
+        qbow = self._vectorize(q)
+
+        rows: dict[str, tuple[int, int]] = {}
+        stats = CorpusStats()
+        stats.n_docs = len(self)
+        stats.total_tokens = int(self.header["total_tokens"]) + self._tail_tokens
+        for t in qbow:
+            i = self._find_term(t)
+            a, b = (self._post_off[i], self._post_off[i + 1]) if i >= 0 else (0, 0)
+            rows[t] = (a, b)
+            stats.df[t] = (b - a) + len(self._tail_index.get(t, ()))
+        scorer = Scorer(self.scoring, stats)
+        qv = scorer.query_weights(qbow, q["norm"])
+
+        acc: dict[int, float] = {}
+        for t, qw in qv.items():
+            a, b = rows[t]
+            postings = list(zip(self._post_doc[a:b].tolist(), self._post_w[a:b].tolist(), strict=True))
+            postings += self._tail_index.get(t, [])
+            for pos, w in postings:
+                if scorer.uses_length:
+                    if pos < self.n_docs:
+                        w = scorer.doc_weight(w, self._doc_norm[pos], self._doc_ntok[pos])
+                    else:
+                        it = self._tail[pos - self.n_docs]
+                        w = scorer.doc_weight(w, it.get("norm", 1.0), it.get("n_tokens", 0))
+                acc[pos] = acc.get(pos, 0.0) + qw * w
+
+        positions: Any = range(len(self))
+        if flt:
+            acc = {pos: sc for pos, sc in acc.items() if self._allows(pos, flt)}
+            positions = (pos for pos in positions if self._allows(pos, flt))
+        if prefer_tags:
+            for pos in acc:
+                if self._tag(pos) in prefer_tags:
+                    acc[pos] *= 1.2  # boost suave
+
+        best = select_top_k(acc, k, min_score, positions)
+        out = []
+        for score, pos in best:
+            doc = self._doc(pos)
+            out.append({"id": doc.get("id"), "score": score, "text": doc.get("text", ""), "meta": doc.get("meta", {}) or {}})
+        return out
+
+    def search_many(
+        self,
+        queries: list[str],
+        top_k: int = 5,
+        min_score: float = 0.0,
+        prefer_tags: list[str] | None = None,
+        filter: dict[str, Any] | None = None,
+        workers: int = 0,
+    ) -> list[list[dict[str, Any]]]:
+        """Misma API que VectorStore.search_many; las queries repetidas se resuelven una vez."""
+        done = {
+            q: self.search(q, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags, filter=filter)
+            for q in dict.fromkeys(queries)
+        }
+        return [[dict(h) for h in done[q]] for q in queries]
+
+
+def open_fresh(json_path: str | Path, scoring: str = DEFAULT_SCORING, tokenizer: Tokenizer | None = None) -> MmapSnapshot | None:
+    """
+    Abre vectorstore.snap si corresponde al vectorstore.json actual (mismo tamaño/mtime) y suma
+    como cola los items del log append-only. None si no hay snapshot o quedó desactualizado.
+    """
+    jp = Path(json_path)
+    sp = snapshot_path(jp)
+    if not sp.exists() or not jp.exists():
+        return None
+    try:
+        snap = MmapSnapshot(sp, scoring=scoring, tokenizer=tokenizer)
+    except Exception:
+        return None
+    # Con el lock compartido: el JSON no se reescribe entre el chequeo y la lectura del log
+    with file_lock(jp, shared=True):
+        st = jp.stat()
+        src = snap.header.get("source") or {}
+        stale = src.get("size") != st.st_size or src.get("mtime_ns") != st.st_mtime_ns
+        if stale or snap.header.get("tokenizer") != snap.tokenizer.signature:
+            snap.close()
+            return None
+        snap.add_tail(read_wal(wal_path(jp), snap.meta_overrides, snap.tokenizer.signature))
+    return snap
@@ -0,0 +1,405 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import uuid
+from pathlib import Path
+from typing import Any
+
+from wilbito.memory.dedup import (
+    DEDUP_POLICIES,
+    DEFAULT_THRESHOLD,
+    FINGERPRINT_VERSION,
+    content_hash,
+    lsh_keys,
+    minhash,
+    similarity,
+)
+from wilbito.memory.filters import match_meta, normalize_filter
+from wilbito.memory.scoring import DEFAULT_SCORING, CorpusStats, Scorer, select_top_k
+from wilbito.memory.tokenizer import DEFAULT_TOKENIZER, Tokenizer
+from wilbito.memory.vectorstore import VectorStore
+
+DEFAULT_SQLITE_PATH = Path("memoria") / "vector_db" / "vectorstore.db"
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS mem_items (
+    pos INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT UNIQUE NOT NULL,
+    text TEXT NOT NULL,
+    meta_json TEXT,
+    tag TEXT,
+    bow_json TEXT NOT NULL,
+    norm REAL,
+    n_tokens INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_mem_items_tag ON mem_items(tag);
+CREATE VIRTUAL TABLE IF NOT EXISTS mem_fts USING fts5(text, content='mem_items', content_rowid='pos');
+CREATE TABLE IF NOT EXISTS mem_df (
+    term TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS mem_stats (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS mem_dedup (
+    pos INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_mem_dedup_hash ON mem_dedup(hash);
+CREATE TABLE IF NOT EXISTS mem_lsh (
+    key INTEGER NOT NULL,
+    pos INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_mem_lsh_key ON mem_lsh(key);
+"""
+
+
+def _fts_query(terms: list[str], prefix: bool = False) -> str:
+    """
+    OR de frases FTS5, una por término del tokenizer propio. FTS5 (unicode61) parte cada término
+    en sub-tokens, así que el resultado es un superconjunto de los items que comparten términos;
+    el score final se calcula con los bow guardados.
+    prefix: frases de prefijo ("term"*), para términos con stemming (FTS5 indexa las palabras
+            completas y una raíz es prefijo de ellas).
+    """
+    suffix = "*" if prefix else ""
+    phrases = ['"' + t.replace('"', '""') + '"' + suffix for t in terms if any(c.isalnum() for c in t)]
+    return " OR ".join(phrases)
+
+
+def _tag_clause(flt: dict[str, Any]) -> tuple[str, list[Any]]:
+    """Condición SQL sobre la columna tag para filtros de igualdad/pertenencia (' AND ...' o '')."""
+    tags = flt.get("tag")
+    if tags is None or isinstance(tags, dict):
+        return "", []
+    tags = tags if isinstance(tags, list) else [tags]
+    if not tags:
+        return " AND 0", []
+    return f" AND i.tag IN ({','.join('?' * len(tags))})", list(tags)
+
+
+class SqliteVectorStore:
+    """
+    VectorStore sobre SQLite: items en mem_items (con bow/norm/n_tokens precalculados), índice
+    FTS5 mem_fts para recuperar candidatos y df/largo total mantenidos en mem_df/mem_stats.
+    Misma API que VectorStore (add_text/add_texts/search/save) y mismos scores; WAL permite
+    lectores concurrentes y cada ingesta es un INSERT (sin reescribir archivos completos).
+    La conexión se puede usar desde otros hilos (daemon, API), pero no en paralelo: quien la
+    comparta serializa el acceso (MemoryService lo hace con su lock).
+    dedup / dedup_threshold: como en VectorStore; las huellas (hash exacto y buckets LSH) se
+    guardan en mem_dedup/mem_lsh y se completan al ingestar con dedup activo.
+    """
+
+    # Misma tokenización/vectorización que VectorStore (los scores coinciden)
+    tokenizer: Tokenizer = DEFAULT_TOKENIZER
+    dedup = "keep"
+    dedup_threshold = DEFAULT_THRESHOLD
+    _tokenize = VectorStore._tokenize
+    _vectorize = VectorStore._vectorize
+
+    def __init__(
+        self,
+        db_path: str | Path = DEFAULT_SQLITE_PATH,
+        scoring: str = DEFAULT_SCORING,
+        tokenizer: Tokenizer | None = None,
+    ):
+        if tokenizer is not None:
+            self.tokenizer = tokenizer
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL;")
+        self.conn.execute("PRAGMA synchronous=NORMAL;")
+        self.conn.executescript(SCHEMA_SQL)
+        self.conn.commit()
+        self.scoring = scoring
+        Scorer(scoring, CorpusStats())  # valida el modo
+        row = self.conn.execute("SELECT value FROM mem_stats WHERE key = 'tokenizer'").fetchone()
+        if row is not None and row[0] != self.tokenizer.signature:
+            self._retokenize()
+
+    @classmethod
+    def load(
+        cls, path: str | Path, scoring: str = DEFAULT_SCORING, tokenizer: Tokenizer | None = None, **_: Any
+    ) -> SqliteVectorStore:
+        return cls(path, scoring=scoring, tokenizer=tokenizer)
+
+    def save(self, path: str | Path | None = None) -> None:
+        """Compatibilidad con VectorStore.save: las escrituras ya son transaccionales."""
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __len__(self) -> int:
+        return int(self.conn.execute("SELECT COUNT(*) FROM mem_items").fetchone()[0])
+
+    # ---------- Ingesta ----------
+    def add_text(self, text: str, meta: dict[str, Any] | None = None) -> bool:
+        """Agrega un texto. Devuelve False si no se agregó (texto vacío o duplicado según self.dedup)."""
+        if not text or not isinstance(text, str):
+            return False
+        return self._insert([{"id": str(uuid.uuid4()), "text": text, "meta": meta or {}}]) > 0
+
+    def add_texts(self, entries: list[dict[str, Any]]) -> int:
+        """
+        entries: List[{"text": str, "meta": dict}]
+        """
+        items = [
+            {"id": str(uuid.uuid4()), "text": e.get("text"), "meta": e.get("meta", {}) or {}}
+            for e in entries
+            if e.get("text") and isinstance(e.get("text"), str)
+        ]
+        return self._insert(items)
+
+    def add_items(self, items: list[dict[str, Any]]) -> int:
+        """Agrega items ya armados {id, text, meta}, reutilizando bow/norm/n_tokens si vienen calculados."""
+        return self._insert([it for it in items if it.get("text") and isinstance(it.get("text"), str)], vectors_valid=True)
+
+    def _insert(self, items: list[dict[str, Any]], vectors_valid: bool = False) -> int:
+        """
+        Inserta items (reutiliza bow/norm/n_tokens si vienen válidos) y actualiza FTS y estadísticas
+        en una sola transacción. Los ids ya presentes y los duplicados según self.dedup se ignoran.
+        """
+        if self.dedup not in DEDUP_POLICIES:
+            raise ValueError(f"Política de dedup desconocida '{self.dedup}'. Opciones: {', '.join(DEDUP_POLICIES)}")
+        n = 0
+        total_tokens = 0
+        with self.conn:
+            if self.dedup != "keep":
+                self._sync_dedup()
+            for it in items:
+                if self.dedup != "keep":
+                    fp = {"hash": content_hash(it["text"]), "lsh": lsh_keys(minhash(it["text"]))}
+                    dup = self._find_duplicate(it["text"], fp)
+                    if dup is not None:
+                        if self.dedup == "merge":
+                            self._merge_meta(dup, it.get("meta") or {})
+                        continue
+                if not vectors_valid or not isinstance(it.get("bow"), dict):
+                    self._vectorize(it)
+                meta = it.get("meta", {}) or {}
+                cur = self.conn.execute(
+                    "INSERT OR IGNORE INTO mem_items(id, text, meta_json, tag, bow_json, norm, n_tokens) "
+                    "VALUES(?,?,?,?,?,?,?)",
+                    (
+                        it.get("id") or str(uuid.uuid4()),
+                        it["text"],
+                        json.dumps(meta, ensure_ascii=False),
+                        meta.get("tag"),
+                        json.dumps(it["bow"], ensure_ascii=False),
+                        it.get("norm", 1.0),
+                        it.get("n_tokens", 0),
+                    ),
+                )
+                if not cur.rowcount:
+                    continue
+                self.conn.execute("INSERT INTO mem_fts(rowid, text) VALUES(?, ?)", (cur.lastrowid, it["text"]))
+                if self.dedup != "keep":
+                    self._add_fingerprint(int(cur.lastrowid or 0), fp)
+                    self.conn.execute("INSERT OR REPLACE INTO mem_stats(key, value) VALUES('dedup_pos', ?)", (cur.lastrowid,))
+                self.conn.executemany(
+                    "INSERT INTO mem_df(term, df) VALUES(?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                    [(t,) for t in it["bow"]],
+                )
+                n += 1
+                total_tokens += int(it.get("n_tokens", 0) or 0)
+            if n:
+                self._bump_stat("n_docs", n)
+                self._bump_stat("total_tokens", total_tokens)
+            self.conn.execute("INSERT OR REPLACE INTO mem_stats(key, value) VALUES('tokenizer', ?)", (self.tokenizer.signature,))
+        return n
+
+    # ---------- Deduplicación ----------
+    def _sync_dedup(self) -> None:
+        """Calcula las huellas de las filas agregadas sin dedup (o con otra versión de huella)."""
+        rows = dict(self.conn.execute("SELECT key, value FROM mem_stats WHERE key IN ('dedup_v', 'dedup_pos')"))
+        last = int(rows.get("dedup_pos") or 0)
+        if str(rows.get("dedup_v")) != str(FINGERPRINT_VERSION):
+            self.conn.execute("DELETE FROM mem_dedup")
+            self.conn.execute("DELETE FROM mem_lsh")
+            last = 0
+        for pos, text in self.conn.execute("SELECT pos, text FROM mem_items WHERE pos > ? ORDER BY pos", (last,)).fetchall():
+            self._add_fingerprint(pos, {"hash": content_hash(text), "lsh": lsh_keys(minhash(text))})
+            last = pos
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO mem_stats(key, value) VALUES(?, ?)", [("dedup_v", FINGERPRINT_VERSION), ("dedup_pos", last)]
+        )
+
+    def _add_fingerprint(self, pos: int, fp: dict[str, Any]) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO mem_dedup(pos, hash) VALUES(?, ?)", (pos, fp["hash"]))
+        self.conn.executemany("INSERT INTO mem_lsh(key, pos) VALUES(?, ?)", [(key, pos) for key in fp["lsh"]])
+
+    def _find_duplicate(self, text: str, fp: dict[str, Any]) -> int | None:
+        """Posición de un item igual o casi igual (misma lógica que wilbito.memory.dedup.DedupIndex), o None."""
+        row = self.conn.execute("SELECT MIN(pos) FROM mem_dedup WHERE hash = ?", (fp["hash"],)).fetchone()
+        if row[0] is not None:
+            return int(row[0])
+        if not fp["lsh"]:
+            return None
+        marks = ",".join("?" * len(fp["lsh"]))
+        candidates = self.conn.execute(
+            f"SELECT i.pos, i.text FROM mem_items i WHERE i.pos IN (SELECT pos FROM mem_lsh WHERE key IN ({marks})) ORDER BY i.pos",
+            fp["lsh"],
+        ).fetchall()
+        sig = minhash(text)
+        for pos, other in candidates:
+            if similarity(sig, minhash(other)) >= self.dedup_threshold:
+                return int(pos)
+        return None
+
+    def _merge_meta(self, pos: int, meta: dict[str, Any]) -> None:
+        """Completa la meta del item existente con las claves nuevas (no pisa valores)."""
+        row = self.conn.execute("SELECT meta_json FROM mem_items WHERE pos = ?", (pos,)).fetchone()
+        old = json.loads(row[0] or "{}")
+        added = {k: v for k, v in meta.items() if k not in old}
+        if added:
+            old.update(added)
+            self.conn.execute(
+                "UPDATE mem_items SET meta_json = ?, tag = ? WHERE pos = ?",
+                (json.dumps(old, ensure_ascii=False), old.get("tag"), pos),
+            )
+
+    def _retokenize(self) -> None:
+        """Recalcula bow/norm/n_tokens de todas las filas y el df (la base se creó con otro tokenizer)."""
+        with self.conn:
+            rows = self.conn.execute("SELECT pos, text FROM mem_items").fetchall()
+            self.conn.execute("DELETE FROM mem_df")
+            total_tokens = 0
+            for pos, text in rows:
+                it: dict[str, Any] = {"text": text}
+                bow = self._vectorize(it)
+                self.conn.execute(
+                    "UPDATE mem_items SET bow_json = ?, norm = ?, n_tokens = ? WHERE pos = ?",
+                    (json.dumps(bow, ensure_ascii=False), it["norm"], it["n_tokens"], pos),
+                )
+                self.conn.executemany(
+                    "INSERT INTO mem_df(term, df) VALUES(?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                    [(t,) for t in bow],
+                )
+                total_tokens += it["n_tokens"]
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO mem_stats(key, value) VALUES(?, ?)",
+                [("n_docs", len(rows)), ("total_tokens", total_tokens), ("tokenizer", self.tokenizer.signature)],
+            )
+
+    def _bump_stat(self, key: str, delta: int) -> None:
+        self.conn.execute(
+            "INSERT INTO mem_stats(key, value) VALUES(?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + excluded.value",
+            (key, delta),
+        )
+
+    def _stats_for(self, terms: list[str]) -> CorpusStats:
+        """CorpusStats con df sólo de los términos de la query (no se carga el vocabulario completo)."""
+        stats = CorpusStats()
+        rows = dict(self.conn.execute("SELECT key, value FROM mem_stats WHERE key IN ('n_docs', 'total_tokens')"))
+        stats.n_docs = int(rows.get("n_docs") or 0)
+        stats.total_tokens = int(rows.get("total_tokens") or 0)
+        if terms:
+            marks = ",".join("?" * len(terms))
+            stats.df = dict(self.conn.execute(f"SELECT term, df FROM mem_df WHERE term IN ({marks})", terms))
+        return stats
+
+    # ---------- Búsqueda ----------
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        min_score: float = 0.0,
+        prefer_tags: list[str] | None = None,
+        filter: dict[str, Any] | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        prefer_tags: si se provee, se aplica un pequeño boost al score
+        filter: condiciones de meta (ver wilbito.memory.filters); el tag se filtra en SQL
+                (columna indexada) y el resto sobre meta_json de los candidatos.
+        """
+        k = max(1, top_k)
+        flt = normalize_filter(filter)
+        where, params = _tag_clause(flt)
+        q: dict[str, Any] = {"text": query}
+        qbow = self._vectorize(q)
+        scorer = Scorer(self.scoring, self._stats_for(list(qbow)))
+        qv = scorer.query_weights(qbow, q["norm"])
+
+        acc: dict[int, float] = {}
+        rows: dict[int, tuple[str, str, str]] = {}
+        match = _fts_query(list(qv), prefix=self.tokenizer.stem)
+        if match:
+            cur = self.conn.execute(
+                "SELECT i.pos, i.id, i.text, i.meta_json, i.tag, i.bow_json, i.norm, i.n_tokens "
+                "FROM mem_fts JOIN mem_items i ON i.pos = mem_fts.rowid WHERE mem_fts MATCH ?" + where,
+                (match, *params),
+            )
+            for pos, id_, text, meta_json, tag, bow_json, norm, n_tokens in cur:
+                if flt and not match_meta(json.loads(meta_json or "{}"), flt):
+                    continue
+                bow = json.loads(bow_json)
+                score = 0.0
+                for term, qw in qv.items():
+                    w = bow.get(term)
+                    if w is not None:
+                        score += qw * scorer.doc_weight(w, norm or 1.0, n_tokens or 0)
+                if score <= 0.0:
+                    continue
+                if prefer_tags and tag in prefer_tags:
+                    score *= 1.2  # boost suave
+                acc[pos] = score
+                rows[pos] = (id_, text, meta_json)
+
+        positions = (
+            pos
+            for pos, meta_json in self.conn.execute(f"SELECT pos, meta_json FROM mem_items i WHERE 1{where} ORDER BY pos", params)
+            if not flt or match_meta(json.loads(meta_json or "{}"), flt)
+        )
+        best = select_top_k(acc, k, min_score, positions)
+
+        missing = [pos for _, pos in best if pos not in rows]
+        if missing:
+            marks = ",".join("?" * len(missing))
+            for pos, id_, text, meta_json in self.conn.execute(
+                f"SELECT pos, id, text, meta_json FROM mem_items WHERE pos IN ({marks})", missing
+            ):
+                rows[pos] = (id_, text, meta_json)
+
+        out = []
+        for score, pos in best:
+            id_, text, meta_json = rows[pos]
+            out.append({"id": id_, "score": score, "text": text, "meta": json.loads(meta_json or "{}")})
+        return out
+
+    def search_many(
+        self,
+        queries: list[str],
+        top_k: int = 5,
+        min_score: float = 0.0,
+        prefer_tags: list[str] | None = None,
+        filter: dict[str, Any] | None = None,
+        workers: int = 0,
+    ) -> list[list[dict[str, Any]]]:
+        """Misma API que VectorStore.search_many; las queries repetidas se resuelven una vez."""
+        done = {
+            q: self.search(q, top_k=top_k, min_score=min_score, prefer_tags=prefer_tags, filter=filter)
+            for q in dict.fromkeys(queries)
+        }
+        return [[dict(h) for h in done[q]] for q in queries]
+
+
+def migrate_json_to_sqlite(
+    json_path: str | Path, db_path: str | Path = DEFAULT_SQLITE_PATH, tokenizer: Tokenizer | None = None
+) -> dict[str, Any]:
+    """
+    Migración única de vectorstore.json (+ log append-only) a SQLite. Conserva ids y reutiliza
+    los vectores ya calculados; es idempotente (los ids existentes se ignoran).
+    """
+    vs = VectorStore.load(str(json_path), tokenizer=tokenizer)
+    store = SqliteVectorStore(db_path, tokenizer=tokenizer)
+    try:
+        migrated = store._insert(vs.items, vectors_valid=True)
+        total = len(store)
+    finally:
+        store.close()
+    return {"ok": True, "source": str(json_path), "db": str(db_path), "migrated": migrated, "total": total}
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from functools import cache, lru_cache
+
+# Palabras vacías (ya sin tildes: se filtran después del plegado de acentos)
+STOPWORDS_ES = frozenset(
+    """
+    a al algo algunas algunos ante antes como con contra cual cuando de del desde donde durante e el ella
+    ellas ellos en entre era es esa esas ese eso esos esta estas este esto estos fue ha han hasta hay la las
+    le les lo los mas me mi mis mucho muchos muy nada ni no nos nosotros o os otra otras otro otros para pero
+    poco por porque que quien quienes se ser si sin sobre son su sus tambien te ti todo todos tu tus un una
+    uno unos y ya yo
+    an and are as at be by for from in is it of on or the this that to with
+    """.split()
+)
+
+# Sufijos del stemmer liviano (de más largo a más corto; se conserva una raíz de al menos 3 letras)
+_SUFFIXES = (
+    "amientos",
+    "imientos",
+    "amiento",
+    "imiento",
+    "aciones",
+    "uciones",
+    "adoras",
+    "adores",
+    "ancias",
+    "encias",
+    "mente",
+    "acion",
+    "ucion",
+    "adora",
+    "ador",
+    "ancia",
+    "encia",
+    "idad",
+    "ismo",
+    "ista",
+    "able",
+    "ible",
+    "osos",
+    "osas",
+    "oso",
+    "osa",
+    "es",
+    "s",
+)
+
+# Palabras: letras/dígitos, admitiendo compuestos con - . o _ internos ("smoke-tests", "v1.2")
+_TOKEN_RE = re.compile(r"\w+(?:[-.]\w+)*", re.UNICODE)
+
+
+# Marcas diacríticas combinantes (tras descomponer con NFKD)
+_COMBINING_RE = re.compile("[\u0300-\u036f]")
+
+
+def fold_accents(s: str) -> str:
+    """'Acción' → 'Accion' (descompone y descarta marcas diacríticas)."""
+    if s.isascii():
+        return s
+    return _COMBINING_RE.sub("", unicodedata.normalize("NFKD", s))
+
+
+def light_stem(tok: str) -> str:
+    """Stemmer liviano para español: recorta sufijos flexivos/derivativos frecuentes."""
+    if len(tok) <= 4 or not tok.isalpha():
+        return tok
+    for suf in _SUFFIXES:
+        if tok.endswith(suf) and len(tok) - len(suf) >= 3:
+            return tok[: -len(suf)]
+    return tok
+
+
+class Tokenizer:
+    """
+    Pipeline de tokenización: regex compilada → minúsculas → plegado de acentos → stopwords
+    → stemming opcional. Las listas de tokens se cachean (LRU) por texto, así que las queries
+    repetidas no se vuelven a tokenizar. signature identifica la configuración: los vectores
+    guardados con otra firma se recalculan.
+    """
+
+    def __init__(
+        self,
+        fold: bool = True,
+        stopwords: frozenset[str] | None = STOPWORDS_ES,
+        stem: bool = False,
+        cache_size: int = 4096,
+    ):
+        self.fold = fold
+        self.stopwords = stopwords or frozenset()
+        self.stem = stem
+        parts = ["regex-lower"]
+        if fold:
+            parts.append("fold")
+        if self.stopwords:
+            parts.append(f"stop{len(self.stopwords)}")
+        if stem:
+            parts.append("stem")
+        self.signature = "-".join(parts) + "/2"
+        self._cached = lru_cache(maxsize=cache_size)(self._tokenize)
+
+    def __call__(self, text: str) -> list[str]:
+        return list(self._cached(text))
+
+    def _tokenize(self, text: str) -> tuple[str, ...]:
+        text = text.lower()
+        if self.fold:
+            text = fold_accents(text)
+        toks = [t for t in _TOKEN_RE.findall(text) if t not in self.stopwords]
+        if self.stem:
+            toks = [light_stem(t) for t in toks]
+        return tuple(toks)
+
+
+DEFAULT_TOKENIZER = Tokenizer()
+
+
+@cache
+def make_tokenizer(stem: bool = False) -> Tokenizer:
+    """Tokenizer según config (memory.stemming); una instancia (y un cache) por configuración."""
+    return Tokenizer(stem=True) if stem else DEFAULT_TOKENIZER
@@ -1,52 +1,488 @@
 from __future__ import annotations
 
+import bisect
+import heapq
 import json
 import math
+import os
+import time
 import uuid
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+from wilbito.memory import dense as _dense
+from wilbito.memory import matrix as _matrix
+from wilbito.memory.dedup import DEDUP_POLICIES, DEFAULT_THRESHOLD, DedupIndex
+from wilbito.memory.filelock import file_lock
+from wilbito.memory.filters import PARTITION_KEYS, match_meta, normalize_filter, split_filter
+from wilbito.memory.retention import RetentionPolicy, cold_dir, decay_factor, item_time
+from wilbito.memory.scoring import DEFAULT_SCORING, CorpusStats, Scorer, select_top_k
+from wilbito.memory.tokenizer import DEFAULT_TOKENIZER, Tokenizer
+
+# Versión del formato persistido y firma del tokenizer (default) con que se calcularon los vectores.
+# Si la firma guardada no coincide, los vectores cacheados se recalculan al cargar.
+FORMAT_VERSION = 2
+TOKENIZER_SIGNATURE = DEFAULT_TOKENIZER.signature
+
+# El log se compacta en el snapshot cuando supera max(COMPACT_MIN_RECORDS, items del snapshot):
+# cada reescritura completa queda amortizada contra al menos otras tantas ingestas O(1).
+COMPACT_MIN_RECORDS = 1000
+
+
+def wal_path(path: str | Path) -> Path:
+    """Log append-only (JSONL) que acompaña al snapshot: vectorstore.json → vectorstore.wal.jsonl"""
+    p = Path(path)
+    return p.with_name(p.stem + ".wal.jsonl")
+
+
+def read_wal(
+    path: str | Path,
+    meta_updates: dict[str, dict[str, Any]] | None = None,
+    signature: str = TOKENIZER_SIGNATURE,
+) -> list[dict[str, Any]]:
+    """
+    Items registrados en el log append-only, en orden. Ignora líneas inválidas (p. ej. la última
+    cortada por un crash) y descarta los vectores calculados con otro tokenizer.
+    Los cambios de meta (op "meta", dedup con merge) se aplican a los items del log; si se pasa
+    meta_updates, se completa con {id: meta final} para aplicarlos también al snapshot.
+    """
+    return read_wal_from(path, 0, meta_updates, signature)[0]
+
+
+def read_wal_from(
+    path: str | Path,
+    offset: int,
+    meta_updates: dict[str, dict[str, Any]] | None = None,
+    signature: str = TOKENIZER_SIGNATURE,
+) -> tuple[list[dict[str, Any]], int]:
+    """Como read_wal, pero desde el byte offset; devuelve también el offset del final leído."""
+    wp = Path(path)
+    out: list[dict[str, Any]] = []
+    updates: dict[str, dict[str, Any]] = {} if meta_updates is None else meta_updates
+    if not wp.exists():
+        return out, 0
+    end = offset
+    with wp.open("rb") as f:
+        f.seek(offset)
+        for line in f:
+            end += len(line)
+            try:
+                rec = json.loads(line)
+            except Exception:
+                continue
+            if not isinstance(rec, dict):
+                continue
+            if rec.get("op") == "meta" and isinstance(rec.get("meta"), dict):
+                if isinstance(rec.get("id"), str):  # sin id no hay a qué aplicarlo
+                    updates[rec["id"]] = rec["meta"]
+                continue
+            item = rec.get("item")
+            if rec.get("op") != "add" or not isinstance(item, dict):
+                continue
+            if rec.get("tok") != signature:
+                item.pop("bow", None)
+            out.append(item)
+    if updates:
+        for item in out:
+            if isinstance(item.get("id"), str) and item["id"] in updates:
+                item["meta"] = updates[item["id"]]
+    return out, end
+
+
+def _file_id(p: Path) -> tuple[int, int, int] | None:
+    """Identidad del archivo (inodo, tamaño, mtime): cambia si otro proceso lo reescribe."""
+    try:
+        st = p.stat()
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _read_disk(p: Path, signature: str) -> dict[str, Any]:
+    """
+    Estado persistido en p (snapshot + replay del log), leído con el lock tomado:
+    {items, n_snapshot, n_log, snap_id, wal_end, corrupt}. corrupt: el snapshot existe pero no se
+    pudo leer (se arranca sin sus items, y la próxima compactación lo conserva aparte en vez de pisarlo).
+    """
+    snap_id = _file_id(p)
+    items: list[dict[str, Any]] = []
+    corrupt = False
+    if snap_id is not None:
+        try:
+            data = json.loads(p.read_text(encoding="utf-8"))
+            items = data.get("items", [])
+            if not isinstance(items, list):
+                items, corrupt = [], True
+            elif data.get("tokenizer") != signature:
+                # Vectores ausentes o calculados con otro tokenizer → se recalculan una vez
+                for it in items:
+                    it.pop("bow", None)
+        except Exception:
+            # archivo inválido → iniciar sin sus items (no reventamos)
+            items, corrupt = [], True
+    n_snapshot = len(items)
+
+    # Replay del log (tolera adds ya compactados en el snapshot)
+    seen = {it.get("id") for it in items}
+    updates: dict[str, dict[str, Any]] = {}
+    tail, wal_end = read_wal_from(wal_path(p), 0, updates, signature)
+    if updates:
+        for it in items:
+            if isinstance(it.get("id"), str) and it["id"] in updates:
+                it["meta"] = updates[it["id"]]
+    for item in tail:
+        if item.get("id") in seen:
+            continue
+        seen.add(item.get("id"))
+        items.append(item)
+    return {
+        "items": items,
+        "n_snapshot": n_snapshot,
+        "n_log": len(tail) + len(updates),
+        "snap_id": snap_id,
+        "wal_end": wal_end,
+        "corrupt": corrupt,
+    }
+
 
 class VectorStore:
     """
     VectorStore mínimo basado en bag-of-words + TF-IDF estático simple.
     Almacena:
-      - items: List[Dict]: {id, text, meta}
-    Persistencia en JSON: {"items":[...]}
+      - items: List[Dict]: {id, text, meta, bow, norm, n_tokens}
+        (bow = vector disperso L2-normalizado, norm = norma L2 de los conteos,
+         n_tokens = cantidad de tokens; se calculan al ingerir)
+    Persistencia en JSON: {"format": 2, "tokenizer": "...", "items":[...]}
+      + log append-only vectorstore.wal.jsonl con una línea {"op": "add", "tok": ..., "item": {...}}
+        por ingesta (y {"op": "meta", "id": ..., "meta": {...}} por merge de dedup); load = snapshot
+        + replay del log, save = append de lo nuevo (O(1) por item) y compactación periódica del log.
+    Escrituras seguras entre procesos: lock advisory (vectorstore.json.lock, ver wilbito.memory.filelock),
+    snapshot reescrito con archivo temporal + rename atómico, y chequeo optimista al guardar (los
+    cambios que otro proceso escribió desde la última lectura se incorporan, no se pisan).
+
+    Índice invertido en memoria (término → postings [(posición del item, peso normalizado)]),
+    mantenido por add_text/add_texts: una query sólo recorre los items que comparten términos.
+
+    scoring: "cosine-tf" (default) | "tfidf" | "bm25" (ver wilbito.memory.scoring).
+    backend: "python" (default, índice invertido) | "numpy" (matriz CSR término-documento,
+             ver wilbito.memory.matrix; si NumPy no está instalado se usa "python").
+    dedup: "keep" (default) | "skip" | "merge": qué hacer al ingestar un texto igual o casi igual
+           (MinHash/LSH, ver wilbito.memory.dedup) a uno existente.
+    tokenizer: pipeline de tokenización (default: regex + acentos plegados + stopwords, ver
+               wilbito.memory.tokenizer); su firma se persiste junto a los vectores.
+    mode: "sparse" (default, scoring léxico) | "dense" (embeddings por hashing + índice IVF
+          aproximado, ver wilbito.memory.dense; requiere NumPy, si no se usa "sparse").
+    decay_half_life_days: si > 0, el score se multiplica por 0.5 ** (edad / vida media), con la edad
+          tomada de meta.timestamp o del "ts" de ingesta (ver wilbito.memory.retention).
     """
 
-    def __init__(self, items: list[dict[str, Any]] | None = None):
+    tokenizer: Tokenizer = DEFAULT_TOKENIZER
+
+    def __init__(
+        self,
+        items: list[dict[str, Any]] | None = None,
+        vectors_valid: bool = False,
+        scoring: str = DEFAULT_SCORING,
+        backend: str = "python",
+        tokenizer: Tokenizer | None = None,
+        mode: str = "sparse",
+    ):
+        if backend not in ("python", "numpy"):
+            raise ValueError(f"Backend desconocido '{backend}'. Opciones: python, numpy")
+        if mode not in ("sparse", "dense"):
+            raise ValueError(f"Modo desconocido '{mode}'. Opciones: sparse, dense")
+        self.mode = mode if mode == "sparse" or _dense.available() else "sparse"
+        # Índice denso (modo dense), construido en forma perezosa desde los bow de los items
+        self._dense: _dense.DenseIndex | None = None
+        self.dense_nprobe = _dense.DEFAULT_NPROBE
+        if tokenizer is not None:
+            self.tokenizer = tokenizer
         self.items: list[dict[str, Any]] = items or []
+        self.backend = backend
+        # Matriz CSR (backend numpy), reconstruida en forma perezosa si cambió el corpus o el scoring
+        self._matrix: _matrix.SparseMatrixIndex | None = None
+        self._matrix_key: tuple[int, str, int] | None = None
+        # df / largo promedio, actualizados al indexar (no por query)
+        self.stats = CorpusStats()
+        self._scorer = Scorer(scoring, self.stats)
+        if not vectors_valid:
+            # Vectores ausentes o calculados con otro tokenizer → se recalculan una vez
+            for it in self.items:
+                it.pop("bow", None)
+        # Índice invertido: término → [(posición en self.items, peso L2-normalizado)]
+        self._index: dict[str, list[tuple[int, float]]] = {}
+        # Máximos por término (peso normalizado, frecuencia cruda) para la poda tipo max-score
+        self._max_w: dict[str, float] = {}
+        self._max_tf: dict[str, float] = {}
+        # Particiones por meta (PARTITION_KEYS): clave → valor → posiciones en orden de inserción
+        self._partitions: dict[str, dict[Any, list[int]]] = {key: {} for key in PARTITION_KEYS}
+        # Cantidad de items ya indexados (prefijo de self.items)
+        self._indexed = 0
+        self._sync_index()
+        # Si es True, compact() también regenera el snapshot binario (ver wilbito.memory.snapshot)
+        self.mmap_snapshot = False
+        # Deduplicación al ingestar; el índice de huellas se arma recién al primer uso
+        self.dedup = "keep"
+        self.dedup_threshold = DEFAULT_THRESHOLD
+        self._dedup_index: DedupIndex | None = None
+        self._dedup_indexed = 0
+        # Cambios de meta (merge) sobre items ya persistidos, pendientes de escribir al log: {id: meta}
+        self._meta_updates: dict[str, dict[str, Any]] = {}
+        self._meta_version = 0
+        # Estado de persistencia: ruta asociada, items ya escritos (snapshot + log) y tamaño de cada parte
+        self._path: str | None = None
+        self._persisted = 0
+        self._snapshot_items = 0
+        self._log_records = 0
+        # Vectores cargados que hubo que recalcular (otro tokenizer): el próximo save compacta
+        self._stale_vectors = False
+        # Versión en disco vista por última vez (identidad del snapshot, bytes del log) y snapshot ilegible
+        self._disk_snap: tuple[int, int, int] | None = None
+        self._wal_offset = 0
+        self._corrupt = False
+        # Decaimiento temporal: momento por item y factores, recalculados una vez por hora
+        self.decay_half_life_days = 0.0
+        self._times: list[float | None] = []
+        self._decay: list[float] = []
+        self._decay_arr: Any = None
+        self._decay_key: tuple[int, float] | None = None
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @property
+    def scoring(self) -> str:
+        return self._scorer.mode
+
+    @scoring.setter
+    def scoring(self, mode: str) -> None:
+        self._scorer = Scorer(mode, self.stats)
 
     # ---------- Persistencia ----------
     @classmethod
-    def load(cls, path: str) -> VectorStore:
+    def load(
+        cls,
+        path: str,
+        scoring: str = DEFAULT_SCORING,
+        backend: str = "python",
+        tokenizer: Tokenizer | None = None,
+        mode: str = "sparse",
+    ) -> VectorStore:
         p = Path(path)
-        if not p.exists():
-            # base vacía
-            return cls([])
-        try:
-            data = json.loads(p.read_text(encoding="utf-8"))
-            items = data.get("items", [])
-            if not isinstance(items, list):
-                items = []
-            return cls(items)
-        except Exception:
-            # archivo inválido → iniciar vacío (no reventamos)
-            return cls([])
+        signature = (tokenizer or cls.tokenizer).signature
+        # Lock compartido: snapshot y log de la misma versión (no a mitad de una compactación ajena)
+        with file_lock(p, shared=True):
+            disk = _read_disk(p, signature)
+        items = disk["items"]
+
+        stale = any(not isinstance(it.get("bow"), dict) for it in items)
+        vs = cls(items, vectors_valid=True, scoring=scoring, backend=backend, tokenizer=tokenizer, mode=mode)
+        vs._stale_vectors = stale
+        if vs.mode == "dense" and not stale:
+            # Vectores densos persistidos en la última compactación (vía mmap), si siguen al día
+            vs._dense = _dense.DenseIndex.load(_dense.dense_path(p), p, disk["n_snapshot"], vs.tokenizer.signature)
+        vs._path = str(p.resolve())
+        vs._persisted = len(items)
+        vs._snapshot_items = disk["n_snapshot"]
+        vs._log_records = disk["n_log"]
+        vs._disk_snap, vs._wal_offset, vs._corrupt = disk["snap_id"], disk["wal_end"], disk["corrupt"]
+        return vs
 
     def save(self, path: str) -> None:
+        """
+        Si el store proviene de esta misma ruta, agrega al log sólo los items nuevos y compacta
+        cuando el log crece; si no, escribe un snapshot completo. Con lock exclusivo y chequeo
+        optimista: si otro proceso escribió desde la última lectura/escritura, primero se
+        incorporan sus cambios (ver _merge_disk).
+        """
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        self._sync_index()
+        with file_lock(p):
+            same = self._path == str(p.resolve()) and self._persisted <= len(self.items)
+            new = self.items[self._persisted :]
+            if same:
+                self._merge_disk(p)
+            if not same or self._stale_vectors or not p.exists():
+                self._compact_locked(p)
+                return
+
+            if new or self._meta_updates:
+                lines = [
+                    json.dumps(
+                        {"op": "add", "tok": self.tokenizer.signature, "item": it}, ensure_ascii=False, separators=(",", ":")
+                    )
+                    for it in new
+                ]
+                for item_id, meta in self._meta_updates.items():
+                    lines.append(
+                        json.dumps({"op": "meta", "id": item_id, "meta": meta}, ensure_ascii=False, separators=(",", ":"))
+                    )
+                with wal_path(p).open("a+b") as f:
+                    lead = b""
+                    if f.seek(0, os.SEEK_END) > 0:
+                        f.seek(-1, os.SEEK_END)
+                        lead = b"" if f.read(1) == b"\n" else b"\n"  # última línea cortada por un crash
+                    f.write(lead + "".join(line + "\n" for line in lines).encode("utf-8"))
+                    self._wal_offset = f.tell()
+                self._log_records += len(lines)
+                self._meta_updates = {}
+            self._persisted = len(self.items)
+            if self._log_records > max(COMPACT_MIN_RECORDS, self._snapshot_items):
+                self._compact_locked(p)
+
+    def compact(self, path: str) -> None:
+        """
+        Reescribe el snapshot con todos los items y descarta el log
+        (con mmap_snapshot, regenera también vectorstore.snap).
+        """
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        self._sync_index()
+        with file_lock(p):
+            if self._path == str(p.resolve()):
+                self._merge_disk(p)
+            self._compact_locked(p)
+
+    def retain(
+        self, path: str, policy: RetentionPolicy, now: float | None = None, dry_run: bool = False
+    ) -> tuple[VectorStore, dict[str, Any]]:
+        """
+        Compactación por niveles: bajo el lock del store (incorporando antes lo que otros procesos
+        hayan escrito) saca los items que policy da por vencidos, archivándolos en un segmento frío
+        (cold_dir(path)) o descartándolos, y reescribe el snapshot caliente en path. Devuelve
+        (store, stats): un store nuevo con la misma configuración si hubo cambios, o self.
+        """
         p = Path(path)
         p.parent.mkdir(parents=True, exist_ok=True)
-        payload = {"items": self.items}
-        p.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        with file_lock(p):
+            if self._path == str(p.resolve()):
+                self._merge_disk(p)
+            self._sync_index()
+            expired = policy.expired(self.items, now)
+            stats: dict[str, Any] = {"items": len(self.items), "expired": len(expired), "kept": len(self.items) - len(expired)}
+            stats["action"] = policy.action
+            if dry_run or not expired:
+                return self, stats
+
+            gone = set(expired)
+            if policy.action == "archive":
+                seg = cold_dir(p) / f"{p.stem}-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}.json"
+                type(self)([self.items[pos] for pos in expired], vectors_valid=True, tokenizer=self.tokenizer).compact(str(seg))
+                stats["segment"] = seg.as_posix()
+
+            hot = type(self)(
+                [it for pos, it in enumerate(self.items) if pos not in gone],
+                vectors_valid=True,
+                scoring=self.scoring,
+                backend=self.backend,
+                tokenizer=self.tokenizer,
+                mode=self.mode,
+            )
+            for attr in ("dense_nprobe", "mmap_snapshot", "dedup", "dedup_threshold", "decay_half_life_days"):
+                setattr(hot, attr, getattr(self, attr))
+            hot._compact_locked(p)
+            return hot, stats
+
+    def _compact_locked(self, p: Path) -> None:
+        if self._corrupt and self._disk_snap is not None and _file_id(p) == self._disk_snap:
+            # Snapshot ilegible: se conserva aparte para recuperarlo a mano, no se pisa
+            p.replace(p.with_name(f"{p.name}.corrupt-{time.strftime('%Y%m%d%H%M%S')}"))
+        self._sync_index()
+        payload = {"format": FORMAT_VERSION, "tokenizer": self.tokenizer.signature, "items": self.items}
+        tmp = p.with_name(f"{p.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, p)
+        if self.mmap_snapshot:
+            from wilbito.memory.snapshot import snapshot_path, write_snapshot
+
+            write_snapshot(self, snapshot_path(p), source=p)
+        if self.mode == "dense":
+            self._dense_index().save(_dense.dense_path(p), source=p, signature=self.tokenizer.signature)
+        wal_path(p).unlink(missing_ok=True)
+        self._path = str(p.resolve())
+        self._persisted = self._snapshot_items = len(self.items)
+        self._log_records = 0
+        self._meta_updates = {}
+        self._stale_vectors = False
+        self._disk_snap, self._wal_offset, self._corrupt = _file_id(p), 0, False
+
+    def _merge_disk(self, p: Path) -> None:
+        """
+        Chequeo optimista (con el lock tomado): si otro proceso escribió desde la última lectura o
+        escritura de este store, se incorporan sus cambios. Log con registros nuevos → se agregan
+        sus items y merges de meta; snapshot reescrito (compactación o retención ajena) → se recarga
+        desde disco y se vuelven a agregar los items y merges pendientes de este proceso.
+        """
+        if _file_id(p) != self._disk_snap:
+            self._reload_disk(p)
+            return
+        wp = wal_path(p)
+        try:
+            size = wp.stat().st_size
+        except OSError:
+            size = 0
+        if size == self._wal_offset:
+            return
+        if size < self._wal_offset:
+            self._reload_disk(p)
+            return
+        updates: dict[str, dict[str, Any]] = {}
+        tail, self._wal_offset = read_wal_from(wp, self._wal_offset, updates, self.tokenizer.signature)
+        ids = {it.get("id"): pos for pos, it in enumerate(self.items)}
+        for item_id, meta in updates.items():
+            if item_id in ids:
+                self._merge_meta(ids[item_id], meta, persist=False)
+        for item in tail:
+            if item.get("id") not in ids:
+                ids[item.get("id")] = len(self.items)
+                self.items.append(item)
+        self._log_records += len(tail) + len(updates)
+        self._sync_index()
+
+    def _reload_disk(self, p: Path) -> None:
+        disk = _read_disk(p, self.tokenizer.signature)
+        items = disk["items"]
+        on_disk = {it.get("id") for it in items}
+        pending = [it for it in self.items[self._persisted :] if it.get("id") not in on_disk]
+        meta_updates, self._meta_updates = self._meta_updates, {}
+        self._stale_vectors = self._stale_vectors or any(not isinstance(it.get("bow"), dict) for it in items)
+        self._reset_index(items + pending)
+        self._persisted = len(items)
+        ids = {it.get("id"): pos for pos, it in enumerate(items)}
+        for item_id, meta in meta_updates.items():
+            if item_id in ids:
+                self._merge_meta(ids[item_id], meta)
+        self._snapshot_items, self._log_records = disk["n_snapshot"], disk["n_log"]
+        self._disk_snap, self._wal_offset, self._corrupt = disk["snap_id"], disk["wal_end"], disk["corrupt"]
+
+    def _reset_index(self, items: list[dict[str, Any]]) -> None:
+        """Reemplaza los items y reconstruye desde cero los índices en memoria."""
+        self.items = items
+        self.stats = CorpusStats()
+        self._scorer = Scorer(self._scorer.mode, self.stats)
+        self._index, self._max_w, self._max_tf = {}, {}, {}
+        self._partitions = {key: {} for key in PARTITION_KEYS}
+        self._indexed = 0
+        self._matrix = self._dense = self._dedup_index = None
+        self._dedup_indexed = 0
+        self._times, self._decay, self._decay_arr, self._decay_key = [], [], None, None
+        self._meta_version += 1
+        self._sync_index()
 
     # ---------- Ingesta ----------
     def add_text(self, text: str, meta: dict[str, Any] | None = None) -> bool:
+        """
+        Agrega un texto. Devuelve False si no se agregó (texto vacío o duplicado según self.dedup).
+        """
         if not text or not isinstance(text, str):
             return False
-        self.items.append({"id": str(uuid.uuid4()), "text": text, "meta": meta or {}})
-        return True
+        added = self._append({"id": str(uuid.uuid4()), "text": text, "meta": meta or {}})
+        self._sync_index()
+        return added
 
     def add_texts(self, entries: list[dict[str, Any]]) -> int:
         """
@@ -60,9 +496,107 @@ class VectorStore:
                 n += 1
         return n
 
+    def add_items(self, items: list[dict[str, Any]]) -> int:
+        """
+        Agrega items ya armados {id, text, meta}, reutilizando bow/norm/n_tokens y la huella de dedup
+        si vienen calculados (ej. en procesos de carga masiva, ver wilbito.memory.seed). Devuelve
+        cuántos se agregaron.
+        """
+        n = 0
+        for item in items:
+            if item.get("text") and isinstance(item["text"], str) and self._append(item):
+                n += 1
+        self._sync_index()
+        return n
+
+    def _append(self, item: dict[str, Any]) -> bool:
+        if self.dedup != "keep":
+            dup = self._find_duplicate(item)
+            if dup is not None:
+                if self.dedup == "merge":
+                    self._merge_meta(dup, item.get("meta") or {})
+                return False
+        if not isinstance(item.get("bow"), dict):
+            self._vectorize(item)
+        item.setdefault("ts", int(time.time()))
+        self.items.append(item)
+        return True
+
+    # ---------- Deduplicación ----------
+    def _find_duplicate(self, item: dict[str, Any]) -> int | None:
+        if self.dedup not in DEDUP_POLICIES:
+            raise ValueError(f"Política de dedup desconocida '{self.dedup}'. Opciones: {', '.join(DEDUP_POLICIES)}")
+        if self._dedup_index is None or self._dedup_index.threshold != self.dedup_threshold:
+            self._dedup_index = DedupIndex(self.dedup_threshold)
+            self._dedup_indexed = 0
+        for pos in range(self._dedup_indexed, len(self.items)):
+            self._dedup_index.add(pos, self.items[pos])
+        self._dedup_indexed = len(self.items)
+        return self._dedup_index.find(item, self.items)
+
+    def _merge_meta(self, pos: int, meta: dict[str, Any], persist: bool = True) -> None:
+        """
+        Completa la meta del item existente con las claves nuevas (no pisa valores).
+        persist=False: el cambio ya está en disco (lo escribió otro proceso), no se registra para el log.
+        """
+        it = self.items[pos]
+        if not isinstance(it.get("meta"), dict):
+            it["meta"] = {}
+        added = {k: v for k, v in meta.items() if k not in it["meta"]}
+        if not added:
+            return
+        it["meta"].update(added)
+        if pos < self._indexed:
+            for key, part in self._partitions.items():
+                val = added.get(key)
+                if isinstance(val, (str, int, float, bool)):
+                    bisect.insort(part.setdefault(val, []), pos)
+        self._meta_version += 1
+        if persist and pos < self._persisted and isinstance(it.get("id"), str):
+            self._meta_updates[it["id"]] = it["meta"]
+
+    # ---------- Índice ----------
+    def _sync_index(self) -> None:
+        """
+        Indexa los items agregados desde la última sincronización.
+        Tolera appends directos sobre self.items (se indexan en la próxima búsqueda).
+        """
+        for pos in range(self._indexed, len(self.items)):
+            it = self.items[pos]
+            bow = it.get("bow")
+            if not isinstance(bow, dict):
+                bow = self._vectorize(it)
+            norm = it.get("norm", 1.0)
+            for term, w in bow.items():
+                self._index.setdefault(term, []).append((pos, w))
+                if w > self._max_w.get(term, 0.0):
+                    self._max_w[term] = w
+                if w * norm > self._max_tf.get(term, 0.0):
+                    self._max_tf[term] = w * norm
+            self.stats.add(bow.keys(), it.get("n_tokens", 0))
+            meta = it.get("meta", {}) or {}
+            for key, part in self._partitions.items():
+                val = meta.get(key)
+                if isinstance(val, (str, int, float, bool)):
+                    part.setdefault(val, []).append(pos)
+        self._indexed = len(self.items)
+
+    def _vectorize(self, item: dict[str, Any]) -> dict[str, float]:
+        """
+        Calcula y guarda en el item su vector disperso normalizado, la norma y la cantidad de tokens.
+        """
+        counts: dict[str, float] = {}
+        for t in self._tokenize(item.get("text", "") or ""):
+            counts[t] = counts.get(t, 0.0) + 1.0
+        norm = math.sqrt(sum(v * v for v in counts.values()))
+        item["bow"] = {t: c / (norm or 1.0) for t, c in counts.items()}
+        item["norm"] = norm
+        item["n_tokens"] = int(sum(counts.values()))
+        return item["bow"]
+
     # ---------- Búsqueda ----------
     def _tokenize(self, s: str) -> list[str]:
-        return [tok.lower() for tok in s.replace("\n", " ").split() if tok.strip()]
+        return self.tokenizer(s)
 
     def _bow(self, s: str) -> dict[str, float]:
         # Conteo simple
@@ -88,31 +622,291 @@ class VectorStore:
         top_k: int = 5,
         min_score: float = 0.0,
         prefer_tags: list[str] | None = None,
+        filter: dict[str, Any] | None = None,
     ) -> list[dict[str, Any]]:
         """
         prefer_tags: si se provee, se aplica un pequeño boost al score
+        filter: condiciones de meta que deben cumplirse (ver wilbito.memory.filters); los items que
+                no las cumplen se descartan antes de puntuar. El boost de prefer_tags se aplica igual.
+        """
+        self._sync_index()
+        k = max(1, top_k)
+        allowed = self._filter_positions(normalize_filter(filter))
+        if allowed is not None and not allowed:
+            return []
+        if self.mode == "dense":
+            return self._rank(self._dense_search(query, k, prefer_tags, allowed), k, min_score, allowed)
+
+        qv = self._query_weights(query)
+        mx = self._matrix_index()
+        if mx is not None:
+            acc = mx.candidates(mx.scores([qv])[0], k, prefer_tags, allowed, self._decay_array())
+        elif allowed is not None and len(allowed) < sum(len(self._index.get(t, ())) for t in qv):
+            # Filtro más selectivo que los postings: se puntúan directamente los items permitidos
+            acc = self._score_positions(qv, allowed, prefer_tags)
+        else:
+            acc = self._accumulate(qv, prefer_tags, k, min_score, None if allowed is None else set(allowed))
+        return self._rank(acc, k, min_score, allowed)
+
+    def search_many(
+        self,
+        queries: list[str],
+        top_k: int = 5,
+        min_score: float = 0.0,
+        prefer_tags: list[str] | None = None,
+        filter: dict[str, Any] | None = None,
+        workers: int = 0,
+    ) -> list[list[dict[str, Any]]]:
+        """
+        Varias queries de una vez (mismos parámetros que search, resultados en el mismo orden).
+        Las queries repetidas se resuelven una sola vez y el filtro se evalúa una vez para todo el
+        lote; con backend numpy los scores se calculan por bloques (producto matriz-matriz).
+        workers: con backend numpy, cantidad de hilos para puntuar bloques de queries en paralelo
+                 (NumPy/SciPy liberan el GIL); el backend python es CPU puro y no lo usa.
+        """
+        self._sync_index()
+        k = max(1, top_k)
+        allowed = self._filter_positions(normalize_filter(filter))
+        unique = list(dict.fromkeys(queries))
+        if allowed is not None and not allowed:
+            return [[] for _ in queries]
+        if self.mode == "dense":
+            accs = [self._dense_search(q, k, prefer_tags, allowed) for q in unique]
+            by_query = {q: self._rank(acc, k, min_score, allowed) for q, acc in zip(unique, accs, strict=True)}
+            return [[dict(h) for h in by_query[q]] for q in queries]
+        qvs = [self._query_weights(q) for q in unique]
+
+        mx = self._matrix_index()
+        if mx is not None:
+            decay = self._decay_array()
+            chunks = [range(i, min(i + _matrix.BATCH_CHUNK, len(qvs))) for i in range(0, len(qvs), _matrix.BATCH_CHUNK)]
+
+            def run(chunk: range) -> list[dict[int, float]]:
+                scores = mx.scores([qvs[i] for i in chunk])
+                return [mx.candidates(row, k, prefer_tags, allowed, decay) for row in scores]
+
+            if workers > 1 and len(chunks) > 1:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    accs = [acc for part in pool.map(run, chunks) for acc in part]
+            else:
+                accs = [acc for chunk in chunks for acc in run(chunk)]
+        else:
+            # Cada query conserva su poda max-score (más rápida que un recorrido compartido sin poda)
+            allowed_set = None if allowed is None else set(allowed)
+            accs = [self._accumulate(qv, prefer_tags, k, min_score, allowed_set) for qv in qvs]
+
+        by_query = {q: self._rank(acc, k, min_score, allowed) for q, acc in zip(unique, accs, strict=True)}
+        return [[dict(h) for h in by_query[q]] for q in queries]
+
+    def _dense_index(self) -> _dense.DenseIndex:
+        self._sync_index()
+        if self._dense is None:
+            self._dense = _dense.DenseIndex(n_probe=self.dense_nprobe)
+        if len(self._dense) < len(self.items):
+            self._dense.add_bows([it["bow"] for it in self.items[len(self._dense) :]])
+        self._dense.n_probe = self.dense_nprobe
+        return self._dense
+
+    def _dense_search(self, query: str, k: int, prefer_tags: list[str] | None, allowed: list[int] | None) -> dict[int, float]:
+        """Modo denso: coseno entre embeddings (IVF aproximado a gran escala). Boost y filtro iguales."""
+        dx = self._dense_index()
+        q: dict[str, Any] = {"text": query}
+        qvec = _dense.embed_bows([self._vectorize(q)], dx.dim)[0]
+        boost: Any = None  # máscara booleana de numpy (opcional, como en dense.search)
+        if prefer_tags:
+            boost = _dense.np.zeros(len(self.items), dtype=bool)
+            for tag in prefer_tags:
+                boost[self._partitions["tag"].get(tag, [])] = True
+        return dx.search(qvec, k, allowed, boost, self._decay_array())
+
+    def _filter_positions(self, flt: dict[str, Any]) -> list[int] | None:
+        """
+        Posiciones (en orden de inserción) que cumplen el filtro, o None sin filtro. Las condiciones
+        de igualdad/pertenencia sobre tag/source se resuelven con las particiones; el resto se
+        evalúa sobre esas posiciones.
+        """
+        if not flt:
+            return None
+        parts, rest = split_filter(flt)
+        positions: Iterable[int] = range(len(self.items))
+        if parts:
+            allowed: set[int] | None = None
+            for key, values in parts.items():
+                part = self._partitions[key]
+                hit: set[int] = set()
+                for v in values:
+                    if isinstance(v, (str, int, float, bool)):
+                        hit.update(part.get(v, ()))
+                allowed = hit if allowed is None else allowed & hit
+            positions = sorted(allowed or ())
+        if rest:
+            return [pos for pos in positions if match_meta(self.items[pos].get("meta"), rest)]
+        return list(positions)
+
+    def _query_weights(self, query: str) -> dict[str, float]:
+        q: dict[str, Any] = {"text": query}
+        return self._scorer.query_weights(self._vectorize(q), q["norm"])
+
+    def _accumulate(
+        self,
+        qv: dict[str, float],
+        prefer_tags: list[str] | None,
+        k: int | None = None,
+        min_score: float = 0.0,
+        allowed: set[int] | None = None,
+    ) -> dict[int, float]:
+        """
+        Recorre los postings de los términos de la query: sólo hay acumuladores para items
+        que comparten algún término. Devuelve {posición: score con boost}.
+
+        Con k, poda estilo max-score: los términos se procesan de mayor a menor cota de aporte;
+        cuando lo que falta sumar no alcanza para entrar al top-k (ni a min_score), ya no se abren
+        acumuladores nuevos, se descartan los que no pueden llegar, y los términos restantes se
+        resuelven consultando el bow de los candidatos vivos en vez de recorrer sus postings.
+        Los aportes son no negativos, así que los scores parciales son cotas inferiores.
+        allowed: si se provee, sólo se acumulan esas posiciones (filtro de meta).
         """
-        qv = self._bow(query)
-        out = []
-        for it in self.items:
-            tv = self._bow(it.get("text", ""))
-            score = self._cosine(qv, tv)
+        items = self.items
+        scorer = self._scorer
+        doc_weight = scorer.doc_weight if scorer.uses_length else None
+        boost = 1.2 if prefer_tags else 1.0
+        ms = min_score or 0.0
+        # Factores de decaimiento (<= 1): aplicados por aporte, las cotas de la poda siguen valiendo
+        decay = self._decay_weights()
 
+        terms = [t for t in qv if t in self._index]
+        ub = {t: qv[t] * scorer.doc_weight_bound(self._max_w.get(t, 0.0), self._max_tf.get(t, 0.0)) for t in terms}
+        terms.sort(key=lambda t: ub[t], reverse=True)
+        remaining = sum(ub.values())
+
+        acc: dict[int, float] = {}
+        open_new = True
+        for term in terms:
+            qw = qv[term]
+            remaining -= ub[term]
+            postings = self._index[term]
+            if allowed is not None:
+                postings = [p for p in postings if p[0] in allowed]
+            if open_new or len(postings) <= len(acc):
+                for pos, w in postings:
+                    if not open_new and pos not in acc:
+                        continue
+                    if doc_weight is not None:
+                        it = items[pos]
+                        w = doc_weight(w, it.get("norm", 1.0), it.get("n_tokens", 0))
+                    if decay is not None:
+                        w *= decay[pos]
+                    acc[pos] = acc.get(pos, 0.0) + qw * w
+            else:
+                for pos in acc:
+                    it = items[pos]
+                    w = it["bow"].get(term)
+                    if w is None:
+                        continue
+                    if doc_weight is not None:
+                        w = doc_weight(w, it.get("norm", 1.0), it.get("n_tokens", 0))
+                    if decay is not None:
+                        w *= decay[pos]
+                    acc[pos] += qw * w
+
+            if k is None or remaining <= 0.0:
+                continue
+            # Umbral: k-ésimo score parcial (margen 1e-4 por el redondeo publicado)
+            theta = heapq.nlargest(k, acc.values())[-1] if len(acc) >= k else 0.0
+            if open_new and (remaining * boost + 1e-4 < theta or (ms > 0.0 and remaining * boost < ms)):
+                open_new = False
+            if not open_new:
+                floor = max(theta - 1e-4, ms)
+                acc = {pos: sc for pos, sc in acc.items() if (sc + remaining) * boost >= floor}
+
+        self._boost(acc, prefer_tags)
+        return acc
+
+    def _score_positions(self, qv: dict[str, float], positions: list[int], prefer_tags: list[str] | None) -> dict[int, float]:
+        """Puntúa documento a documento un conjunto chico de posiciones usando el bow guardado."""
+        items = self.items
+        scorer = self._scorer
+        decay = self._decay_weights()
+        acc: dict[int, float] = {}
+        for pos in positions:
+            it = items[pos]
+            bow = it["bow"]
+            score = 0.0
+            for term, qw in qv.items():
+                w = bow.get(term)
+                if w is None:
+                    continue
+                if scorer.uses_length:
+                    w = scorer.doc_weight(w, it.get("norm", 1.0), it.get("n_tokens", 0))
+                score += qw * w
+            if decay is not None:
+                score *= decay[pos]
+            if score > 0.0:
+                acc[pos] = score
+        self._boost(acc, prefer_tags)
+        return acc
+
+    def _decay_weights(self) -> list[float] | None:
+        """
+        Factor de decaimiento temporal por posición, o None si está desactivado. Se calcula respecto
+        del comienzo de la hora en curso (una vez por hora y para los items nuevos, no por query).
+        """
+        half_life = self.decay_half_life_days
+        if not half_life or half_life <= 0:
+            return None
+        self._sync_index()
+        hour = int(time.time() // 3600)
+        if self._decay_key != (hour, half_life):
+            self._decay_key = (hour, half_life)
+            self._decay = []
+        for pos in range(len(self._times), len(self.items)):
+            self._times.append(item_time(self.items[pos]))
+        if len(self._decay) < len(self.items):
+            now = hour * 3600.0
+            self._decay.extend(decay_factor(t, now, half_life) for t in self._times[len(self._decay) : len(self.items)])
+            self._decay_arr = None
+        return self._decay
+
+    def _decay_array(self) -> Any:
+        """_decay_weights como array de NumPy (backend numpy / modo dense), o None."""
+        decay = self._decay_weights()
+        if decay is None:
+            return None
+        if self._decay_arr is None:
+            self._decay_arr = _matrix.np.asarray(decay, dtype=_matrix.np.float64)
+        return self._decay_arr
+
+    def _boost(self, acc: dict[int, float], prefer_tags: list[str] | None) -> None:
+        if not prefer_tags:
+            return
+        for pos in acc:
             # Boost por tag preferido
-            meta = it.get("meta", {}) or {}
-            item_tag = meta.get("tag")
-            if prefer_tags and item_tag in prefer_tags:
-                score *= 1.2  # boost suave
-
-            if score >= (min_score or 0.0):
-                out.append(
-                    {
-                        "id": it.get("id"),
-                        "score": round(float(score), 4),
-                        "text": it.get("text", ""),
-                        "meta": meta,
-                    }
-                )
-
-        out.sort(key=lambda x: x["score"], reverse=True)
-        return out[: max(1, top_k)]
+            meta = self.items[pos].get("meta", {}) or {}
+            if meta.get("tag") in prefer_tags:
+                acc[pos] *= 1.2  # boost suave
+
+    def _matrix_index(self) -> _matrix.SparseMatrixIndex | None:
+        if self.backend != "numpy" or not _matrix.available():
+            return None
+        key = (self._indexed, self._scorer.mode, self._meta_version)
+        if self._matrix is None or self._matrix_key != key:
+            self._matrix = _matrix.SparseMatrixIndex(self._index, self.items, self._scorer)
+            self._matrix_key = key
+        return self._matrix
+
+    def _rank(self, acc: dict[int, float], k: int, min_score: float, positions: list[int] | None = None) -> list[dict[str, Any]]:
+        """
+        Top-k con heap acotado: sólo se materializan los dicts de resultado de los k ganadores.
+        positions: posiciones elegibles para completar con score 0 (default: todas).
+        """
+        best = select_top_k(acc, k, min_score, range(len(self.items)) if positions is None else positions)
+        return [self._hit(pos, score) for score, pos in best]
+
+    def _hit(self, pos: int, score: float) -> dict[str, Any]:
+        it = self.items[pos]
+        return {
+            "id": it.get("id"),
+            "score": score,
+            "text": it.get("text", ""),
+            "meta": it.get("meta", {}) or {},
+        }
@@ -0,0 +1,41 @@
+import json
+import sqlite3
+
+from typer.testing import CliRunner
+from wilbito.interfaces import cli
+from wilbito.memory.service import mem_db_path, mem_sqlite_path
+from wilbito.memory.snapshot import snapshot_path
+from wilbito.memory.sqlite_store import SqliteVectorStore
+from wilbito.memory.vectorstore import VectorStore
+
+runner = CliRunner()
+
+
+def _sqlite(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cli, "CFG", {"memory": {"store": "sqlite", "daemon": False}})
+
+
+def test_mem_snapshot_rechaza_el_backend_sqlite(tmp_path, monkeypatch):
+    _sqlite(monkeypatch, tmp_path)
+    res = runner.invoke(cli.app, ["mem-snapshot"])
+    assert res.exit_code == 1 and json.loads(res.stdout)["ok"] is False
+    assert not snapshot_path(mem_db_path(tmp_path)).exists()
+
+
+def test_mem_backup_con_sqlite_respalda_la_db_activa(tmp_path, monkeypatch):
+    _sqlite(monkeypatch, tmp_path)
+    stale = VectorStore()
+    stale.add_text("nota vieja del json")
+    stale.save(str(mem_db_path(tmp_path)))  # vectorstore.json viejo, con log pendiente
+    live = SqliteVectorStore.load(str(mem_sqlite_path(tmp_path)))
+    live.add_text("nota viva en sqlite")
+    live.save()
+
+    res = runner.invoke(cli.app, ["mem-backup"])
+    out = json.loads(res.stdout)
+    live.close()
+    assert res.exit_code == 0 and out["ok"] and out["backup"].endswith(".db") and out["latest"].endswith("_latest.db")
+    for path in (out["backup"], out["latest"]):
+        with sqlite3.connect(path) as conn:
+            assert conn.execute("SELECT text FROM mem_items").fetchall() == [("nota viva en sqlite",)]
@@ -0,0 +1,98 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from wilbito.memory import vectorstore
+from wilbito.memory.vectorstore import VectorStore, wal_path
+
+
+def _texts(path):
+    return sorted(it["text"] for it in VectorStore.load(str(path)).items)
+
+
+def test_dos_escritores_no_se_pisan(tmp_path):
+    db = tmp_path / "vectorstore.json"
+    a, b = VectorStore.load(str(db)), VectorStore.load(str(db))
+    a.add_text("runbook de deploy")
+    a.save(str(db))
+    b.add_text("plan de marketing")
+    b.save(str(db))  # el primer save de a creó el snapshot: b lo incorpora y agrega al log
+    a.add_text("checklist de release")
+    a.save(str(db))
+    assert _texts(db) == ["checklist de release", "plan de marketing", "runbook de deploy"]
+    assert sorted(it["text"] for it in a.items) == _texts(db)
+    assert [h["text"] for h in b.search("marketing", top_k=1)] == ["plan de marketing"]
+
+
+def test_compactacion_ajena_conserva_items_y_merges_pendientes(tmp_path):
+    db = tmp_path / "vectorstore.json"
+    base = VectorStore()
+    base.add_text("sizing XAUUSD en alta volatilidad", {"tag": "trading"})
+    base.compact(str(db))
+
+    a, b = VectorStore.load(str(db)), VectorStore.load(str(db))
+    b.dedup = "merge"
+    b.add_text("sizing XAUUSD en alta volatilidad", {"source": "diario"})  # merge de meta pendiente
+    b.add_text("tests de regresión del pipeline")
+    a.add_text("plan de marketing")
+    a.compact(str(db))  # reescribe el snapshot mientras b tiene cambios sin guardar
+    b.save(str(db))
+
+    vs = VectorStore.load(str(db))
+    assert sorted(it["text"] for it in vs.items) == [
+        "plan de marketing",
+        "sizing XAUUSD en alta volatilidad",
+        "tests de regresión del pipeline",
+    ]
+    assert vs.search("XAUUSD", top_k=1)[0]["meta"] == {"tag": "trading", "source": "diario"}
+    assert b.search("XAUUSD", top_k=1, filter={"source": "diario"})[0]["meta"]["tag"] == "trading"
+
+
+def test_snapshot_corrupto_no_se_pisa(tmp_path):
+    db = tmp_path / "vectorstore.json"
+    vs = VectorStore()
+    vs.add_text("nota a conservar")
+    vs.compact(str(db))
+    db.write_text(db.read_text(encoding="utf-8")[:40], encoding="utf-8")  # truncado
+
+    vs = VectorStore.load(str(db))
+    assert len(vs) == 0
+    vs.add_text("nota nueva")
+    vs.save(str(db))
+    assert db.read_text(encoding="utf-8").startswith('{"format"') and len(db.read_text(encoding="utf-8")) == 40
+    vs.compact(str(db))
+    (kept,) = tmp_path.glob("vectorstore.json.corrupt-*")
+    assert len(kept.read_text(encoding="utf-8")) == 40
+    assert _texts(db) == ["nota nueva"]
+
+
+def test_linea_cortada_del_log_no_corrompe_el_siguiente_append(tmp_path):
+    db = tmp_path / "vectorstore.json"
+    vs = VectorStore.load(str(db))
+    vs.add_text("primera")
+    vs.save(str(db))
+    vs.add_text("segunda")
+    vs.save(str(db))
+    with wal_path(db).open("a", encoding="utf-8") as f:
+        f.write('{"op": "add", "item": {"id": "x", "te')  # crash a mitad de línea
+    vs = VectorStore.load(str(db))
+    vs.add_text("tercera")
+    vs.save(str(db))
+    assert _texts(db) == ["primera", "segunda", "tercera"]
+    lines = wal_path(db).read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 3 and json.loads(lines[-1])["item"]["text"] == "tercera"
+
+
+def _ingest_worker(path, worker, n):
+    vectorstore.COMPACT_MIN_RECORDS = 7  # fuerza compactaciones en medio de las escrituras ajenas
+    for i in range(n):
+        vs = VectorStore.load(path)
+        vs.add_text(f"worker {worker} nota {i}")
+        vs.save(path)
+    return n
+
+
+def test_ingesta_en_paralelo_desde_varios_procesos(tmp_path):
+    db = tmp_path / "vectorstore.json"
+    with ProcessPoolExecutor(max_workers=3) as pool:
+        assert sum(pool.map(_ingest_worker, [str(db)] * 3, range(3), [20] * 3)) == 60
+    assert _texts(db) == sorted(f"worker {w} nota {i}" for w in range(3) for i in range(20))
@@ -0,0 +1,92 @@
+import sqlite3
+
+from wilbito.agents import router
+from wilbito.agents.council_v2 import run_council_v2
+from wilbito.config import DEFAULTS
+from wilbito.memory.context import retrieve_context
+from wilbito.memory.service import mem_db_path, shared_service
+from wilbito.memory.vectorstore import VectorStore
+
+ENTRIES = [
+    {"text": "Pipeline de CI: lint, tests, build", "meta": {"tag": "codegen"}},
+    {"text": "plan de marketing con tests A/B", "meta": {"tag": "marketing"}},
+    {"text": "sizing XAUUSD en alta volatilidad", "meta": {"tag": "trading"}},
+]
+
+
+def _seed(root):
+    vs = VectorStore()
+    vs.add_texts(ENTRIES)
+    vs.compact(str(mem_db_path(root)))
+
+
+def test_router_y_consejo_recuperan_contexto_en_proceso(tmp_path, monkeypatch):
+    _seed(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    res = router.run("tests", use_context=True, top_k=1, rag_tag="marketing")
+    assert [h["meta"]["tag"] for h in res["contexto"]] == ["marketing"]
+    res = router.run("tests", use_context=True, rag_filter={"tag": "codegen"})
+    assert [h["meta"]["tag"] for h in res["contexto"]] == ["codegen"]
+
+    db = tmp_path / "wilbito.db"
+    with sqlite3.connect(db) as conn:
+        conn.execute("CREATE TABLE events (run_id, task_id, level, message, data_json, created_at)")
+    out = run_council_v2("volatilidad XAUUSD", str(db), use_context=True, top_k=1)
+    assert out["contexto"][0]["meta"]["tag"] == "trading"
+
+
+def test_store_compartido_se_reutiliza_y_recarga_si_cambia(tmp_path):
+    _seed(tmp_path)
+    cfg = {"memory": dict(DEFAULTS["memory"])}
+    svc = shared_service(cfg, tmp_path)
+    assert shared_service(cfg, tmp_path) is svc
+    first = svc.store()
+    assert retrieve_context("XAUUSD", top_k=1, cfg=cfg, root=tmp_path)[0]["meta"]["tag"] == "trading"
+    assert svc.store() is first
+
+    vs = VectorStore.load(str(mem_db_path(tmp_path)))
+    vs.add_text("runbook de incidentes en staging")
+    vs.save(str(mem_db_path(tmp_path)))
+    assert retrieve_context("runbook", top_k=1, min_score=0.1, cfg=cfg, root=tmp_path)[0]["text"].startswith("runbook")
+    assert svc.store() is not first
+
+
+def test_cache_de_stores_descarta_el_menos_usado_y_los_vencidos(tmp_path, monkeypatch):
+    from wilbito.memory import service
+
+    service.clear_shared()
+    roots = [tmp_path / n for n in ("a", "b", "c")]
+    for r in roots:
+        _seed(r)
+    cfg = {"memory": dict(DEFAULTS["memory"], cache_max_stores=2, cache_ttl_s=60)}
+    a = shared_service(cfg, roots[0])
+    a.store()
+    shared_service(cfg, roots[1])
+    assert shared_service(cfg, roots[0]) is a  # a pasa a ser el más reciente
+    shared_service(cfg, roots[2])  # descarta b
+    assert shared_service(cfg, roots[0]) is a
+    assert len(service._SHARED) == 2 and all(k[0] != str(roots[1].resolve()) for k in service._SHARED)
+
+    clock = [1000.0]
+    monkeypatch.setattr(service.time, "monotonic", lambda: clock[0])
+    shared_service(cfg, roots[0])
+    clock[0] += 61
+    c = shared_service(cfg, roots[2])
+    assert list(service._SHARED.values())[0][0] is c and len(service._SHARED) == 1
+    assert a._store is None  # store liberado al vencer
+    service.clear_shared()
+
+
+def test_iteraciones_del_router_reutilizan_el_indice(tmp_path, monkeypatch):
+    from wilbito.memory import service
+
+    _seed(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    loads = []
+    real = service.open_reader
+    monkeypatch.setattr(service, "open_reader", lambda *a, **kw: loads.append(1) or real(*a, **kw))
+    service.clear_shared()
+    for _ in range(3):
+        assert router.run("XAUUSD", use_context=True, top_k=1)["contexto"]
+    assert len(loads) == 1
+    service.clear_shared()
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+from wilbito.config import DEFAULTS
+from wilbito.memory.daemon import DaemonError, MemoryClient, info_path, serve
+from wilbito.memory.service import MemoryService, mem_db_path, mem_sqlite_path
+from wilbito.memory.sqlite_store import SqliteVectorStore
+from wilbito.memory.vectorstore import VectorStore
+
+ENTRIES = [
+    {"text": "Pipeline de CI: lint, tests, build", "meta": {"tag": "codegen"}},
+    {"text": "plan de marketing con tests A/B", "meta": {"tag": "marketing"}},
+    {"text": "sizing XAUUSD en alta volatilidad", "meta": {"tag": "trading"}},
+]
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    db = mem_db_path(tmp_path)
+    vs = VectorStore()
+    vs.add_texts(ENTRIES)
+    vs.compact(str(db))
+    service = MemoryService.from_config({"memory": dict(DEFAULTS["memory"])}, tmp_path)
+    ready = threading.Event()
+    t = threading.Thread(target=serve, args=(service, tmp_path), kwargs={"ready": ready}, daemon=True)
+    t.start()
+    assert ready.wait(5)
+    client = MemoryClient.discover(tmp_path, timeout=5)
+    yield tmp_path, client
+    client.shutdown()
+    t.join(5)
+
+
+def test_daemon_busca_igual_que_el_store(daemon):
+    root, client = daemon
+    local = VectorStore.load(str(mem_db_path(root)))
+    assert client.ping() == 3
+    assert client.search("tests", top_k=2, prefer_tags=["marketing"]) == local.search("tests", top_k=2, prefer_tags=["marketing"])
+    assert client.search("tests", filter={"tag": "codegen"}) == local.search("tests", filter={"tag": "codegen"})
+    assert client.search_many(["tests", "XAUUSD"], top_k=1) == local.search_many(["tests", "XAUUSD"], top_k=1)
+    with pytest.raises(DaemonError):
+        client.search("tests", filter={"tag": {"foo": 1}})
+    with pytest.raises(DaemonError):
+        MemoryClient(client.address, "otro-token").ping()
+
+
+def test_daemon_ingesta_persiste_y_recarga_cambios_externos(daemon):
+    root, client = daemon
+    db = mem_db_path(root)
+    assert client.ingest([{"text": "nota nueva sobre drawdown", "meta": {"tag": "trading"}}, {"text": ENTRIES[0]["text"]}]) == 1
+    assert len(VectorStore.load(str(db))) == 4
+
+    # Otro proceso escribe directamente → el daemon recarga antes del próximo request
+    other = VectorStore.load(str(db))
+    other.add_text("runbook de incidentes en staging")
+    other.save(str(db))
+    assert client.search("runbook", top_k=1, min_score=0.1)[0]["text"] == "runbook de incidentes en staging"
+    assert client.ping() == 5
+
+
+def test_daemon_con_store_sqlite(tmp_path):
+    # Los requests se atienden en hilos distintos del que abrió la conexión
+    service = MemoryService.from_config({"memory": dict(DEFAULTS["memory"], store="sqlite")}, tmp_path)
+    ready = threading.Event()
+    t = threading.Thread(target=serve, args=(service, tmp_path), kwargs={"ready": ready}, daemon=True)
+    t.start()
+    assert ready.wait(5)
+    client = MemoryClient.discover(tmp_path, timeout=5)
+    try:
+        assert client.ping() == 0
+        assert client.ingest(ENTRIES) == 3
+        local = SqliteVectorStore(mem_sqlite_path(tmp_path))
+        assert client.ping() == 3
+        assert client.search("tests", top_k=2, prefer_tags=["marketing"]) == local.search(
+            "tests", top_k=2, prefer_tags=["marketing"]
+        )
+        assert client.search_many(["tests", "XAUUSD"], top_k=1) == local.search_many(["tests", "XAUUSD"], top_k=1)
+        local.close()
+    finally:
+        client.shutdown()
+        t.join(5)
+
+
+def test_sin_daemon_no_hay_cliente(tmp_path):
+    assert MemoryClient.discover(tmp_path) is None
+    info_path(tmp_path).parent.mkdir(parents=True)
+    info_path(tmp_path).write_text('{"address": "tcp:127.0.0.1:9", "token": "x"}', encoding="utf-8")
+    with pytest.raises(DaemonError):
+        MemoryClient.discover(tmp_path, timeout=1).ping()
@@ -0,0 +1,59 @@
+from wilbito.memory.dedup import content_hash, minhash, similarity
+from wilbito.memory.snapshot import open_fresh, snapshot_path
+from wilbito.memory.vectorstore import VectorStore, wal_path
+
+LARGO = "checklist de release: versionado semántico, changelog, tag firmado, build reproducible y smoke tests en staging"
+
+
+def test_huellas_deterministas():
+    assert content_hash("Hola   Mundo") == content_hash("hola mundo")
+    assert minhash(LARGO) == minhash(LARGO)
+    casi = LARGO.replace("staging", "staging.")
+    assert similarity(minhash(LARGO), minhash(casi)) == 1.0
+    otro = "plan de marketing para redes sociales con presupuesto mensual y métricas de conversión"
+    assert similarity(minhash(LARGO), minhash(otro)) < 0.2
+
+
+def test_dedup_skip_y_keep():
+    vs = VectorStore()
+    vs.dedup = "skip"
+    assert vs.add_text(LARGO, {"tag": "codegen"})
+    assert not vs.add_text(LARGO.upper(), {"tag": "codegen"})
+    assert not vs.add_text(LARGO + " (staging)", {"tag": "codegen"})  # casi igual
+    assert vs.add_text("sizing XAUUSD en alta volatilidad", {"tag": "trading"})
+    assert len(vs.items) == 2
+    assert vs.add_texts([{"text": LARGO}, {"text": "otra nota distinta"}]) == 1
+
+    vs.dedup = "keep"
+    assert vs.add_text(LARGO)
+    assert len(vs.items) == 4
+
+
+def test_dedup_merge_persiste_meta(tmp_path):
+    db = tmp_path / "vectorstore.json"
+    vs = VectorStore()
+    vs.add_text(LARGO, {"tag": "codegen"})
+    vs.add_text("sizing XAUUSD en alta volatilidad", {})
+    vs.mmap_snapshot = True
+    vs.compact(str(db))
+
+    vs = VectorStore.load(str(db))
+    vs.dedup = "merge"
+    assert not vs.add_text(LARGO, {"tag": "otro", "source": "diario"})
+    assert not vs.add_text("Sizing XAUUSD en alta volatilidad", {"tag": "trading"})
+    assert vs.items[0]["meta"] == {"tag": "codegen", "source": "diario"}
+    # La meta nueva queda en las particiones del filtro
+    hits = vs.search("XAUUSD", top_k=5, min_score=0.1, filter={"tag": "trading"})
+    assert [h["text"] for h in hits] == ["sizing XAUUSD en alta volatilidad"]
+    vs.save(str(db))
+    assert '"op":"meta"' in wal_path(db).read_text(encoding="utf-8")
+
+    with wal_path(db).open("a", encoding="utf-8") as f:
+        f.write('{"op":"meta","meta":{"tag":"huerfana"}}\n')  # sin id: se ignora
+    again = VectorStore.load(str(db))
+    assert [it["meta"] for it in again.items] == [it["meta"] for it in vs.items]
+
+    snap = open_fresh(db)
+    assert snap is not None and snapshot_path(db).exists()
+    assert snap.search("XAUUSD", top_k=1, filter={"tag": "trading"})[0]["meta"] == {"tag": "trading"}
+    snap.close()
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from wilbito.memory import dense  # noqa: E402
+from wilbito.memory.vectorstore import VectorStore  # noqa: E402
+
+ENTRIES = [
+    {"text": "Pipeline de CI: lint, tests, build", "meta": {"tag": "codegen"}},
+    {"text": "tests de regresión del pipeline", "meta": {"tag": "codegen"}},
+    {"text": "plan de marketing con tests A/B", "meta": {"tag": "marketing"}},
+    {"text": "sizing XAUUSD en alta volatilidad", "meta": {"tag": "trading"}},
+]
+
+
+def test_embeddings_deterministas_y_normalizados():
+    a = dense.embed_bows([{"tests": 0.6, "pipeline": 0.8}, {}])
+    b = dense.embed_bows([{"tests": 0.6, "pipeline": 0.8}])
+    assert a.dtype == np.float32 and a.shape == (2, dense.DEFAULT_DIM)
+    assert np.allclose(a[0], b[0]) and abs(float(np.linalg.norm(a[0])) - 1.0) < 1e-5
+    assert not a[1].any()
+
+
+def test_modo_denso_busca_filtra_y_aplica_boost():
+    vs = VectorStore(mode="dense")
+    vs.add_texts(ENTRIES)
+    hits = vs.search("volatilidad XAUUSD", top_k=1, min_score=0.1)
+    assert hits[0]["meta"]["tag"] == "trading"
+    hits = vs.search("tests pipeline", top_k=5, min_score=0.1, filter={"tag": "marketing"})
+    assert [h["meta"]["tag"] for h in hits] == ["marketing"]
+    plain = vs.search("tests", top_k=1, min_score=0.1, filter={"tag": "marketing"})[0]["score"]
+    boosted = vs.search("tests", top_k=1, min_score=0.1, filter={"tag": "marketing"}, prefer_tags=["marketing"])[0]["score"]
+    assert boosted == pytest.approx(plain * 1.2, abs=1e-3)
+    assert vs.search_many(["tests pipeline", "tests pipeline"], top_k=2) == [vs.search("tests pipeline", top_k=2)] * 2
+
+
+def test_ivf_con_todas_las_listas_coincide_con_busqueda_exacta(monkeypatch):
+    rnd = random.Random(5)
+    vocab = [f"t{i}" for i in range(300)]
+    exact = VectorStore(mode="dense")
+    for _ in range(400):
+        exact.add_text(" ".join(rnd.choices(vocab, k=rnd.randint(3, 12))))
+    queries = [" ".join(rnd.choices(vocab, k=3)) for _ in range(20)]
+    expected = [exact.search(q, top_k=3, min_score=0.01) for q in queries]
+
+    monkeypatch.setattr(dense, "IVF_MIN_ITEMS", 100)
+    ivf = VectorStore(exact.items, vectors_valid=True, mode="dense")
+    ivf.dense_nprobe = 10_000  # explorar todas las listas → resultado exacto
+    assert [ivf.search(q, top_k=3, min_score=0.01) for q in queries] == expected
+    assert ivf._dense.centroids is not None
+
+    ivf.dense_nprobe = 2  # aproximado: sólo las listas más cercanas, siempre devuelve top_k
+    assert all(len(ivf.search(q, top_k=3)) == 3 for q in queries)
+
+
+def test_vectores_densos_persisten_y_se_abren_con_mmap(tmp_path):
+    db = tmp_path / "vectorstore.json"
+    vs = VectorStore(mode="dense")
+    vs.add_texts(ENTRIES)
+    vs.compact(str(db))
+    assert dense.dense_path(db).exists()
+
+    again = VectorStore.load(str(db), mode="dense")
+    assert isinstance(again._dense._base, np.memmap)
+    again.add_text("nuevo item sobre volatilidad", {"tag": "trading"})
+    assert [h["id"] for h in again.search("volatilidad", top_k=2)] == [
+        h["id"] for h in VectorStore(again.items, vectors_valid=True, mode="dense").search("volatilidad", top_k=2)
+    ]
+
+    # snapshot JSON modificado → los vectores persistidos se ignoran
+    VectorStore.load(str(db)).compact(str(db))
+    assert VectorStore.load(str(db), mode="dense")._dense is None
@@ -0,0 +1,98 @@
+import json
+import sqlite3
+import sys
+import threading
+
+from wilbito.executor import loop as loop_mod
+from wilbito.executor.loop import ExecutorLoop
+from wilbito.executor.stepcache import input_files, step_cache_key
+
+# Cuenta sus ejecuciones en runs.txt e imprime el JSON que valida el executor
+COUNTING = [sys.executable, "-c", "open('runs.txt', 'a').write('x'); print('{\"ok\": true, \"unittest\": {\"returncode\": 0}}')"]
+
+
+def _run(tmp_path, steps, **kw):
+    (tmp_path / "commands.json").write_text(json.dumps(steps), encoding="utf-8")
+    return ExecutorLoop(db_path=tmp_path / "executor.db", **kw).run(tmp_path / "commands.json")
+
+
+def _runs(tmp_path):
+    return len((tmp_path / "runs.txt").read_text(encoding="utf-8"))
+
+
+def test_clave_depende_de_inputs_y_env_pero_no_de_pycache(tmp_path):
+    (tmp_path / "src" / "__pycache__").mkdir(parents=True)
+    (tmp_path / "src" / "mod.py").write_text("A = 1\n", encoding="utf-8")
+    step = {"cmd": ["python", "-m", "pytest"], "cache": {"inputs": ["src/**"], "env": ["WB_MODE"]}}
+    assert input_files(["src/**"], tmp_path) == ["src/mod.py"]
+    key = step_cache_key(step, tmp_path, {"WB_MODE": "a"})
+    (tmp_path / "src" / "__pycache__" / "mod.cpython-311.pyc").write_bytes(b"\0")
+    assert step_cache_key(step, tmp_path, {"WB_MODE": "a"}) == key
+    assert step_cache_key(step, tmp_path, {"WB_MODE": "b"}) != key
+    (tmp_path / "src" / "mod.py").write_text("A = 2\n", encoding="utf-8")
+    assert step_cache_key(step, tmp_path, {"WB_MODE": "a"}) != key
+    assert step_cache_key({"cmd": ["python"]}, tmp_path) is None
+
+
+def test_hit_repite_el_resultado_sin_lanzar_el_proceso(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "mod.py").write_text("A = 1\n", encoding="utf-8")
+    steps = [{"step_id": "quality", "cmd": COUNTING, "expect_json": True, "cache": {"inputs": ["src/**"]}}]
+
+    first = _run(tmp_path, steps)
+    second = _run(tmp_path, steps)
+    assert _runs(tmp_path) == 1
+    assert "cached" not in first["executed"][0] and second["executed"][0]["cached"] is True
+    assert second["executed"][0]["result"] == first["executed"][0]["result"] == {"ok": True, "unittest": {"returncode": 0}}
+
+    (tmp_path / "src" / "mod.py").write_text("A = 2\n", encoding="utf-8")
+    _run(tmp_path, steps)
+    _run(tmp_path, steps, use_cache=False)
+    assert _runs(tmp_path) == 3
+
+
+def test_no_se_cachean_errores_ni_faltan_outputs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    failing = [sys.executable, "-c", "open('runs.txt', 'a').write('x'); raise SystemExit(1)"]
+    _run(tmp_path, [{"step_id": "falla", "cmd": failing, "cache": True}])
+    _run(tmp_path, [{"step_id": "falla", "cmd": failing, "cache": True}])
+    assert _runs(tmp_path) == 2
+
+    seed = [sys.executable, "-c", "open('runs.txt', 'a').write('x'); open('seed.json', 'w').write('{}')"]
+    steps = [{"step_id": "seed", "cmd": seed, "cache": {"outputs": ["seed.json"]}}]
+    _run(tmp_path, steps)
+    _run(tmp_path, steps)
+    assert _runs(tmp_path) == 3
+    (tmp_path / "seed.json").unlink()
+    _run(tmp_path, steps)  # el hit no recrearía seed.json: se vuelve a correr
+    assert _runs(tmp_path) == 4 and (tmp_path / "seed.json").exists()
+
+
+def test_clave_se_calcula_fuera_del_event_loop(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    threads = []
+    real_key = loop_mod.step_cache_key
+    monkeypatch.setattr(
+        loop_mod, "step_cache_key", lambda *a, **kw: threads.append(threading.current_thread()) or real_key(*a, **kw)
+    )
+    _run(tmp_path, [{"step_id": "q", "cmd": COUNTING, "cache": {"inputs": ["*.txt"]}}])
+    assert threads and threading.main_thread() not in threads
+
+
+def test_error_interno_marca_el_step_y_cierra_el_run(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    class DiskFull:
+        def __init__(self, root):
+            raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(loop_mod, "ArtifactWriter", DiskFull)
+    chatty = [sys.executable, "-c", "print('x' * 100000)"]
+    out = _run(
+        tmp_path, [{"step_id": "chatty", "cmd": chatty, "depends_on": []}, {"step_id": "ok", "cmd": COUNTING, "depends_on": []}]
+    )
+    assert {r["step_id"]: r["status"] for r in out["executed"]} == {"chatty": "error", "ok": "ok"}
+    assert "No space left" in next(r["error"] for r in out["executed"] if r["step_id"] == "chatty")
+    with sqlite3.connect(tmp_path / "executor.db") as conn:
+        assert conn.execute("SELECT status, finished_at IS NOT NULL FROM runs").fetchall() == [("failed", 1)]
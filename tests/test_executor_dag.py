@@ -0,0 +1,164 @@
+import json
+import sqlite3
+import sys
+import threading
+import time
+
+import pytest
+from wilbito.executor import loop as loop_mod
+from wilbito.executor.artifacts import read_artifact
+from wilbito.executor.loop import ExecutorLoop, _plan_steps
+
+
+def _sleep(secs, rc=0):
+    return [sys.executable, "-c", f"import sys, time; time.sleep({secs}); sys.exit({rc})"]
+
+
+def _write(path, steps):
+    path.write_text(json.dumps(steps), encoding="utf-8")
+    return path
+
+
+def test_plan_por_defecto_es_secuencial_y_valida_dependencias():
+    assert _plan_steps([{"step_id": "a"}, {"step_id": "b"}, {"step_id": "c", "depends_on": []}]) == [[], [0], []]
+    assert _plan_steps([{"step_id": "a", "depends_on": []}, {"step_id": "b", "depends_on": "a"}]) == [[], [0]]
+    with pytest.raises(ValueError):
+        _plan_steps([{"step_id": "a", "depends_on": ["z"]}])
+    with pytest.raises(ValueError):
+        _plan_steps([{"step_id": "a", "depends_on": ["b"]}, {"step_id": "b", "depends_on": ["a"]}])
+
+
+def test_ramas_independientes_corren_en_paralelo(tmp_path):
+    steps = [
+        {"step_id": "m1", "cmd": _sleep(0.5), "depends_on": []},
+        {"step_id": "m2", "cmd": _sleep(0.5), "depends_on": []},
+        {"step_id": "seed", "cmd": _sleep(0.5), "depends_on": []},
+        {"step_id": "quality", "cmd": [sys.executable, "-c", "print('{\"ok\": true}')"], "expect_json": True,
+         "depends_on": ["m1", "m2", "seed"]},
+    ]  # fmt: skip
+    loop = ExecutorLoop(db_path=tmp_path / "executor.db", max_workers=3)
+    t0 = time.perf_counter()
+    out = loop.run(_write(tmp_path / "commands.json", steps))
+    assert time.perf_counter() - t0 < 1.2  # secuencial: >= 1.5 s
+    assert out["ok"] and out["skipped"] == []
+    assert [r["step_id"] for r in out["executed"]][-1] == "quality"
+    assert out["executed"][-1]["result"] == {"ok": True}
+    with sqlite3.connect(tmp_path / "executor.db") as conn:
+        assert conn.execute("SELECT COUNT(*) FROM tasks WHERE status='ok'").fetchone()[0] == 4
+
+
+def test_error_corta_su_rama_sigue_las_demas_y_hace_rollback(tmp_path):
+    marker = tmp_path / "rolled_back"
+    steps = [
+        {"step_id": "falla", "cmd": _sleep(0, rc=3), "depends_on": []},
+        {"step_id": "hijo", "cmd": _sleep(0), "depends_on": ["falla"]},
+        {"step_id": "nieto", "cmd": _sleep(0)},
+        {"step_id": "otra-rama", "cmd": _sleep(0.2), "depends_on": []},
+    ]
+    rollback = [{"step_id": "rb", "cmd": [sys.executable, "-c", f"open({str(marker)!r}, 'w').close()"]}]
+    loop = ExecutorLoop(db_path=tmp_path / "executor.db")
+    out = loop.run(_write(tmp_path / "commands.json", steps), _write(tmp_path / "rollback.json", rollback))
+    assert not out["ok"] and out["status"] == "failed"
+    assert {r["step_id"]: r["status"] for r in out["executed"]} == {"falla": "error", "otra-rama": "ok"}
+    assert out["skipped"] == ["hijo", "nieto"]
+    assert out["rollback"] == {"status": "done"} and marker.exists()
+
+
+def test_sin_depends_on_se_detiene_al_primer_error(tmp_path):
+    steps = [{"step_id": "a", "cmd": _sleep(0)}, {"step_id": "b", "cmd": _sleep(0, rc=1)}, {"step_id": "c", "cmd": _sleep(0)}]
+    out = ExecutorLoop(db_path=tmp_path / "executor.db").run(_write(tmp_path / "commands.json", steps))
+    assert [(r["step_id"], r["status"]) for r in out["executed"]] == [("a", "ok"), ("b", "error")]
+    assert out["skipped"] == ["c"]
+
+    out = ExecutorLoop(db_path=tmp_path / "executor.db").run(
+        _write(tmp_path / "ciclo.json", [{"step_id": "a", "depends_on": ["a2"]}, {"step_id": "a2", "depends_on": ["a"]}])
+    )
+    assert not out["ok"] and out["executed"] == []
+
+
+def test_una_conexion_en_wal_y_registros_por_tanda(tmp_path, monkeypatch):
+    connects = []
+    real_connect = sqlite3.connect
+    monkeypatch.setattr(loop_mod.sqlite3, "connect", lambda *a, **kw: connects.append(a) or real_connect(*a, **kw))
+    steps = [{"step_id": s, "cmd": _sleep(0)} for s in ("a", "b", "c", "d", "e")]
+    loop = ExecutorLoop(db_path=tmp_path / "executor.db")
+    assert loop.run(_write(tmp_path / "commands.json", steps))["ok"]
+    assert len(connects) == 1
+    with real_connect(tmp_path / "executor.db") as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] == 5
+        assert conn.execute("SELECT status FROM runs").fetchone()[0] == "success"
+
+
+def test_lo_encolado_se_escribe_al_salir(tmp_path):
+    loop = ExecutorLoop(db_path=tmp_path / "executor.db")
+    run_id = loop._insert_run("a-medias")
+    loop._event("info", "pendiente", run_id=run_id)
+    with sqlite3.connect(tmp_path / "executor.db") as conn:
+        assert conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 0
+    loop_mod._flush_all()  # lo que corre atexit
+    with sqlite3.connect(tmp_path / "executor.db") as conn:
+        assert conn.execute("SELECT event FROM events").fetchall() == [("pendiente",)]
+
+
+def test_salida_grande_queda_acotada_y_se_registra_en_eventos(tmp_path):
+    chatty = [sys.executable, "-c", "import sys\nfor i in range(200000): print(f'linea {i}')\nprint('fin', file=sys.stderr)"]
+    steps = [{"step_id": "verbose", "cmd": chatty}]
+    loop = ExecutorLoop(db_path=tmp_path / "executor.db", spill_bytes=0)
+    assert loop.run(_write(tmp_path / "commands.json", steps))["ok"]
+    with sqlite3.connect(tmp_path / "executor.db") as conn:
+        stdout, stderr = conn.execute("SELECT stdout, stderr FROM tasks").fetchone()
+        details = [json.loads(d) for (d,) in conn.execute("SELECT details_json FROM events WHERE event='step output'")]
+    assert len(stdout) < loop_mod.OUTPUT_HEAD_CHARS + loop_mod.OUTPUT_TAIL_CHARS + 100
+    assert stdout.startswith("linea 0\n") and stdout.endswith("linea 199999\n") and "líneas omitidas" in stdout
+    assert stderr == "fin\n"
+    out_lines = [line for d in details if d["stream"] == "stdout" for line in d["lines"]]
+    assert out_lines[:2] == ["linea 0", "linea 1"] and len(out_lines) == loop_mod.OUTPUT_EVENT_MAX_LINES
+
+
+def test_timeout_por_step_mata_el_proceso_y_corta_la_rama(tmp_path):
+    steps = [
+        {"step_id": "colgado", "cmd": _sleep(30), "timeout_s": 0.5, "depends_on": []},
+        {"step_id": "despues", "cmd": _sleep(0)},
+        {"step_id": "rapido", "cmd": _sleep(0), "depends_on": []},
+    ]
+    t0 = time.perf_counter()
+    out = ExecutorLoop(db_path=tmp_path / "executor.db").run(_write(tmp_path / "commands.json", steps))
+    assert time.perf_counter() - t0 < 10
+    assert {r["step_id"]: r["status"] for r in out["executed"]} == {"colgado": "error", "rapido": "ok"}
+    assert "timeout_s=0.5" in next(r["error"] for r in out["executed"] if r["step_id"] == "colgado")
+    assert out["skipped"] == ["despues"]
+
+
+def test_cancel_termina_los_steps_en_curso(tmp_path):
+    steps = [{"step_id": "largo", "cmd": _sleep(30)}, {"step_id": "siguiente", "cmd": _sleep(0)}]
+    loop = ExecutorLoop(db_path=tmp_path / "executor.db")
+    timer = threading.Timer(0.5, loop.cancel)
+    timer.start()
+    t0 = time.perf_counter()
+    out = loop.run(_write(tmp_path / "commands.json", steps))
+    timer.join()
+    assert time.perf_counter() - t0 < 10 and not out["ok"]
+    assert out["executed"][0]["status"] == "error" and "cancel" in out["executed"][0]["error"]
+    assert out["skipped"] == ["siguiente"]
+
+
+def test_salida_grande_se_desborda_a_un_artifact_por_contenido(tmp_path):
+    chatty = [sys.executable, "-c", "for i in range(50000): print(f'test_{i} PASSED')"]
+    steps = [
+        {"step_id": "pytest-v", "cmd": chatty},
+        {"step_id": "otra-vez", "cmd": chatty},
+        {"step_id": "corto", "cmd": _sleep(0)},
+    ]
+    loop = ExecutorLoop(db_path=tmp_path / "executor.db", artifacts_dir=tmp_path / "artifacts")
+    assert loop.run(_write(tmp_path / "commands.json", steps))["ok"]
+    with sqlite3.connect(tmp_path / "executor.db") as conn:
+        rows = conn.execute("SELECT stdout, stdout_artifact, stderr_artifact FROM tasks ORDER BY id").fetchall()
+        arts = conn.execute("SELECT path, kind, bytes, sha256, stored_bytes FROM artifacts").fetchall()
+    (first, path, no_err), (_, path2, _), (short, none, _) = rows
+    assert path == path2 and no_err is None and none is None and short == ""  # misma salida = mismo artifact
+    assert len(first) < 2 * loop_mod.SPILL_PREVIEW_CHARS + 100 and first.startswith("test_0 PASSED")
+    full = read_artifact(path)
+    assert full.splitlines() == [f"test_{i} PASSED" for i in range(50000)]
+    assert arts == [(path, "stdout", len(full), arts[0][3], arts[0][4])] and arts[0][4] < len(full) / 5
+    assert path.endswith(arts[0][3] + ".log.gz") or path.endswith(arts[0][3] + ".log.zst")
@@ -0,0 +1,64 @@
+from wilbito.memory.qcache import QueryCache, query_cache_path
+from wilbito.memory.service import MemoryService, mem_db_path, mem_sqlite_path
+from wilbito.memory.sqlite_store import SqliteVectorStore
+from wilbito.memory.vectorstore import VectorStore
+
+HITS = [{"id": "a", "score": 0.5, "text": "pipeline de CI", "meta": {"tag": "codegen"}}]
+
+
+def test_clave_normaliza_query_y_tags_y_depende_de_la_version():
+    key = QueryCache.key("Pipeline  de CI", 5, 0.0, ["b", "a"], {"tag": ["x"]}, 1)
+    assert key == QueryCache.key(" pipeline de ci ", 5, 0.0, ["a", "b"], {"tag": ["x"]}, 1)
+    assert key != QueryCache.key("pipeline de ci", 5, 0.0, ["a", "b"], {"tag": ["x"]}, 2)
+    assert key != QueryCache.key("pipeline de ci", 3, 0.0, ["a", "b"], {"tag": ["x"]}, 1)
+    assert QueryCache.key("Straße", 5, 0.0, None, None, 1) != QueryCache.key("STRASSE", 5, 0.0, None, None, 1)
+
+
+def test_lru_persistencia_y_copias(tmp_path):
+    path = tmp_path / "qc.json"
+    cache = QueryCache(2, path)
+    cache.put("k1", HITS)
+    cache.put("k2", [])
+    cache.get("k1")[0]["meta"]["tag"] = "pisado"  # el caller no altera lo cacheado
+    cache.put("k3", HITS)  # desaloja k2 (k1 se usó más recientemente)
+    assert cache.get("k2") is None and cache.get("k1") == HITS
+    assert cache.stats() == {"entries": 2, "hits": 2, "misses": 1}
+    cache.flush()
+    assert QueryCache(2, path).get("k3") == HITS
+    path.write_text("{roto", encoding="utf-8")
+    assert len(QueryCache(2, path)) == 0
+
+
+def test_servicio_sirve_hits_sin_cargar_el_store_e_invalida_al_cambiar(tmp_path):
+    cfg = {"memory": {"query_cache": 8, "query_cache_persist": True}}
+    db = mem_db_path(tmp_path)
+    vs = VectorStore()
+    vs.add_texts([{"text": "pipeline de CI con tests"}, {"text": "plan de marketing"}])
+    vs.compact(str(db))
+
+    first = MemoryService.from_config(cfg, tmp_path, readonly=True).search("tests pipeline", top_k=1)
+    assert query_cache_path(tmp_path).exists()
+    svc = MemoryService.from_config(cfg, tmp_path, readonly=True)
+    loads = []
+    loader = svc._loader
+    svc._loader = lambda: loads.append(1) or loader()
+    assert svc.search("Tests  Pipeline", top_k=1) == first and not loads  # hit desde disco
+    assert svc.search_many(["tests pipeline", "marketing"], top_k=1)[0] == first and len(loads) == 1
+    assert svc.cache.stats()["hits"] == 2
+
+    writer = MemoryService.from_config(cfg, tmp_path)
+    writer.search("tests pipeline", top_k=1)
+    writer.ingest([{"text": "tests del pipeline"}])
+    assert len(writer.cache) == 0
+    # Otro proceso escribió: la versión (archivos del store) cambió y no se usa lo cacheado
+    assert svc.search("tests pipeline", top_k=1)[0]["text"] == "tests del pipeline"
+
+
+def test_cache_sqlite_ve_commits_de_otra_conexion(tmp_path):
+    svc = MemoryService.from_config({"memory": {"store": "sqlite"}}, tmp_path)
+    svc.ingest([{"text": "pipeline de CI con lint"}])
+    assert len(svc.search("runbook", min_score=0.1)) == 0
+    other = SqliteVectorStore(mem_sqlite_path(tmp_path))
+    other.add_text("runbook de incidentes")  # commit en el -wal, la base no cambia
+    other.close()
+    assert svc.search("runbook", min_score=0.1)[0]["text"] == "runbook de incidentes"
@@ -0,0 +1,115 @@
+import json
+import random
+import time
+
+import pytest
+from wilbito.memory.retention import RetentionPolicy, apply_retention, cold_dir, item_time
+from wilbito.memory.service import MemoryService, mem_db_path
+from wilbito.memory.vectorstore import VectorStore
+
+NOW = 1_800_000_000.0
+DAY = 86400.0
+
+
+def _aged(text, tag, days, now=NOW):
+    return {"id": f"{tag}-{days}", "text": text, "meta": {"tag": tag}, "ts": int(now - days * DAY)}
+
+
+def test_item_time_usa_timestamp_del_diario_o_ts_de_ingesta():
+    assert item_time({"meta": {"timestamp": "2027-01-15T12:00:00"}, "ts": 1}) == pytest.approx(
+        time.mktime((2027, 1, 15, 12, 0, 0, 0, 0, -1))
+    )
+    assert item_time({"meta": {"timestamp": "ayer"}, "ts": 5}) == 5.0
+    assert item_time({"meta": {}}) is None
+    vs = VectorStore()
+    vs.add_text("nota nueva")
+    assert abs(vs.items[0]["ts"] - time.time()) < 5
+
+
+def test_politica_por_tag_con_ttl_y_maximo():
+    items = [_aged("log viejo", "log", 40), _aged("log nuevo", "log", 1), _aged("nota vieja", "nota", 400)]
+    items += [_aged(f"idea {d}", "idea", d) for d in (1, 2, 3)] + [{"text": "sin fecha", "meta": {"tag": "idea"}}]
+    policy = RetentionPolicy(ttl_days={"log": 30, "*": 365}, max_items={"idea": 2})
+    # log viejo por TTL, nota vieja por el TTL de "*", y de idea se quedan las 2 más recientes
+    assert policy.expired(items, NOW) == [0, 2, 5, 6]
+    with pytest.raises(ValueError):
+        RetentionPolicy(action="borrar")
+
+
+def test_compactacion_archiva_vencidos_en_segmento_frio(tmp_path):
+    db = tmp_path / "vectorstore.json"
+    vs = VectorStore([_aged("pipeline de CI viejo", "log", 90), _aged("pipeline de CI actual", "log", 2)])
+    vs.decay_half_life_days = 30.0
+    vs.compact(str(db))
+    hot, stats = apply_retention(vs, db, RetentionPolicy(ttl_days={"log": 30}), now=NOW, dry_run=True)
+    assert hot is vs and (stats["expired"], stats["kept"]) == (1, 1)
+    assert not cold_dir(db).exists()
+
+    hot, stats = apply_retention(vs, db, RetentionPolicy(ttl_days={"log": 30}), now=NOW)
+    assert [it["text"] for it in hot.items] == ["pipeline de CI actual"]
+    assert hot.decay_half_life_days == 30.0
+    assert [it["text"] for it in VectorStore.load(str(db)).items] == ["pipeline de CI actual"]
+    cold = VectorStore.load(stats["segment"])
+    assert [it["text"] for it in cold.items] == ["pipeline de CI viejo"]
+    assert cold.search("pipeline", top_k=1)[0]["id"] == "log-90"
+
+    hot.add_items([_aged("otro pipeline", "log", 0)])
+    hot.save(str(db))
+    hot, stats = apply_retention(hot, db, RetentionPolicy(max_items={"log": 1}, action="drop"), now=NOW)
+    assert "segment" not in stats and len(list(cold_dir(db).glob("*.json"))) == 1
+    assert [it["text"] for it in VectorStore.load(str(db)).items] == ["otro pipeline"]
+
+
+@pytest.mark.parametrize("backend", ["python", "numpy"])
+def test_decaimiento_prefiere_lo_reciente(backend):
+    if backend == "numpy":
+        pytest.importorskip("numpy")
+    vs = VectorStore(backend=backend)
+    now = time.time()
+    vs.add_items([_aged("deploy del servicio de pagos", "ops", 200, now), _aged("deploy del servicio de pagos", "ops", 1, now)])
+    assert vs.search("deploy pagos", top_k=1)[0]["id"] == "ops-200"  # empate: gana el primero
+    vs.decay_half_life_days = 30.0
+    vs._decay_key = None
+    hits = vs.search("deploy pagos", top_k=2)
+    assert [h["id"] for h in hits] == ["ops-1", "ops-200"]
+    assert hits[1]["score"] < hits[0]["score"] * 0.05
+    assert vs.search_many(["deploy pagos"], top_k=2) == [hits]
+
+
+def test_poda_con_decaimiento_coincide_con_puntaje_exhaustivo():
+    rnd = random.Random(11)
+    words = [f"w{i}" for i in range(40)]
+    vs = VectorStore()
+    vs.add_items(
+        [
+            {
+                "id": str(i),
+                "text": " ".join(rnd.choices(words, k=8)),
+                "meta": {},
+                "ts": int(time.time() - rnd.uniform(0, 300) * DAY),
+            }
+            for i in range(300)
+        ]
+    )
+    vs.decay_half_life_days = 45.0
+    for _ in range(20):
+        query = " ".join(rnd.sample(words, 3))
+        qv = vs._query_weights(query)
+        full = vs._score_positions(qv, list(range(len(vs.items))), None)
+        expected = sorted(full.items(), key=lambda kv: (-kv[1], kv[0]))[:5]
+        hits = vs.search(query, top_k=5)
+        assert [h["score"] for h in hits] == [round(sc, 4) for _, sc in expected]
+
+
+def test_servicio_aplica_la_politica_de_la_config(tmp_path):
+    cfg = {"memory": {"ttl_days": {"*": 10}, "retention": "drop", "decay_half_life_days": 7}}
+    db = mem_db_path(tmp_path)
+    VectorStore([_aged("nota antigua", "nota", 20), _aged("nota reciente", "nota", 1)]).compact(str(db))
+    svc = MemoryService.from_config(cfg, tmp_path)
+    assert svc.store().decay_half_life_days == 7.0
+    stats = svc.enforce_retention(now=NOW)
+    assert (stats["expired"], stats["action"]) == (1, "drop")
+    assert svc.handle({"op": "ping"}) == {"ok": True, "items": 1}
+    assert json.loads(db.read_text(encoding="utf-8"))["items"][0]["text"] == "nota reciente"
+    with pytest.raises(ValueError):
+        MemoryService.from_config(cfg, tmp_path, readonly=True).enforce_retention()
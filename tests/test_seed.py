@@ -0,0 +1,81 @@
+import json
+
+import pytest
+from wilbito.memory import seed
+from wilbito.memory.vectorstore import VectorStore, wal_path
+
+SEEDS = [
+    {"text": "Pipeline de CI: lint, tests, build", "tag": "codegen"},
+    {"contenido": "plan de marketing con tests A/B", "etiqueta": "marketing"},
+    {"text": "sizing XAUUSD en alta volatilidad", "meta": {"source": "diario"}, "tag": "trading"},
+    {"tag": "sin texto"},
+]
+EXPECTED = [
+    {"text": "Pipeline de CI: lint, tests, build", "meta": {"tag": "codegen"}},
+    {"text": "plan de marketing con tests A/B", "meta": {"tag": "marketing"}},
+    {"text": "sizing XAUUSD en alta volatilidad", "meta": {"source": "diario", "tag": "trading"}},
+]
+
+
+def test_lee_jsonl_arreglo_json_y_yaml_en_streaming(tmp_path, monkeypatch):
+    jsonl = tmp_path / "seeds.jsonl"
+    jsonl.write_text("\n".join(json.dumps(s) for s in SEEDS) + "\n{roto\n", encoding="utf-8")
+    assert list(seed.iter_seed_records(jsonl)) == EXPECTED
+
+    arr = tmp_path / "seeds.json"
+    arr.write_text(json.dumps(SEEDS, indent=2), encoding="utf-8")
+    monkeypatch.setattr(seed, "_READ_SIZE", 7)  # fuerza elementos cortados entre lecturas
+    assert list(seed.iter_seed_records(arr)) == EXPECTED
+
+    arr.write_text(json.dumps(SEEDS)[:-1], encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(seed.iter_seed_records(arr))
+
+    pytest.importorskip("yaml")
+    yml = tmp_path / "seeds.yaml"
+    yml.write_text(
+        "# semillas\n"
+        "- text: 'Pipeline de CI: lint, tests, build'\n  tag: codegen\n"
+        "- contenido: plan de marketing con tests A/B\n  etiqueta: marketing\n"
+        "-\n  text: sizing XAUUSD en alta volatilidad\n  meta:\n    source: diario\n  tag: trading\n",
+        encoding="utf-8",
+    )
+    assert list(seed.iter_seed_records(yml)) == EXPECTED
+
+
+def test_bulk_load_persiste_por_lote_y_deduplica(tmp_path):
+    db = tmp_path / "vectorstore.json"
+    vs = VectorStore.load(str(db))
+    vs.dedup = "skip"
+    records = [{"text": f"nota {i} sobre el pipeline de release", "meta": {}} for i in range(25)]
+    records.append({"text": "nota 3 sobre el pipeline de release", "meta": {"tag": "dup"}})
+    seen = []
+    stats = seed.bulk_load(vs, records, db, chunk=10, progress=seen.append)
+    assert (stats["read"], stats["ingested"]) == (26, 25)
+    assert [s["read"] for s in seen] == [10, 20, 26]
+    # El primer lote crea el snapshot; los siguientes se agregan al log
+    assert len(wal_path(db).read_text(encoding="utf-8").splitlines()) == 15
+    assert len(VectorStore.load(str(db))) == 25
+
+
+def test_bulk_load_con_workers_coincide_con_carga_en_proceso(tmp_path):
+    records = [
+        {"text": f"runbook {i}: reiniciar el servicio {i % 7} en staging", "meta": {"tag": f"t{i % 3}"}} for i in range(60)
+    ]
+    local, par = VectorStore(), VectorStore()
+    local.dedup = par.dedup = "skip"
+    seed.bulk_load(local, records, chunk=16)
+    stats = seed.bulk_load(par, records, chunk=16, workers=2)
+    assert stats["ingested"] == len(local)
+    assert [it["text"] for it in par.items] == [it["text"] for it in local.items]
+    assert [(h["text"], h["score"]) for h in par.search("reiniciar servicio 3", top_k=5)] == [
+        (h["text"], h["score"]) for h in local.search("reiniciar servicio 3", top_k=5)
+    ]
+
+
+def test_seed_from_file_usa_el_store_del_directorio(tmp_path):
+    src = tmp_path / "seeds.jsonl"
+    src.write_text("\n".join(json.dumps(s) for s in SEEDS), encoding="utf-8")
+    out = seed.seed_from_file(str(src), db_dir=str(tmp_path / "db"))
+    assert out["ok"] and out["ingested"] == 3
+    assert len(VectorStore.load(str(tmp_path / "db" / "vectorstore.json"))) == 3
@@ -0,0 +1,53 @@
+from wilbito.memory.snapshot import MmapSnapshot, open_fresh, snapshot_path, write_snapshot
+from wilbito.memory.vectorstore import VectorStore
+
+ENTRIES = [
+    {"text": "Pipeline de CI: lint, tests, build", "meta": {"tag": "codegen"}},
+    {"text": "tests de regresión del pipeline", "meta": {"tag": "codegen"}},
+    {"text": "plan de marketing con tests A/B", "meta": {"tag": "marketing"}},
+    {"text": "sizing XAUUSD en alta volatilidad", "meta": {}},
+]
+
+
+def _pairs(hits):
+    return [(h["id"], h["score"], h["meta"]) for h in hits]
+
+
+def test_snapshot_mmap_coincide_con_vectorstore(tmp_path):
+    vs = VectorStore()
+    vs.add_texts(ENTRIES)
+    write_snapshot(vs, tmp_path / "m.snap")
+    for mode in ("cosine-tf", "tfidf", "bm25"):
+        vs.scoring = mode
+        with MmapSnapshot(tmp_path / "m.snap", scoring=mode) as snap:
+            assert len(snap) == 4
+            for kw in (
+                {},
+                {"min_score": 0.2},
+                {"prefer_tags": ["marketing"]},
+                {"filter": {"tag": ["codegen", "trading"]}, "prefer_tags": ["codegen"]},
+            ):
+                assert _pairs(snap.search("tests pipeline", top_k=3, **kw)) == _pairs(vs.search("tests pipeline", top_k=3, **kw))
+            assert _pairs(snap.search("nada", top_k=2)) == _pairs(vs.search("nada", top_k=2))
+
+
+def test_open_fresh_suma_el_log_y_detecta_desactualizado(tmp_path):
+    db = tmp_path / "vectorstore.json"
+    vs = VectorStore()
+    vs.mmap_snapshot = True
+    vs.add_texts(ENTRIES)
+    vs.compact(str(db))
+    assert snapshot_path(db).exists()
+
+    vs2 = VectorStore.load(str(db))
+    vs2.add_text("nota nueva XAUUSD", {"tag": "trading"})
+    vs2.save(str(db))  # va al log; el snapshot sigue vigente
+
+    snap = open_fresh(db)
+    assert snap is not None and len(snap) == 5
+    assert snap.search("nueva", top_k=1, min_score=0.1)[0]["meta"] == {"tag": "trading"}
+    snap.close()
+
+    # Un snapshot JSON reescrito sin regenerar el binario → desactualizado
+    VectorStore.load(str(db)).compact(str(db))
+    assert open_fresh(db) is None
@@ -0,0 +1,113 @@
+from wilbito.memory import diario
+from wilbito.memory.service import MemoryService, mem_db_path, mem_sqlite_path
+from wilbito.memory.sqlite_store import SqliteVectorStore, migrate_json_to_sqlite
+from wilbito.memory.vectorstore import VectorStore
+
+ENTRIES = [
+    {"text": "Pipeline de CI: lint, tests, build", "meta": {"tag": "codegen"}},
+    {"text": "tests de regresión del pipeline", "meta": {"tag": "codegen"}},
+    {"text": "plan de marketing con tests A/B", "meta": {"tag": "marketing"}},
+    {"text": "sizing XAUUSD en alta volatilidad", "meta": {"tag": "trading"}},
+]
+
+
+def _pairs(hits):
+    return [(h["text"], h["score"]) for h in hits]
+
+
+def test_sqlite_store_coincide_con_vectorstore(tmp_path):
+    for mode in ("cosine-tf", "tfidf", "bm25"):
+        db = SqliteVectorStore(tmp_path / f"{mode}.db", scoring=mode)
+        assert db.add_texts(ENTRIES) == 4
+        vs = VectorStore(scoring=mode)
+        vs.add_texts(ENTRIES)
+        for kw in (
+            {},
+            {"min_score": 0.2},
+            {"prefer_tags": ["marketing"]},
+            {"filter": {"tag": ["codegen", "trading"]}, "prefer_tags": ["codegen"]},
+        ):
+            assert _pairs(db.search("tests pipeline", top_k=3, **kw)) == _pairs(vs.search("tests pipeline", top_k=3, **kw))
+        # sin coincidencias y min_score 0: se completa por orden de inserción
+        assert [h["text"] for h in db.search("nada", top_k=2)] == [e["text"] for e in ENTRIES[:2]]
+        db.close()
+
+
+def test_sqlite_con_stemming_coincide_con_vectorstore(tmp_path):
+    from wilbito.memory import matrix
+    from wilbito.memory.tokenizer import make_tokenizer
+
+    entries = [
+        {"text": "automatización de despliegues nocturnos"},
+        {"text": "las automatizaciones del pipeline"},
+        {"text": "despliegue manual en staging"},
+    ]
+    tok = make_tokenizer(True)
+    db = SqliteVectorStore(tmp_path / "stem.db", tokenizer=tok)
+    db.add_texts(entries)
+    for backend in ["python", "numpy"] if matrix.available() else ["python"]:
+        vs = VectorStore(backend=backend, tokenizer=tok)
+        vs.add_texts(entries)
+        for query in ("automatizacion despliegue", "Automatizaciones", "despliegues"):
+            assert _pairs(db.search(query, top_k=3, min_score=0.01)) == _pairs(vs.search(query, top_k=3, min_score=0.01))
+    assert len(db.search("automatizacion", top_k=3, min_score=0.01)) == 2
+    db.close()
+
+
+def test_dedup_en_sqlite(tmp_path):
+    largo = "checklist de release: versionado semántico, changelog, tag firmado, build reproducible y smoke tests en staging"
+    db = SqliteVectorStore(tmp_path / "d.db")
+    db.add_text(largo, {"tag": "codegen"})  # sin dedup: se indexa al activarlo
+    db.dedup = "skip"
+    assert not db.add_text(largo.upper())
+    assert not db.add_text(largo + " (staging)")  # casi igual
+    assert db.add_texts([{"text": largo}, {"text": "sizing XAUUSD"}, {"text": "Sizing  XAUUSD"}]) == 1
+    db.dedup = "merge"
+    assert not db.add_text(largo, {"tag": "otro", "source": "diario"})
+    assert len(db) == 2 and db.search("checklist", top_k=1)[0]["meta"] == {"tag": "codegen", "source": "diario"}
+    db.close()
+
+    # memory.dedup llega al store SQLite desde la config (default: skip)
+    svc = MemoryService.from_config({"memory": {"store": "sqlite"}}, tmp_path)
+    assert svc.ingest([{"text": largo}, {"text": largo}]) == 1
+
+
+def test_migracion_desde_json(tmp_path):
+    src = tmp_path / "vectorstore.json"
+    vs = VectorStore()
+    vs.add_texts(ENTRIES)
+    vs.save(str(src))
+
+    res = migrate_json_to_sqlite(src, tmp_path / "vectorstore.db")
+    assert res["migrated"] == 4 and res["total"] == 4
+    # idempotente
+    assert migrate_json_to_sqlite(src, tmp_path / "vectorstore.db")["migrated"] == 0
+
+    db = SqliteVectorStore.load(tmp_path / "vectorstore.db")
+    hit = db.search("XAUUSD", top_k=1, min_score=0.1)[0]
+    assert hit["id"] == vs.items[3]["id"] and hit["meta"] == {"tag": "trading"}
+
+
+def test_cambio_de_tokenizer_recalcula_vectores(tmp_path):
+    from wilbito.memory.tokenizer import Tokenizer
+
+    stem = Tokenizer(stem=True)
+    db = SqliteVectorStore(tmp_path / "m.db", tokenizer=stem)
+    db.add_texts(ENTRIES)
+    assert db.search("regresiones", top_k=1, min_score=0.1)
+    db.close()
+
+    db = SqliteVectorStore(tmp_path / "m.db")
+    vs = VectorStore()
+    vs.add_texts(ENTRIES)
+    assert _pairs(db.search("tests pipeline", top_k=3)) == _pairs(vs.search("tests pipeline", top_k=3))
+    db.close()
+
+
+def test_diario_ingesta_en_el_store_activo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(diario, "load_config", lambda: {"memory": {"store": "sqlite"}})
+    diario.write_entry("revisar sizing de XAUUSD", tag="trading")
+    assert not mem_db_path(tmp_path).exists()
+    hits = SqliteVectorStore.load(str(mem_sqlite_path(tmp_path))).search("XAUUSD", top_k=1)
+    assert hits[0]["text"] == "revisar sizing de XAUUSD" and hits[0]["meta"]["source"] == "diario"
@@ -0,0 +1,261 @@
+import json
+
+from wilbito.memory.vectorstore import VectorStore
+
+
+def _store():
+    vs = VectorStore()
+    vs.add_texts(
+        [
+            {"text": "pipeline de CI con lint y tests", "meta": {"tag": "codegen"}},
+            {"text": "plan de marketing para redes", "meta": {"tag": "marketing"}},
+            {"text": "sizing XAUUSD en alta volatilidad", "meta": {"tag": "trading"}},
+        ]
+    )
+    return vs
+
+
+def test_search_usa_indice_invertido():
+    vs = _store()
+    hits = vs.search("lint tests", top_k=1, min_score=0.1)
+    assert len(hits) == 1
+    assert hits[0]["meta"]["tag"] == "codegen"
+    assert hits[0]["score"] > 0
+
+    # Los items agregados después quedan indexados
+    vs.add_text("tests de regresión para XAUUSD", {"tag": "trading"})
+    hits = vs.search("XAUUSD", top_k=5, min_score=0.1)
+    assert {h["meta"]["tag"] for h in hits} == {"trading"}
+    assert len(hits) == 2
+
+
+def test_search_min_score_cero_completa_con_items_sin_coincidencia():
+    vs = _store()
+    hits = vs.search("inexistente", top_k=2)
+    assert [h["score"] for h in hits] == [0.0, 0.0]
+    assert hits[0]["id"] == vs.items[0]["id"]
+
+
+def test_search_boost_por_tag():
+    vs = _store()
+    plain = vs.search("plan", top_k=1, min_score=0.1)[0]["score"]
+    boosted = vs.search("plan", top_k=1, min_score=0.1, prefer_tags=["marketing"])[0]["score"]
+    assert boosted > plain
+
+
+def test_save_persiste_vectores_y_load_los_reutiliza(tmp_path, monkeypatch):
+    db = tmp_path / "vectorstore.json"
+    _store().save(str(db))
+
+    def _no_recalcular(self, item):
+        raise AssertionError("no debería re-vectorizar al cargar")
+
+    monkeypatch.setattr(VectorStore, "_vectorize", _no_recalcular)
+    vs = VectorStore.load(str(db))
+    monkeypatch.undo()
+    assert all({"bow", "norm", "n_tokens"} <= set(it) for it in vs.items)
+    assert vs.search("marketing", top_k=1, min_score=0.1)[0]["meta"]["tag"] == "marketing"
+
+
+def test_load_recalcula_vectores_de_formato_viejo(tmp_path):
+    db = tmp_path / "vectorstore.json"
+    db.write_text('{"items": [{"id": "x", "text": "Hola Mundo hola", "meta": {}}]}', encoding="utf-8")
+    vs = VectorStore.load(str(db))
+    it = vs.items[0]
+    assert it["n_tokens"] == 3
+    assert set(it["bow"]) == {"hola", "mundo"}
+    assert vs.search("mundo", top_k=1)[0]["id"] == "x"
+
+
+def test_scoring_tfidf_y_bm25_penalizan_terminos_comunes():
+    vs = VectorStore(scoring="tfidf")
+    vs.add_texts(
+        [
+            {"text": "memoria memoria memoria memoria riesgo", "meta": {"id": "comun"}},
+            {"text": "volatilidad memoria mercado", "meta": {"id": "raro"}},
+            {"text": "plan memoria trabajo", "meta": {}},
+            {"text": "tests memoria integración", "meta": {}},
+        ]
+    )
+    assert vs.stats.n_docs == 4 and vs.stats.df["memoria"] == 4
+
+    # cosine-tf: el término común domina
+    vs.scoring = "cosine-tf"
+    assert vs.search("memoria memoria memoria volatilidad", top_k=1)[0]["meta"]["id"] == "comun"
+    for mode in ("tfidf", "bm25"):
+        vs.scoring = mode
+        assert vs.search("memoria memoria memoria volatilidad", top_k=1)[0]["meta"]["id"] == "raro"
+
+
+def test_tokenizer_normaliza_puntuacion_acentos_y_stopwords():
+    from wilbito.memory.tokenizer import Tokenizer
+
+    vs = VectorStore()
+    assert vs._tokenize("El Objetivo, de la Acción: smoke-tests!") == ["objetivo", "accion", "smoke-tests"]
+    vs.add_text("Definir el objetivo, con acción inmediata", {"tag": "codegen"})
+    assert vs.search("objetivo accion", top_k=1, min_score=0.5)[0]["meta"]["tag"] == "codegen"
+
+    stem = Tokenizer(stem=True)
+    assert len(set(stem("operaciones operación"))) == 1
+    assert stem.signature != vs.tokenizer.signature
+
+
+def test_load_recalcula_vectores_de_otro_tokenizer(tmp_path):
+    from wilbito.memory.tokenizer import Tokenizer
+
+    db = tmp_path / "vectorstore.json"
+    vs = VectorStore()
+    vs.add_text("operaciones de riesgo")
+    vs.save(str(db))
+
+    stem = Tokenizer(stem=True)
+    again = VectorStore.load(str(db), tokenizer=stem)
+    assert again.search("operacion", top_k=1, min_score=0.1)
+    again.save(str(db))  # vectores recalculados → compacta con la nueva firma
+    assert json.loads(db.read_text(encoding="utf-8"))["tokenizer"] == stem.signature
+
+
+def test_scoring_invalido():
+    import pytest
+
+    with pytest.raises(ValueError):
+        VectorStore(scoring="nope")
+
+
+def test_backend_numpy_coincide_con_python():
+    import pytest
+
+    pytest.importorskip("numpy")
+    entries = [
+        {"text": "pipeline de CI con lint y tests", "meta": {"tag": "codegen"}},
+        {"text": "tests de regresión del pipeline", "meta": {"tag": "codegen"}},
+        {"text": "plan de marketing con tests A/B", "meta": {"tag": "marketing"}},
+        {"text": "sizing XAUUSD", "meta": {"tag": "trading"}},
+    ]
+    for mode in ("cosine-tf", "tfidf", "bm25"):
+        py = VectorStore(scoring=mode)
+        py.add_texts(entries)
+        mx = VectorStore(scoring=mode, backend="numpy")
+        mx.add_texts(entries)
+        for kw in ({}, {"min_score": 0.2}, {"prefer_tags": ["marketing"]}, {"filter": {"tag": ["codegen", "trading"]}}):
+            got = [(h["text"], h["score"]) for h in mx.search("tests pipeline", top_k=3, **kw)]
+            assert got == [(h["text"], h["score"]) for h in py.search("tests pipeline", top_k=3, **kw)]
+        assert mx._matrix is not None
+
+
+def test_poda_max_score_no_cambia_el_top_k():
+    import random
+
+    rnd = random.Random(7)
+    vocab = [f"t{i}" for i in range(200)]
+    weights = [1 / (i + 1) for i in range(200)]
+    vs = VectorStore(scoring="bm25")
+    for _ in range(500):
+        vs.add_text(" ".join(rnd.choices(vocab, weights, k=rnd.randint(3, 15))), {"tag": rnd.choice("ab")})
+
+    for _ in range(30):
+        q = " ".join(rnd.choices(vocab, weights, k=4))
+        qv = vs._query_weights(q)
+        full = vs._rank(vs._accumulate(qv, ["a"]), 3, 0.0)
+        pruned = vs._rank(vs._accumulate(qv, ["a"], 3, 0.0), 3, 0.0)
+        assert [(h["id"], h["score"]) for h in pruned] == [(h["id"], h["score"]) for h in full]
+
+        # Con filtro: mismo resultado que puntuar todo y descartar después
+        allowed = [p for p, it in enumerate(vs.items) if it["meta"]["tag"] == "b"]
+        acc = {p: sc for p, sc in vs._accumulate(qv, ["a"]).items() if p in set(allowed)}
+        expected = vs._rank(acc, 3, 0.0, allowed)
+        got = vs.search(q, top_k=3, prefer_tags=["a"], filter={"tag": "b"})
+        assert [(h["id"], h["score"]) for h in got] == [(h["id"], h["score"]) for h in expected]
+
+
+def test_save_agrega_al_log_y_load_lo_reproduce(tmp_path):
+    from wilbito.memory.vectorstore import wal_path
+
+    db = tmp_path / "vectorstore.json"
+    _store().save(str(db))
+    assert db.exists() and not wal_path(db).exists()
+
+    vs = VectorStore.load(str(db))
+    vs.add_text("nota nueva sobre backtests", {"tag": "trading"})
+    vs.save(str(db))
+    # el snapshot no se reescribe: lo nuevo va al log
+    assert len(wal_path(db).read_text(encoding="utf-8").splitlines()) == 1
+
+    # una línea cortada al final (crash a mitad de escritura) se ignora
+    with wal_path(db).open("a", encoding="utf-8") as f:
+        f.write('{"op": "add", "item": {"id"')
+    vs2 = VectorStore.load(str(db))
+    assert len(vs2.items) == 4
+    assert vs2.search("backtests", top_k=1, min_score=0.1)[0]["meta"]["tag"] == "trading"
+
+    vs2.compact(str(db))
+    assert not wal_path(db).exists()
+    assert len(VectorStore.load(str(db)).items) == 4
+
+
+def test_log_se_compacta_al_crecer(tmp_path, monkeypatch):
+    from wilbito.memory import vectorstore as vsmod
+
+    monkeypatch.setattr(vsmod, "COMPACT_MIN_RECORDS", 2)
+    db = tmp_path / "vectorstore.json"
+    VectorStore().save(str(db))
+    for i in range(3):
+        vs = VectorStore.load(str(db))
+        vs.add_text(f"entrada {i}")
+        vs.save(str(db))
+    assert not vsmod.wal_path(db).exists()
+    assert len(VectorStore.load(str(db)).items) == 3
+
+
+def test_filtro_de_meta_poda_antes_de_puntuar():
+    import pytest
+
+    vs = VectorStore()
+    vs.add_texts(
+        [
+            {"text": "tests del pipeline", "meta": {"tag": "codegen", "source": "diario", "timestamp": "2025-08-01T10:00:00"}},
+            {"text": "tests de estrategia", "meta": {"tag": "trading", "source": "diario", "timestamp": "2025-09-01T10:00:00"}},
+            {"text": "tests de campaña", "meta": {"tag": "marketing", "source": "seed"}},
+            {"text": "otra cosa", "meta": {"tag": "trading", "source": "diario", "timestamp": "2025-09-02T10:00:00"}},
+        ]
+    )
+    hits = vs.search("tests", top_k=5, min_score=0.1, filter={"tag": "trading"})
+    assert [h["text"] for h in hits] == ["tests de estrategia"]
+
+    # Rango sobre timestamp (items sin timestamp no califican) combinado con partición por source
+    flt = {"source": "diario", "timestamp": {"gte": "2025-08-15"}}
+    assert [h["text"] for h in vs.search("tests", top_k=5, min_score=0.1, filter=flt)] == ["tests de estrategia"]
+
+    # Con min_score 0 el relleno respeta el filtro
+    hits = vs.search("tests", top_k=5, filter={"tag": ["trading"]})
+    assert [h["text"] for h in hits] == ["tests de estrategia", "otra cosa"]
+
+    # El boost sigue aplicando sobre el filtro
+    plain = vs.search("tests", top_k=2, min_score=0.1, filter={"tag": ["codegen", "trading"]})
+    boosted = vs.search("tests", top_k=2, min_score=0.1, filter={"tag": ["codegen", "trading"]}, prefer_tags=["trading"])
+    assert boosted[0]["meta"]["tag"] == "trading"
+    assert boosted[0]["score"] > plain[0]["score"] or plain[0]["meta"]["tag"] == "trading"
+
+    assert vs.search("tests", filter={"tag": "inexistente"}) == []
+    with pytest.raises(ValueError):
+        vs.search("tests", filter={"timestamp": {"desde": "2025"}})
+
+
+def test_search_many_coincide_con_search():
+    import random
+
+    from wilbito.memory import matrix
+
+    rnd = random.Random(11)
+    vocab = [f"t{i}" for i in range(80)]
+    entries = [
+        {"text": " ".join(rnd.choices(vocab, k=rnd.randint(3, 10))), "meta": {"tag": rnd.choice("ab")}} for _ in range(300)
+    ]
+    queries = [" ".join(rnd.choices(vocab, k=3)) for _ in range(40)] + ["t1 t2", "t1 t2", "inexistente"]
+    for backend in ["python", "numpy"] if matrix.available() else ["python"]:
+        vs = VectorStore(scoring="bm25", backend=backend)
+        vs.add_texts(entries)
+        for kw in ({}, {"min_score": 0.3, "prefer_tags": ["a"]}, {"filter": {"tag": "b"}}):
+            expected = [vs.search(q, top_k=3, **kw) for q in queries]
+            assert vs.search_many(queries, top_k=3, **kw) == expected
+            assert vs.search_many(queries, top_k=3, workers=2, **kw) == expected
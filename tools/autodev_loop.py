@@ -158,6 +158,7 @@ def _run_executor_subprocess(
     commands_path: str,
     run_name: str,
     verbose: bool,
+    use_cache: bool = True,
 ) -> tuple[dict[str, Any] | None, int, str, str]:
     """Ejecuta el executor-run y devuelve (data, rc, stdout, stderr)."""
     src = str(root / "src")
@@ -174,6 +175,8 @@ def _run_executor_subprocess(
         "--run-name",
         run_name,
     ]
+    if not use_cache:
+        cmd.append("--no-cache")
     proc = subprocess.run(
         cmd,
         cwd=root,
@@ -191,6 +194,7 @@ def run_once(
     commands_path: str,
     run_name: str,
     verbose: bool,
+    use_cache: bool = True,
 ) -> dict[str, Any]:
     """Corre una vez el pipeline y devuelve el dict JSON (o un error uniforme)."""
     root = Path(__file__).resolve().parents[1]
@@ -200,6 +204,7 @@ def run_once(
         commands_path,
         run_name,
         verbose=verbose,
+        use_cache=use_cache,
     )
     if isinstance(data, dict):
         return data
@@ -233,6 +238,11 @@ def main() -> None:
         action="store_true",
         help="Detiene si alguna iteración falla",
     )
+    ap.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Corre todos los steps aunque tengan cache (no repite resultados grabados)",
+    )
     ap.add_argument(
         "--verbose",
         action="store_true",
@@ -243,7 +253,7 @@ def main() -> None:
     results: list[dict[str, Any]] = []
     for i in range(1, args.iterations + 1):
         run_name = f"autodev-loop-{i}-{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
-        data = run_once(args.commands, run_name, args.verbose)
+        data = run_once(args.commands, run_name, args.verbose, use_cache=not args.no_cache)
         results.append(
             {
                 "i": i,